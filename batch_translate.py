@@ -0,0 +1,166 @@
+'''
+Translate many C code blocks in one process.
+
+Inputs can be files, directories (every file directly inside them) or glob
+patterns. The parser, transform, minicToFunctional and simplify are loaded
+once and reused for every input, and one json record is written per input
+as soon as it is translated (see block_translator.translateRecord).
+
+With --jobs N the inputs are sharded over N worker processes. Every worker
+keeps its own warm parser, records still come back in input order, and an
+input that fails only produces an error record.
+
+Blocks made in memory (e.g. by block_generator) are translated the same
+way with translateBlocks, without going through files.
+
+With --timings every record also holds the timings of its phases (see
+pipeline_timings) and the totals per phase are written to stderr.
+
+to run, do
+python batch_translate.py project3inputs
+python batch_translate.py 'project3inputs/checkin6_*' -o results.jsonl
+python batch_translate.py project3inputs --jobs 4
+python batch_translate.py project3inputs --timings -o results.jsonl
+'''
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+
+from block_parser import parserPool
+from block_translator import translateRecord
+from pipeline_timings import aggregate
+
+
+# expand files, directories and glob patterns into a list of input files,
+# keeping the order they were given in
+def expandInputs(paths):
+    files = []
+    seen = set()
+    for path in paths:
+        if os.path.isdir(path):
+            matches = sorted(os.path.join(path, name) for name in os.listdir(path))
+        elif os.path.isfile(path):
+            matches = [path]
+        else:
+            matches = sorted(glob.glob(path))
+
+        for match in matches:
+            # skip sub directories and dummy files left over by makeDummyCFile
+            if not os.path.isfile(match) or match.endswith('Dummy'):
+                continue
+            if match not in seen:
+                seen.add(match)
+                files.append(match)
+    return files
+
+
+# build the parser of a worker process before its first task arrives
+def initWorker():
+    parserPool.warm()
+
+
+def translateTask(task):
+    name, text, usePreprocessor, simplifyOutput, timings = task
+    return translateRecord(name, usePreprocessor, simplifyOutput, timings=timings, text=text)
+
+
+# translate the inputs in jobs worker processes, records are yielded in input order
+#   blocks:    (name, text) of every input, text is None for inputs read from the file name
+#   chunkSize: number of inputs sent to a worker at a time, picked from the
+#              number of inputs when None
+def translateParallel(blocks, jobs, usePreprocessor=False, simplifyOutput=True, chunkSize=None, timings=False):
+    if chunkSize is None:
+        chunkSize = max(1, len(blocks) // (jobs * 4))
+
+    tasks = [(name, text, usePreprocessor, simplifyOutput, timings) for name, text in blocks]
+    pool = multiprocessing.Pool(jobs, initializer=initWorker)
+    try:
+        for record in pool.imap(translateTask, tasks, chunkSize):
+            yield record
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+# translate every input and write one json line per input to out
+#   jobs:    number of worker processes, 1 translates in this process
+#   timings: list the timing records are appended to, None does not time the inputs
+def translateAll(files, out, usePreprocessor=False, simplifyOutput=True, jobs=1, chunkSize=None,
+                 timings=None):
+    blocks = [(fileName, None) for fileName in files]
+    return translateBlocks(blocks, out, usePreprocessor, simplifyOutput, jobs, chunkSize, timings)
+
+
+# translate blocks, a list of (name, C text), and write one json line per block to out
+def translateBlocks(blocks, out, usePreprocessor=False, simplifyOutput=True, jobs=1, chunkSize=None,
+                    timings=None):
+    timed = timings is not None
+    if jobs > 1 and len(blocks) > 1:
+        records = translateParallel(blocks, jobs, usePreprocessor, simplifyOutput, chunkSize, timed)
+    else:
+        records = (translateRecord(name, usePreprocessor, simplifyOutput, timings=timed, text=text)
+                   for name, text in blocks)
+
+    failed = 0
+    for record in records:
+        if not record['ok']:
+            failed += 1
+        if timed:
+            timings.append(record['timings'])
+        out.write(json.dumps(record) + '\n')
+        out.flush()
+    return failed
+
+
+# write the totals per phase of the timing records to stream
+def writeTimings(timings, stream):
+    stream.write('%-18s %7s %10s %10s\n' % ('phase', 'count', 'wall (s)', 'cpu (s)'))
+    for name, total in aggregate(timings).items():
+        stream.write('%-18s %7d %10.3f %10.3f\n' % (name, total['count'], total['wall'], total['cpu']))
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(description='Translate C code blocks to functional programs.')
+    argParser.add_argument('inputs', nargs='+', help='input files, directories or glob patterns')
+    argParser.add_argument('-o', '--output', help='write the json records to this file instead of stdout')
+    argParser.add_argument('--cpp', action='store_true', help='run the C preprocessor on every block')
+    argParser.add_argument('--no-simplify', action='store_true', help='skip the simplification step')
+    argParser.add_argument('-j', '--jobs', type=int, default=1,
+                           help='number of worker processes, 0 uses one per core')
+    argParser.add_argument('--chunksize', type=int, default=None,
+                           help='number of inputs handed to a worker at a time')
+    argParser.add_argument('--timings', action='store_true',
+                           help='add the timings of the phases to every record and print their totals')
+    args = argParser.parse_args(argv)
+
+    files = expandInputs(args.inputs)
+    jobs = args.jobs if args.jobs > 0 else multiprocessing.cpu_count()
+    if jobs == 1:
+        parserPool.warm()
+
+    if args.output:
+        out = open(args.output, 'w')
+    else:
+        out = sys.stdout
+    timings = [] if args.timings else None
+    try:
+        failed = translateAll(files, out, args.cpp, not args.no_simplify, jobs, args.chunksize, timings)
+    finally:
+        if args.output:
+            out.close()
+
+    sys.stderr.write('%d inputs, %d failed\n' % (len(files), failed))
+    if timings is not None:
+        writeTimings(timings, sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
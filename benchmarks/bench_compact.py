@@ -0,0 +1,123 @@
+'''
+Memory of the functional AST of long blocks: myfunctional_ast6 objects
+against a CompactAST.
+
+Each measurement runs in its own process, which translates the given number
+of synthetic blocks (see bench_scaling) and keeps all their ASTs, the way a
+batch run keeps its results:
+  - objects: the ASTs are kept as myfunctional_ast6 nodes
+  - compact: each AST is converted with toCompact and the nodes are dropped,
+             so at most one block is held as objects at a time
+  - load:    the compact ASTs written by the compact run are read back with
+             pickle, no object tree is ever built
+
+The table gives the peak RSS of the process, the RSS still used once the
+ASTs are built (both less the RSS before the first block), the time of a
+full garbage collection with the ASTs alive and the size of the columns. A
+last table checks printCompact against printFunctional on smaller blocks.
+
+to run, do
+python benchmarks/bench_compact.py [statements [blocks]]
+'''
+
+import gc
+import io
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from checkin6simp import minicToFunctional
+from myfunctional_compact import toCompact, printCompact
+from myfunctional_printer import printFunctional
+from bench_scaling import syntheticBlock
+
+
+# peak and current resident set size in MB
+def peakRSS():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def currentRSS():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2.0 ** 20
+
+
+# one measurement, run in a child process: prints
+# peak MB, retained MB, gc seconds, column MB
+def measure(mode, size, blocks, path):
+    minicAst = syntheticBlock(size)
+    gc.collect()
+    baseline = currentRSS()
+
+    if mode == 'load':
+        with open(path, 'rb') as f:
+            kept = pickle.load(f)
+    else:
+        kept = []
+        for i in range(blocks):
+            ast = minicToFunctional(minicAst, [], [], 1)
+            kept.append(ast if mode == 'objects' else toCompact(ast))
+            del ast
+        if mode == 'compact':
+            with open(path, 'wb') as f:
+                pickle.dump(kept, f, pickle.HIGHEST_PROTOCOL)
+
+    gc.collect()
+    retained = currentRSS() - baseline
+    start = time.perf_counter()
+    gc.collect()
+    gcTime = time.perf_counter() - start
+
+    columns = 0.0
+    if mode != 'objects':
+        columns = sum(compact.nbytes() for compact in kept) / 2.0 ** 20
+    print(peakRSS() - baseline, retained, gcTime, columns)
+
+
+def run(mode, size, blocks, path):
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--measure', mode,
+                                      str(size), str(blocks), path])
+    return [float(value) for value in output.split()]
+
+
+def timePrint(printer, ast):
+    out = io.StringIO()
+    start = time.perf_counter()
+    printer(ast, out)
+    return time.perf_counter() - start, out.getvalue()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--measure']:
+        measure(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]), sys.argv[5])
+        sys.exit(0)
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    blocks = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    fd, path = tempfile.mkstemp(suffix='.pickle')
+    os.close(fd)
+    try:
+        print("%d blocks of %d statements" % (blocks, size))
+        print("%10s %14s %14s %10s %12s" % ("mode", "peak RSS (MB)", "retained (MB)", "gc (s)", "columns (MB)"))
+        for mode in ('objects', 'compact', 'load'):
+            peak, retained, gcTime, columns = run(mode, size, blocks, path)
+            print("%10s %14.1f %14.1f %10.3f %12.1f" % (mode, peak, retained, gcTime, columns))
+    finally:
+        os.remove(path)
+
+    print("")
+    print("%10s %16s %16s %10s" % ("statements", "printFunctional", "printCompact", "same"))
+    for printSize in (250, 500, 1000):
+        ast = minicToFunctional(syntheticBlock(printSize), [], [], 1)
+        compact = toCompact(ast)
+        functionalTime, functionalText = timePrint(printFunctional, ast)
+        compactTime, compactText = timePrint(printCompact, compact)
+        print("%10d %16.3f %16.3f %10s" % (printSize, functionalTime, compactTime, functionalText == compactText))
@@ -0,0 +1,112 @@
+'''
+Running translated blocks with myfunctional_eval.
+
+The first table compiles a block repeating TEMPLATE once and calls it with
+many environments, against compiling it again for every call, which is what
+walking the AST on every run would cost at least.
+
+The second table runs a loop for up to a million iterations, the let rec
+runs as a Python loop so the count is not bounded by the recursion limit.
+
+The third table updates an element of an array of n elements per
+iteration, the array is copied on its first update only so the time per
+iteration does not grow with n.
+
+to run, do
+python benchmarks/bench_eval.py [statements [calls]]
+'''
+
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from block_translator import translateBlock
+from myfunctional_eval import compileFunction
+
+
+TEMPLATE = '''
+x = x + y * 2;
+if (x > y) {
+    z = x - y;
+} else {
+    z = y - x;
+}
+for (j = 0; j < m; j++) {
+    w = w + v[j];
+}
+y = z * w % 1000;
+'''
+
+LOOP = '''
+s = 0;
+for (i = 0; i < n; i++) {
+    if (i % 3 == 0) {
+        s += i;
+    } else {
+        s -= 1;
+    }
+}
+'''
+
+UPDATE = '''
+s = 0;
+for (i = 0; i < n; i++) {
+    a[i] = a[i] + i;
+    s = s + a[i];
+}
+'''
+
+
+# C text of a block holding about size statements
+def blockText(size):
+    return TEMPLATE * max(1, size // 4)
+
+
+def environment(seed):
+    return {'x': seed, 'y': 2 * seed, 'w': 0, 'm': 4, 'v': list(range(seed, seed + 4))}
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    functionalAST, simplifiedAST = translateBlock(blockText(size))
+    start = time.perf_counter()
+    block = compileFunction(simplifiedAST)
+    compileTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for seed in range(calls):
+        block(environment(seed))
+    compiledTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for seed in range(calls):
+        compileFunction(simplifiedAST)(environment(seed))
+    recompiledTime = time.perf_counter() - start
+
+    print("%d statements, %d calls" % (size, calls))
+    print("%16s %12s %14s %18s" % ("compile (ms)", "call (ms)", "compile + call", "speedup of reuse"))
+    print("%16.2f %12.3f %14.3f %18.1f" % (1000 * compileTime, 1000 * compiledTime / calls,
+                                            1000 * recompiledTime / calls, recompiledTime / compiledTime))
+
+    print("")
+    print("%12s %12s %14s" % ("iterations", "seconds", "us/iteration"))
+    loop = compileFunction(translateBlock(LOOP)[1])
+    for iterations in (1000, 100000, 1000000):
+        start = time.perf_counter()
+        loop(n=iterations)
+        elapsed = time.perf_counter() - start
+        print("%12d %12.3f %14.3f" % (iterations, elapsed, 1e6 * elapsed / iterations))
+
+    print("")
+    print("%12s %12s %14s" % ("elements", "seconds", "us/iteration"))
+    update = compileFunction(translateBlock(UPDATE)[1])
+    for elements in (1000, 10000, 100000):
+        start = time.perf_counter()
+        update(n=elements, a=[0] * elements)
+        elapsed = time.perf_counter() - start
+        print("%12d %12.3f %14.3f" % (elements, elapsed, 1e6 * elapsed / elements))
@@ -0,0 +1,94 @@
+'''
+Re-translating an edited block: translateBlock on the new text against
+IncrementalTranslator.update.
+
+The block repeats the template of bench_scaling as C text. Each edit is
+applied to the original block:
+  - first/middle/last: the constant of one assignment changes
+  - insert: a declaration is added in the middle, the statements after it
+    get one more level and are translated again
+  - written: an assignment in the middle writes another variable, the
+    returned tuple and function header change
+
+The columns give the time of the full translation, of the update and of
+its phases (simplify still runs on the whole AST), how many statements
+were parsed and translated, how many lets were shared with the previous
+translation and whether the AST is the same as translateBlock's.
+
+to run, do
+python benchmarks/bench_incremental.py [statements ...]
+'''
+
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from block_translator import translateBlock
+from incremental_translator import IncrementalTranslator
+from myfunctional_compact import toCompact
+from bench_scaling import TEMPLATE
+
+
+# C text of a block holding about size statements
+def blockText(size):
+    lines = []
+    count = 0
+    while count < size:
+        lines.append('x%d = %d;' % (count, count))
+        lines.append(TEMPLATE)
+        count += 7
+    return '\n'.join(lines)
+
+
+def edits(text):
+    lines = text.split('\n')
+    assignments = [i for i, line in enumerate(lines) if line.startswith('x')]
+
+    def replaced(index, line):
+        return '\n'.join(lines[:index] + [line] + lines[index + 1:])
+
+    middle = assignments[len(assignments) // 2]
+    return [
+        ('first', replaced(assignments[0], 'x0 = 42;')),
+        ('middle', replaced(middle, lines[middle].split('=')[0] + '= 42;')),
+        ('last', replaced(assignments[-1], lines[assignments[-1]].split('=')[0] + '= 42;')),
+        ('insert', '\n'.join(lines[:middle] + ['int fresh = 1;'] + lines[middle:])),
+        ('written', replaced(middle, 'fresh = 42;')),
+    ]
+
+
+# True when the two ASTs have the same structure and fields
+def sameAST(a, b):
+    a, b = toCompact(a), toCompact(b)
+    return (a.kinds == b.kinds and a.levels == b.levels and a.slots == b.slots
+            and a.names == b.names and a.objects == b.objects)
+
+
+if __name__ == '__main__':
+    sizes = [int(size) for size in sys.argv[1:]] or [1000, 5000]
+
+    print("%10s %8s %9s %10s %8s %10s %9s %7s %11s %7s %6s" % (
+        "statements", "edit", "full (s)", "update (s)", "parse", "translate", "simplify",
+        "parsed", "translated", "reused", "same"))
+    for size in sizes:
+        text = blockText(size)
+        translator = IncrementalTranslator()
+        translator.translate(text)
+        for name, newText in edits(text):
+            start = time.perf_counter()
+            full = translateBlock(newText)
+            fullTime = time.perf_counter() - start
+
+            translator.translate(text)
+            start = time.perf_counter()
+            updated = translator.update(text, newText)
+            updateTime = time.perf_counter() - start
+
+            timings, stats = translator.timings, translator.stats
+            same = sameAST(full[0], updated[0]) and sameAST(full[1], updated[1])
+            print("%10d %8s %9.3f %10.3f %8.3f %10.3f %9.3f %7d %11d %7d %6s" % (
+                stats['statements'], name, fullTime, updateTime, timings['parse'], timings['translate'],
+                timings['simplify'], stats['parsed'], stats['translated'], stats['reusedLets'], same))
@@ -0,0 +1,96 @@
+'''
+Memory of the functional AST with and without interned nodes.
+
+For synthetic blocks (see bench_scaling) the functional AST and its
+simplified version are built with ordinary nodes, then interned in a
+NodeTable. The node columns count the distinct node objects of the two
+ASTs, tracemalloc measures the memory they keep alive; the table itself
+(only needed to intern more nodes) is reported separately. The last columns
+time comparing two separately built copies of the AST: within one table
+that is an identity check, across tables the cached hashes and the shared
+children keep it linear.
+
+to run, do
+python benchmarks/bench_intern.py [size ...]
+'''
+
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import myfunctional_ast6 as my
+from checkin6simp import minicToFunctional, simplify
+from myfunctional_intern import NodeTable
+from bench_scaling import syntheticBlock
+
+
+# number of distinct node objects in the asts
+def countNodes(*asts):
+    seen = set()
+    stack = list(asts)
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, my.Node) and id(value) not in seen:
+            seen.add(id(value))
+            names = getattr(value, 'fieldNames', value.__slots__)
+            stack.extend(getattr(value, name) for name in names if name != '__weakref__')
+    return len(seen)
+
+
+def translate(minicAst):
+    functionalAST = minicToFunctional(minicAst, [], [], 1)
+    return functionalAST, simplify(functionalAST)
+
+
+# memory kept alive by the result of build()
+def retainedMemory(build):
+    tracemalloc.start()
+    try:
+        result = build()
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def internBoth(minicAst):
+    table = NodeTable()
+    functionalAST, simplifiedAST = translate(minicAst)
+    return table.intern(functionalAST), table.intern(simplifiedAST), table
+
+
+if __name__ == '__main__':
+    sizes = [int(size) for size in sys.argv[1:]] or [1000, 10000, 50000]
+
+    print("%10s %10s %10s %10s %12s %10s %10s %14s" % ("statements", "nodes", "interned", "MB",
+                                                       "MB interned", "MB table", "eq (ms)", "eq tables (ms)"))
+    for size in sizes:
+        minicAst = syntheticBlock(size)
+        plain, plainBytes = retainedMemory(lambda: translate(minicAst))
+        nodes = countNodes(*plain)
+        del plain
+
+        (functionalAST, simplifiedAST, table), withTableBytes = retainedMemory(lambda: internBoth(minicAst))
+        interned = (functionalAST, simplifiedAST)
+        tableBytes = sys.getsizeof(table.nodes)
+
+        again = table.intern(translate(minicAst)[0])
+        start = time.perf_counter()
+        assert again == interned[0]
+        sameTable = time.perf_counter() - start
+
+        other = NodeTable().intern(translate(minicAst)[0])
+        start = time.perf_counter()
+        assert other == interned[0]
+        otherTable = time.perf_counter() - start
+
+        print("%10d %10d %10d %10.1f %12.1f %10.1f %10.4f %14.1f" % (size, nodes, countNodes(*interned),
+                                                                    plainBytes / 1e6,
+                                                                    (withTableBytes - tableBytes) / 1e6,
+                                                                    tableBytes / 1e6, 1000 * sameTable,
+                                                                    1000 * otherTable))
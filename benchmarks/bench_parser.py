@@ -0,0 +1,84 @@
+'''
+Cold vs. warm parse time over project3inputs.
+
+cold: a new CParser is built for every block (what each checkin script
+      launch pays)
+warm: every block borrows an already built parser from a ParserPool
+
+to run, do
+python benchmarks/bench_parser.py [repeat]
+'''
+
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from pycparser import c_parser
+
+from block_parser import ParserPool, parseBlock
+from block_translator import translateBlock
+
+
+INPUT_DIR = os.path.join(ROOT, 'project3inputs')
+
+
+def readInputs():
+    inputs = []
+    for fileName in sorted(glob.glob(os.path.join(INPUT_DIR, '*'))):
+        f = open(fileName, 'r')
+        inputs.append((os.path.basename(fileName), f.read()))
+        f.close()
+    return inputs
+
+
+def timeCold(inputs, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        for name, text in inputs:
+            parseBlock(text, parser=c_parser.CParser())
+    return time.perf_counter() - start
+
+
+def timeWarm(inputs, repeat):
+    pool = ParserPool()
+    pool.warm()
+    start = time.perf_counter()
+    for i in range(repeat):
+        for name, text in inputs:
+            with pool.parser() as parser:
+                parseBlock(text, parser=parser)
+    return time.perf_counter() - start
+
+
+def timePipeline(inputs, repeat):
+    pool = ParserPool()
+    pool.warm()
+    start = time.perf_counter()
+    for i in range(repeat):
+        for name, text in inputs:
+            translateBlock(text, pool=pool)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    inputs = readInputs()
+    blocks = repeat * len(inputs)
+
+    # the first CParser also imports the cached parser tables, keep that out
+    # of both measurements
+    c_parser.CParser()
+
+    cold = timeCold(inputs, repeat)
+    warm = timeWarm(inputs, repeat)
+    pipeline = timePipeline(inputs, repeat)
+
+    print("%d blocks (%d inputs x %d)" % (blocks, len(inputs), repeat))
+    print("cold parse:     %8.3f ms/block" % (1000.0 * cold / blocks))
+    print("warm parse:     %8.3f ms/block" % (1000.0 * warm / blocks))
+    print("speedup:        %8.2fx" % (cold / warm))
+    print("warm pipeline:  %8.3f ms/block (parse, transform, minicToFunctional, simplify)" % (1000.0 * pipeline / blocks))
@@ -0,0 +1,59 @@
+'''
+Printing the functional AST of long blocks: str(ast) against printFunctional.
+
+Every statement of a block adds one let around the rest of the block, so
+str(ast) renders the tail of the block once per enclosing let and fails
+with a RecursionError once the chain is deeper than the recursion limit.
+printFunctional streams the same text in one pass, its time is linear in
+the size of the text (which itself grows quadratically with the number of
+statements, each let is indented one level deeper). Both are checked to
+produce the same text where str(ast) still works.
+
+to run, do
+python benchmarks/bench_printer.py [size ...]
+'''
+
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from checkin6simp import minicToFunctional
+from myfunctional_printer import printFunctional
+from bench_scaling import syntheticBlock
+
+
+def timeStr(ast):
+    start = time.perf_counter()
+    try:
+        text = str(ast)
+    except RecursionError:
+        return None, None
+    return time.perf_counter() - start, text
+
+
+def timePrinter(ast):
+    out = io.StringIO()
+    start = time.perf_counter()
+    printFunctional(ast, out)
+    return time.perf_counter() - start, out.getvalue()
+
+
+if __name__ == '__main__':
+    sizes = [int(size) for size in sys.argv[1:]] or [50, 100, 200, 400, 1000, 2000]
+
+    print("%10s %12s %12s %12s %10s %10s" % ("statements", "str (s)", "printer (s)", "MB", "MB/s", "same"))
+    for size in sizes:
+        ast = minicToFunctional(syntheticBlock(size), [], [], 1)
+        strTime, strText = timeStr(ast)
+        printerTime, printerText = timePrinter(ast)
+        megabytes = len(printerText) / 1e6
+        if strTime is None:
+            print("%10d %12s %12.3f %12.1f %10.1f %10s" % (size, "recursion", printerTime, megabytes,
+                                                           megabytes / printerTime, "-"))
+        else:
+            print("%10d %12.3f %12.3f %12.1f %10.1f %10s" % (size, strTime, printerTime, megabytes,
+                                                             megabytes / printerTime, strText == printerText))
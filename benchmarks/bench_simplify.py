@@ -0,0 +1,300 @@
+'''
+Benchmark of simplify on long straight-line blocks.
+
+Compares simplify with the implementation it replaced (kept below as
+legacySimplify), which deep copied the AST on every call and every node
+visited by replaceVar, and ran replaceVar over the rest of the block for
+each constant let. simplify walks the block once, carrying the constants
+to replace in an environment, and shares every unchanged subtree.
+
+Two block shapes are measured:
+  repeated:  a constant assignment to the same variable every few
+             statements, each constant only lives until the next one
+  constants: a new variable for every constant, all of them live until
+             the end of the block
+
+legacySimplify is only run up to 200 statements. Both results are checked
+to print the same.
+
+to run, do
+python benchmarks/bench_simplify.py [size ...]
+'''
+
+import copy
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import myfunctional_ast6 as my
+from block_parser import parseBlock
+from pyminicMaster.c_ast_to_minic import transform
+from checkin6simp import minicToFunctional, simplify
+from myfunctional_printer import functionalToString
+
+
+TEMPLATE = '''x = 1;
+y = x + 2;
+z = y * x;
+w = w + z;
+'''
+
+
+# ---------------------- simplify before structure sharing ---------------------
+
+def legacySimplify(ast):
+    newAst = copy.deepcopy(ast)
+
+    if isinstance(newAst, my.FuncDef):
+        # prototype don't need simplification, but its body does
+        newAst.body = legacySimplify(newAst.body)
+        return newAst
+
+    if isinstance(newAst, my.Let):
+        # simplify variables that are assigned to constant
+        if isinstance(newAst.ident, my.ID) and isinstance(newAst.assignedExpr, my.Constant):
+
+            varName = str(newAst.ident).strip()
+
+            val = newAst.assignedExpr
+            newAst = legacyReplaceVar(newAst.bodyExpr, varName, val)
+
+            # if variable should not be modified, make a copy of the original
+            # ast again and simplify body expression
+            if newAst is None:
+                newAst = copy.deepcopy(ast)
+                newAst.bodyExpr = legacySimplify(newAst.bodyExpr)
+            else:
+                newAst = legacySimplify(newAst);
+            return newAst
+
+        # simplify body expression for array ref
+        if isinstance(newAst.ident, my.ArrayRef):
+            newAst.bodyExpr = legacySimplify(newAst.bodyExpr)
+            return newAst
+
+        # ast is a let made for if statement
+        # simplify both assgined Expression as well as the body expression
+        newAst.assignedExpr = legacySimplify(newAst.assignedExpr)
+        newAst.bodyExpr = legacySimplify(newAst.bodyExpr)
+
+        return newAst
+
+    if isinstance(newAst, my.TernaryOp):
+        newAst.iftrue = legacySimplify(newAst.iftrue)
+        newAst.iffalse = legacySimplify(newAst.iffalse)
+
+        return newAst
+
+    if isinstance(newAst, my.Letrec):
+        # simplify both the assgined Expression as well as the body expression
+        newAst.assignedExpr = legacySimplify(newAst.assignedExpr)
+        newAst.bodyExpr = legacySimplify(newAst.bodyExpr)
+
+    return newAst
+
+def legacyReplaceVar(ast, varName, val):
+
+    if isinstance(ast, my.FuncDef):
+        newAst = copy.deepcopy(ast)
+        newAst.body = legacyReplaceVar(newAst.body, varName, val)
+
+        # Check if variable to be replace exist in a loop
+        if newAst.body is None:
+            return None
+        else:
+            return newAst
+
+    if isinstance(ast, my.Let):
+        newAst = copy.deepcopy(ast)
+        if isinstance(newAst.ident, str):
+            newAst.ident = my.ID(newAst.ident.strip(), 0)
+
+        if isinstance(newAst.ident, my.ID) or isinstance(newAst.ident, my.ArrayRef):
+
+            if isinstance(newAst.ident, my.ArrayRef):
+                newAst.ident = legacyReplaceVar(newAst.ident, varName, val)
+
+                # Check if variable to be replace exist in a loop
+                if newAst.ident is None:
+                    return None
+
+            newAst.assignedExpr = legacyReplaceVar(newAst.assignedExpr, varName, val)
+            if newAst.assignedExpr is None:
+                return None
+
+            # if the name of variable is not the one that need to be replaced,
+            # check if
+            if (str(newAst.ident).strip() != varName):
+                newAst.bodyExpr = legacyReplaceVar(newAst.bodyExpr, varName, val)
+
+                if newAst.bodyExpr is None:
+                    return None
+
+            return newAst
+
+        # Do replace of variable for if statements
+        if isinstance(newAst.ident, list) or isinstance(newAst.ident, tuple):
+            newAst.assignedExpr = legacyReplaceVar(newAst.assignedExpr, varName, val)
+
+            if newAst.assignedExpr is None:
+                return None
+
+        return newAst
+
+    if isinstance(ast, my.ID):
+        newAst = copy.deepcopy(ast)
+        # replace variable if the name are the same
+        if str(ast).strip() == varName:
+            newAst = copy.deepcopy(val)
+            newAst.level = ast.level
+        return newAst
+
+    if isinstance(ast, my.ReturnTuples):
+        # Replace the variable named as varName with the value val in the return
+        # tuple
+        newAst = copy.deepcopy(ast)
+
+        if isinstance(newAst.exprs, tuple):
+            newAst.exprs = list(newAst.exprs)
+
+        for i in range(len(ast.exprs)):
+            if isinstance(newAst.exprs[i], str) and (newAst.exprs[i] == str(varName).strip()):
+                newAst.exprs[i] = copy.deepcopy(val)
+                newAst.exprs[i].level = 0
+        return newAst
+
+    if isinstance(ast, my.BinaryOp):
+        # Do replacement for the expression on the left and the expression on the right
+        newAst = copy.deepcopy(ast)
+
+        newAst.left = legacyReplaceVar(newAst.left, varName, val)
+
+        if newAst.left is None:
+            return None
+
+        newAst.right = legacyReplaceVar(newAst.right, varName, val)
+
+        if newAst.right is None:
+            return None
+        return newAst
+
+    if isinstance(ast, my.TernaryOp):
+        # Do replacement in the condition, iftrue, and iffalse
+        newAst = copy.deepcopy(ast)
+        newAst.cond = legacyReplaceVar(newAst.cond, varName, val)
+        newAst.iftrue = legacyReplaceVar(newAst.iftrue, varName, val)
+
+        if newAst.iftrue is None:  # variable to be replaced is modified in let rec
+            return None
+
+        newAst.iffalse = legacyReplaceVar(newAst.iffalse, varName, val)
+
+        if newAst.iffalse is None: # variable to be replaced is modified in let rec
+            return None
+
+        return newAst
+
+    if isinstance(ast, my.FuncCall):
+        # look up each argument of the function and replace variable if name is varName
+        newAst = copy.deepcopy(ast)
+        for i in range(len(newAst.args)):
+            if isinstance(newAst.args[i], str) and (newAst.args[i] == str(varName).strip()):
+                newAst.args[i] = copy.deepcopy(val)
+                newAst.args[i].level = 0
+
+            else:
+                newAst.args[i] = legacyReplaceVar(newAst.args[i], varName, val)
+
+        return newAst
+
+    if isinstance(ast, my.ArrayRef):
+        # look up each subscript and replace variable if name is varName
+        newAst = copy.deepcopy(ast)
+        if not isinstance(newAst.name, my.ID):
+            newAst.name = legacyReplaceVar(newAst.name, varName, val)
+
+        newAst.subscript = legacyReplaceVar(newAst.subscript, varName, val)
+        return newAst
+
+    if isinstance(ast, my.UnaryOp):
+        # Do replacement for the expressiono in the unary expression
+        newAst = copy.deepcopy(ast)
+        newAst.expr = legacyReplaceVar(newAst.expr, varName, val)
+        return newAst
+
+    if isinstance(ast, my.ExprList):
+        # Do replacement for each of the expression in expression list
+        newAst = copy.deepcopy(ast)
+        for i in range(len(newAst.exprs)):
+            if isinstance(newAst.exprs[i], str) and (newAst.exprs[i] == str(varName).strip()):
+                newAst.exprs[i] = copy.deepcopy(val)
+                newAst.exprs[i].level = 0
+
+            else:
+                newAst.exprs[i] = legacyReplaceVar(newAst.exprs[i], varName, val)
+
+        return newAst
+
+    if isinstance(ast, my.Letrec):
+
+        # return back a None to indicated that the variable should not be simplified because it is used in a loop
+        if varName in ast.args:
+            return None
+        else:
+            # Replace variable in let rec since variable is not modified in let rec
+            newAst = copy.deepcopy(ast)
+            newAst.assignedExpr = legacyReplaceVar(newAst.assignedExpr, varName, val)
+            if newAst.assignedExpr is None:
+                return None
+
+            # Do the variable replacement to the body of let rec
+            newAst.bodyExpr = legacyReplaceVar(newAst.bodyExpr, varName, val)
+
+            if newAst.bodyExpr is None:
+                return None
+            return newAst
+
+    return ast
+
+# ------------------------------------------------------------------------------
+
+
+LEGACY_LIMIT = 200
+
+
+def straightLineBlock(size):
+    code = TEMPLATE * (size // TEMPLATE.count(';'))
+    return minicToFunctional(transform(parseBlock(code)), [], [], 1)
+
+
+def constantsBlock(size):
+    code = ''.join('c%d = %d;\nw = w + c%d;\n' % (i, i, i) for i in range(size // 2))
+    return minicToFunctional(transform(parseBlock(code)), [], [], 1)
+
+
+def timeSimplify(function, ast):
+    start = time.perf_counter()
+    result = function(ast)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    sizes = [int(size) for size in sys.argv[1:]] or [100, 200, 10000, 40000]
+    # legacySimplify recurses along the chain of lets
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20 * LEGACY_LIMIT))
+
+    print("%10s %10s %14s %14s %10s %6s" % ("block", "statements", "legacy (s)", "simplify (s)", "speedup", "same"))
+    for shape, makeBlock in (("repeated", straightLineBlock), ("constants", constantsBlock)):
+        for size in sizes:
+            ast = makeBlock(size)
+            newTime, newResult = timeSimplify(simplify, ast)
+            if size > LEGACY_LIMIT:
+                print("%10s %10d %14s %14.4f %10s %6s" % (shape, size, "-", newTime, "-", "-"))
+                continue
+            legacyTime, legacyResult = timeSimplify(legacySimplify, ast)
+            same = functionalToString(legacyResult, storedLevels=True) == functionalToString(newResult, storedLevels=True)
+            print("%10s %10d %14.4f %14.4f %10.1f %6s" % (shape, size, legacyTime, newTime,
+                                                         legacyTime / newTime, same))
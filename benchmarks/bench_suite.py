@@ -0,0 +1,224 @@
+'''
+Timings of every phase of the pipeline on the project inputs and on
+synthetic blocks, written as json.
+
+Cases:
+  - input:    every file of project3inputs (checkin3-6, p3_input*, testing*)
+  - straight: a straight-line block of size assignments
+  - if:       if statements nested size deep
+  - while, for, do: loops of that kind nested size deep. A do while is
+              lowered to its body followed by a while loop, so the
+              translation of nested do whiles doubles with every level
+  - array:    size assignments between array elements with computed subscripts
+
+Each case is translated repeat times with a PhaseTimer (see pipeline_timings)
+and for each phase the fastest run is kept. The json document holds, per
+case, the wall and CPU seconds of every phase, the node counts going in and
+out of it and the total. A table of the cases is printed on stderr.
+
+With --baseline, the phases of the cases found in an earlier document that
+got slower than --threshold times their old wall time (and by more than a
+millisecond) are listed, and the exit status is 1 when there are any.
+
+to run, do
+python benchmarks/bench_suite.py -o timings.json
+python benchmarks/bench_suite.py --baseline timings.json
+python benchmarks/bench_suite.py --quick
+'''
+
+import argparse
+import json
+import os
+import platform
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+import pycparser
+
+from block_translator import translateBlock
+from myfunctional_printer import functionalToString
+from pipeline_timings import PhaseTimer
+
+
+INPUTS = os.path.join(ROOT, 'project3inputs')
+
+# kind -> sizes of the synthetic cases, the quick sizes are used with --quick
+SIZES = {
+    'straight': (100, 1000, 5000),
+    'if': (10, 40, 80),
+    'while': (5, 10, 20),
+    'for': (5, 10, 20),
+    'do': (2, 4, 8),
+    'array': (100, 1000),
+}
+QUICK_SIZES = {
+    'straight': (100,),
+    'if': (10,),
+    'while': (5,),
+    'for': (5,),
+    'do': (2,),
+    'array': (100,),
+}
+
+# regressions smaller than this (in seconds) are noise
+MIN_REGRESSION = 0.001
+
+
+def straightBlock(size):
+    lines = []
+    for i in range(size):
+        lines.append('x%d = x%d * %d + y;' % (i % 10, (i + 3) % 10, i))
+    return '\n'.join(lines)
+
+
+def ifBlock(depth):
+    code = ''
+    for i in range(depth):
+        code += 'x%d = x%d + 1;\nif (x%d > y) {\n' % (i, i, i)
+    return code + 'y = 0;\n' + '}\n' * depth
+
+
+# loops of kind ('while', 'for' or 'do') nested depth deep
+def loopBlock(kind, depth):
+    code = ''
+    for i in range(depth):
+        if kind == 'while':
+            code += 'i%d = 0;\nwhile (i%d < n) {\ni%d++;\n' % (i, i, i)
+        elif kind == 'for':
+            code += 'for (i%d = 0; i%d < n; i%d++) {\n' % (i, i, i)
+        else:
+            code += 'i%d = 0;\ndo {\ni%d++;\n' % (i, i)
+        code += 's = s + i%d;\n' % i
+    for i in reversed(range(depth)):
+        if kind == 'do':
+            code += '} while (i%d < n);\n' % i
+        else:
+            code += '}\n'
+    return code
+
+
+def arrayBlock(size):
+    lines = []
+    for i in range(size):
+        lines.append('a[i + %d] = b[a[j] - %d] * c[i][j] + a[b[i + %d]];' % (i % 7, i % 5, i % 3))
+    return '\n'.join(lines)
+
+
+def syntheticBlock(kind, size):
+    if kind == 'straight':
+        return straightBlock(size)
+    if kind == 'if':
+        return ifBlock(size)
+    if kind == 'array':
+        return arrayBlock(size)
+    return loopBlock(kind, size)
+
+
+# the cases to run: (name, kind, size, block text)
+def cases(quick=False):
+    found = []
+    for name in sorted(os.listdir(INPUTS)):
+        path = os.path.join(INPUTS, name)
+        if os.path.isfile(path) and not name.endswith('Dummy'):
+            with open(path) as f:
+                found.append((name, 'input', None, f.read()))
+    for kind, sizes in (QUICK_SIZES if quick else SIZES).items():
+        for size in sizes:
+            found.append(('%s-%d' % (kind, size), kind, size, syntheticBlock(kind, size)))
+    return found
+
+
+def timedRun(text):
+    timer = PhaseTimer()
+    functionalAST, simplifiedAST = translateBlock(text, timer=timer)
+    with timer.phase('render', functionalAST) as phase:
+        phase.result = functionalToString(functionalAST)
+    with timer.phase('render simplified', simplifiedAST) as phase:
+        phase.result = functionalToString(simplifiedAST, storedLevels=True)
+    return timer.phases
+
+
+# translate text repeat times, keeping the fastest run of every phase
+def runCase(name, kind, size, text, repeat):
+    phases = {}
+    for i in range(repeat):
+        for record in timedRun(text):
+            best = phases.get(record['phase'])
+            if best is None or record['wall'] < best['wall']:
+                phases[record['phase']] = dict(record)
+    for record in phases.values():
+        del record['phase']
+    return {
+        'name': name,
+        'kind': kind,
+        'size': size,
+        'phases': phases,
+        'wall': sum(record['wall'] for record in phases.values()),
+        'cpu': sum(record['cpu'] for record in phases.values()),
+    }
+
+
+# (case, phase, old wall, new wall) of the phases slower than threshold times the baseline
+def regressions(results, baseline, threshold):
+    old = {case['name']: case for case in baseline['cases']}
+    found = []
+    for case in results['cases']:
+        if case['name'] not in old:
+            continue
+        oldPhases = old[case['name']]['phases']
+        for phase, record in case['phases'].items():
+            if phase not in oldPhases:
+                continue
+            oldWall = oldPhases[phase]['wall']
+            if record['wall'] > oldWall * threshold and record['wall'] - oldWall > MIN_REGRESSION:
+                found.append((case['name'], phase, oldWall, record['wall']))
+    return found
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(description='Time the phases of the translation pipeline.')
+    argParser.add_argument('-o', '--output', help='write the json document to this file instead of stdout')
+    argParser.add_argument('-r', '--repeat', type=int, default=5, help='runs per case, the fastest is kept')
+    argParser.add_argument('--quick', action='store_true', help='only the smallest synthetic cases')
+    argParser.add_argument('--baseline', help='json document of an earlier run to compare with')
+    argParser.add_argument('--threshold', type=float, default=1.25,
+                           help='slowdown factor reported as a regression')
+    args = argParser.parse_args(argv)
+
+    results = {
+        'python': platform.python_version(),
+        'pycparser': pycparser.__version__,
+        'repeat': args.repeat,
+        'cases': [],
+    }
+    sys.stderr.write('%-16s %10s %10s %10s %10s %10s\n' % (
+        'case', 'parse', 'transform', 'translate', 'simplify', 'total (s)'))
+    for name, kind, size, text in cases(args.quick):
+        case = runCase(name, kind, size, text, args.repeat)
+        results['cases'].append(case)
+        walls = [case['phases'].get(phase, {'wall': 0.0})['wall']
+                 for phase in ('parse', 'transform', 'translate', 'simplify')]
+        sys.stderr.write('%-16s %10.4f %10.4f %10.4f %10.4f %10.4f\n' % tuple([name] + walls + [case['wall']]))
+
+    document = json.dumps(results, indent=1)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(document + '\n')
+    else:
+        print(document)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.threshold)
+        for name, phase, oldWall, newWall in found:
+            sys.stderr.write('regression: %s %s %.4fs -> %.4fs\n' % (name, phase, oldWall, newWall))
+        sys.stderr.write('%d regressions\n' % len(found))
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
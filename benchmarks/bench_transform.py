@@ -0,0 +1,171 @@
+'''
+Micro-benchmark of c_ast_to_minic.transform.
+
+Compares the Converter (prebuilt dispatch table, explicit stack) with the
+previous implementation, which built a dict of 33 lambdas on every call
+(kept below as legacy_transform). Both are run over the pycparser ASTs of the
+project3inputs blocks and the throughput is reported in pycparser nodes per
+second. The two results are also compared node by node.
+
+to run, do
+python benchmarks/bench_transform.py [repeat]
+'''
+
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from pycparser import c_ast
+
+from block_parser import parseBlockFile
+from pyminicMaster.c_ast_to_minic import transform, v, unsupported
+from pyminicMaster.minic import minic_ast as mc
+from pyminicMaster.minic.mutils import lmap
+
+
+# ------------------- transform before the dispatch table ---------------------
+
+def legacy_of_assignment(orig):
+    lvalue = legacy_transform(orig.lvalue)
+    if orig.rvalue is not None:
+        rvalue = legacy_transform(orig.rvalue)
+    else:
+        rvalue = None
+
+    final_rvalue = {
+        '=': rvalue,
+        '+=': mc.BinaryOp('+', lvalue, rvalue),
+        '-=': mc.BinaryOp('-', lvalue, rvalue),
+        '*=': mc.BinaryOp('*', lvalue, rvalue),
+        '/=': mc.BinaryOp('/', lvalue, rvalue),
+        '%=': mc.BinaryOp('%', lvalue, rvalue),
+        '^=': mc.BinaryOp('^', lvalue, rvalue),
+        '|=': mc.BinaryOp('|', lvalue, rvalue),
+        '>>=': mc.BinaryOp('>>', lvalue, rvalue),
+        '<<=': mc.BinaryOp('<<', lvalue, rvalue),
+        '&=': mc.BinaryOp('&', lvalue, rvalue),
+        '++': mc.BinaryOp('+', lvalue, mc.Constant('int', '1')),
+        '--': mc.BinaryOp('-', lvalue, mc.Constant('int', '1')),
+    }.get(orig.op, mc.EmptyStatement())
+
+    return mc.Assignment(lvalue, final_rvalue, coord=orig.coord)
+
+
+# PyCParser represents increment and decrement as unary operations, we convert them
+# to assignments. Other unary operators are kept as is.
+def legacy_maybe_special_unary(orig):
+    return {
+        'p--': (lambda x: mc.Assignment(x, mc.BinaryOp('-', x, mc.Constant('int', '1')))),
+        'p++': (lambda x: mc.Assignment(x, mc.BinaryOp('+', x, mc.Constant('int', '1')))),
+        '--': (lambda x: mc.Assignment(x, mc.BinaryOp('-', x, mc.Constant('int', '1')))),
+        '++': (lambda x: mc.Assignment(x, mc.BinaryOp('+', x, mc.Constant('int', '1'))))
+    }.get(orig.op, lambda x: mc.UnaryOp(orig.op, x))(legacy_transform(orig.expr))
+
+
+def legacy_tmap(x):
+    if isinstance(x, list):
+        return lmap(legacy_transform, x)
+    else:
+        return legacy_transform(x)
+
+
+# The main transformer function. This is close to a mapping for PyCparser AST nodes to Minic nodes, except
+# that there are less constructs and we have to transform assignments and unary operators.
+def legacy_transform(x):
+    return {
+        c_ast.ArrayDecl: (lambda orig: mc.ArrayDecl(legacy_transform(orig.type), orig.dim, coord=orig.coord)),
+        c_ast.ArrayRef: (lambda orig: mc.ArrayRef(legacy_transform(orig.name), legacy_transform(orig.subscript))),
+        c_ast.Assignment: (lambda orig: legacy_of_assignment(orig)),
+        c_ast.BinaryOp: (lambda orig: mc.BinaryOp(v(orig.op), legacy_transform(orig.left), legacy_transform(orig.right), coord=orig.coord)),
+        c_ast.Compound: (lambda orig: mc.Block(lmap(legacy_transform, orig.block_items), coord=orig.coord)),
+        c_ast.Constant: (lambda orig: mc.Constant(legacy_transform(orig.type), v(orig.value), coord=orig.coord)),
+        c_ast.Decl: (lambda orig: mc.Decl(legacy_transform(orig.name), legacy_transform(orig.funcspec), legacy_transform(orig.type), legacy_transform(orig.init), coord=orig.coord)),
+        c_ast.DeclList: (lambda orig: mc.DeclList(legacy_tmap(orig.decls), coord=orig.coord)),
+        c_ast.DoWhile: (lambda orig: mc.DoWhile(legacy_transform(orig.cond), legacy_transform(orig.stmt), coord=orig.coord)),
+        c_ast.EmptyStatement: (lambda orig: mc.EmptyStatement()),
+        c_ast.ExprList: (lambda orig: mc.ExprList(legacy_tmap(orig.exprs))),
+        c_ast.FileAST: (lambda orig: mc.FileAST(lmap(legacy_transform, orig.ext))),
+        c_ast.For: (lambda orig: mc.For(legacy_transform(orig.init), legacy_transform(orig.cond), legacy_transform(orig.next), legacy_transform(orig.stmt), coord=orig.coord)),
+        c_ast.FuncCall: (lambda orig: mc.FuncCall(legacy_transform(orig.name), legacy_tmap(orig.args))),
+        c_ast.FuncDecl: (lambda orig: mc.FuncDecl(legacy_tmap(orig.args), legacy_transform(orig.type))),
+        c_ast.FuncDef: (lambda orig: mc.FuncDef(legacy_transform(orig.decl), legacy_tmap(orig.param_decls), legacy_transform(orig.body))),
+        c_ast.ID: (lambda orig: mc.ID(v(orig.name))),
+        c_ast.IdentifierType: (lambda orig: mc.IdentifierType(legacy_tmap(orig.names))),
+        c_ast.If: (lambda orig: mc.If(legacy_transform(orig.cond), legacy_transform(orig.iftrue), legacy_transform(orig.iffalse))),
+        c_ast.InitList: (lambda orig: mc.InitList(legacy_tmap(orig.exprs))),
+        c_ast.NamedInitializer: (lambda orig: mc.NamedInitializer(v(orig.name), legacy_transform(orig.expr))),
+        c_ast.ParamList: (lambda orig: mc.ParamList(legacy_tmap(orig.params))),
+        c_ast.PtrDecl: (lambda orig: mc.PtrDecl(legacy_transform(orig.type))),
+        c_ast.Return: (lambda orig: mc.Return(legacy_transform(orig.expr))),
+        c_ast.TernaryOp: (lambda orig: mc.TernaryOp(legacy_transform(orig.cond), legacy_transform(orig.iftrue), legacy_transform(orig.iffalse))),
+        c_ast.Typename: (lambda orig: mc.Typename(v(orig.name), legacy_transform(orig.type))),
+        c_ast.TypeDecl: (lambda orig: mc.TypeDecl(v(orig.declname), legacy_transform(orig.type))),
+        c_ast.UnaryOp: (lambda orig: legacy_maybe_special_unary(orig)),
+        c_ast.While: (lambda orig: mc.While(legacy_transform(orig.cond), legacy_transform(orig.stmt))),
+        str: (lambda orig: orig),
+        int: (lambda orig: orig),
+        float: (lambda orig: orig),
+        list: (lambda orig: legacy_tmap(orig)),
+    }.get(x.__class__, lambda y: unsupported(y))(x)
+
+# -----------------------------------------------------------------------------
+
+
+def countNodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(child for name, child in node.children())
+    return count
+
+
+# structural comparison of two minic ASTs
+def sameTree(a, b):
+    if isinstance(a, list) or isinstance(b, list):
+        return isinstance(a, list) and isinstance(b, list) and len(a) == len(b) and \
+            all(sameTree(x, y) for x, y in zip(a, b))
+    if not isinstance(a, mc.Node) or not isinstance(b, mc.Node):
+        return a == b
+    if a.__class__ is not b.__class__:
+        return False
+    for attr in a.__slots__:
+        if attr in ('coord', '__weakref__'):
+            continue
+        if not sameTree(getattr(a, attr), getattr(b, attr)):
+            return False
+    return True
+
+
+def throughput(convert, asts, nodes, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        for ast in asts:
+            convert(ast)
+    elapsed = time.perf_counter() - start
+    return nodes * repeat / elapsed
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    inputs = sorted(glob.glob(os.path.join(ROOT, 'project3inputs', '*')))
+    asts = [parseBlockFile(fileName) for fileName in inputs]
+    nodes = sum(countNodes(ast) for ast in asts)
+
+    for fileName, ast in zip(inputs, asts):
+        if not sameTree(legacy_transform(ast), transform(ast)):
+            print("MISMATCH on %s" % os.path.basename(fileName))
+
+    before = throughput(legacy_transform, asts, nodes, repeat)
+    after = throughput(transform, asts, nodes, repeat)
+
+    print("%d inputs, %d pycparser nodes, x%d" % (len(asts), nodes, repeat))
+    print("before (dict of lambdas per call): %10.0f nodes/s" % before)
+    print("after  (Converter dispatch table):  %10.0f nodes/s" % after)
+    print("speedup: %.2fx" % (after / before))
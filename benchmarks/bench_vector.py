@@ -0,0 +1,81 @@
+'''
+Evaluating a translated block over a table of environments: one call of
+the closure evaluator (myfunctional_eval) per row against one call of the
+NumPy evaluator (myfunctional_vector) for the whole table.
+
+Two blocks are measured:
+  - straight: assignments and an if, every row runs the same statements
+  - loop:     a for loop whose number of iterations is a column, the rows
+              run for up to maxIterations iterations and the masked loop
+              runs until the longest one is done
+
+to run, do
+python benchmarks/bench_vector.py [rows ...]
+'''
+
+import os
+import sys
+import time
+
+import numpy
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from block_translator import translateBlock
+from myfunctional_eval import compileFunction
+from myfunctional_vector import compileVector
+
+
+STRAIGHT = '''
+x = a * 3 + b;
+y = x - (a << 2);
+if (x > y) {
+    z = x % 7;
+} else {
+    z = y / 3;
+}
+w = z * z + x * y;
+'''
+
+LOOP = '''
+s = 0;
+for (i = 0; i < n; i++) {
+    if (i % 3 == 0) {
+        s += i * k;
+    } else {
+        s -= 1;
+    }
+}
+'''
+
+
+def columns(name, rows, maxIterations=50):
+    generator = numpy.random.RandomState(0)
+    if name == 'straight':
+        return {'a': generator.randint(-1000, 1000, rows), 'b': generator.randint(-1000, 1000, rows)}
+    return {'n': generator.randint(0, maxIterations, rows), 'k': generator.randint(-10, 10, rows)}
+
+
+if __name__ == '__main__':
+    sizes = [int(size) for size in sys.argv[1:]] or [1000, 10000, 100000]
+
+    print("%10s %10s %14s %14s %10s %8s" % ("block", "rows", "per row (s)", "vector (s)", "speedup", "same"))
+    for name, text in (('straight', STRAIGHT), ('loop', LOOP)):
+        simplifiedAST = translateBlock(text)[1]
+        scalar = compileFunction(simplifiedAST)
+        vector = compileVector(simplifiedAST)
+        for rows in sizes:
+            table = columns(name, rows)
+            start = time.perf_counter()
+            results = vector(table)
+            vectorTime = time.perf_counter() - start
+
+            start = time.perf_counter()
+            same = True
+            for row in range(rows):
+                result = scalar(dict((column, int(values[row])) for column, values in table.items()))
+                same = same and all(result[variable] == results[variable][row] for variable in result)
+            scalarTime = time.perf_counter() - start
+            print("%10s %10d %14.3f %14.3f %10.1f %8s" % (name, rows, scalarTime, vectorTime,
+                                                        scalarTime / vectorTime, same))
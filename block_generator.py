@@ -0,0 +1,272 @@
+'''
+Seeded generator of synthetic C code blocks for stress and scaling runs.
+
+The blocks only use the part of C the translator supports: declarations,
+assignments with every assignment operator, ++ and -- statements, nested
+if/else, while, do while and for statements, array references, function
+calls and ?: expressions. The same seed and knobs always give the same
+blocks.
+
+Knobs (see BlockGenerator):
+  - statements: number of statements of a block, the statements inside
+                compound statements included
+  - depth:      deepest nesting of compound statements
+  - variables:  size of the pool of scalar variables, declarations add
+                variables local to their compound statement
+  - arrays:     share (0 to 1) of the variable references that are array
+                references
+
+A do while is lowered to its body followed by a while loop, so each level
+of do while nesting doubles the size of the translation. Their nesting is
+capped by maxDoDepth.
+
+The blocks can be written to files or translated straight away, in memory,
+through the batch pipeline (see batch_translate.translateBlocks).
+
+to run, do
+python block_generator.py -n 10 --statements 500 -o generated
+python block_generator.py -n 100 --seed 7 --depth 4 --translate -o results.jsonl
+'''
+
+import argparse
+import os
+import random
+import sys
+
+
+ASSIGNMENT_OPERATORS = ('=', '+=', '-=', '*=', '/=', '%=', '<<=', '>>=', '&=', '|=', '^=')
+BINARY_OPERATORS = ('+', '-', '*', '/', '%', '<', '>', '<=', '>=', '==', '!=', '&&', '||',
+                    '&', '|', '^', '<<', '>>')
+COMPARISONS = ('<', '>', '<=', '>=', '==', '!=')
+UNARY_OPERATORS = ('-', '!', '~')
+FUNCTIONS = ('f', 'g', 'h')
+
+# statement kind -> relative weight, compound kinds are only picked while
+# the nesting depth and the statement budget allow them
+WEIGHTS = (
+    ('assign', 8),
+    ('increment', 2),
+    ('decl', 2),
+    ('call', 1),
+    ('if', 2),
+    ('while', 1),
+    ('do', 1),
+    ('for', 1),
+)
+COMPOUND_KINDS = ('if', 'while', 'do', 'for')
+
+
+class BlockGenerator(object):
+    # seed:        seed of the random generator
+    # statements:  statements per block
+    # depth:       deepest nesting of compound statements
+    # variables:   number of scalar variables the blocks share
+    # arrays:      share of the variable references that are array references
+    # exprDepth:   deepest nesting of operators in an expression
+    # maxDoDepth:  deepest nesting of do while statements
+    def __init__(self, seed=0, statements=50, depth=3, variables=8, arrays=0.2, exprDepth=3, maxDoDepth=3):
+        self.random = random.Random(seed)
+        self.statements = statements
+        self.depth = depth
+        self.variables = ['v%d' % i for i in range(max(1, variables))]
+        self.arrays = ['a%d' % i for i in range(max(1, variables // 4))]
+        self.arrayShare = arrays
+        self.exprDepth = exprDepth
+        self.maxDoDepth = maxDoDepth
+        self.declared = 0
+
+    # C text of a new block
+    def block(self):
+        self.declared = 0
+        lines = []
+        self.statementList(self.statements, list(self.variables), 0, 0, lines)
+        return '\n'.join(lines)
+
+    # append count statements, nested level deep, to lines
+    #   scope: variables visible to the statements, declarations add to it
+    def statementList(self, count, scope, level, doDepth, lines):
+        indent = '    ' * level
+        while count > 0:
+            kind = self.statementKind(count, level, doDepth)
+            if kind in COMPOUND_KINDS:
+                # the statement itself and between one and half of the rest in its body
+                inner = self.random.randint(1, max(1, (count - 1) // 2)) if count > 1 else 0
+                self.compound(kind, inner, list(scope), level, doDepth, lines)
+                count -= 1 + inner
+            else:
+                lines.append(indent + self.simpleStatement(kind, scope))
+                count -= 1
+
+    def statementKind(self, count, level, doDepth):
+        kinds = []
+        for kind, weight in WEIGHTS:
+            if kind in COMPOUND_KINDS:
+                if level >= self.depth or count < 2:
+                    continue
+                if kind == 'do' and doDepth >= self.maxDoDepth:
+                    continue
+            kinds.append((kind, weight))
+        total = sum(weight for kind, weight in kinds)
+        pick = self.random.uniform(0, total)
+        for kind, weight in kinds:
+            pick -= weight
+            if pick <= 0:
+                return kind
+        return kinds[-1][0]
+
+    def simpleStatement(self, kind, scope):
+        if kind == 'assign':
+            op = self.random.choice(ASSIGNMENT_OPERATORS)
+            return '%s %s %s;' % (self.lvalue(scope), op, self.expression(scope, self.exprDepth))
+        if kind == 'increment':
+            target = self.lvalue(scope)
+            return self.random.choice(('%s++;', '%s--;', '++%s;', '--%s;')) % target
+        if kind == 'decl':
+            name = 't%d' % self.declared
+            self.declared += 1
+            if self.random.random() < 0.7:
+                text = 'int %s = %s;' % (name, self.expression(scope, self.exprDepth))
+            else:
+                text = 'int %s;' % name
+            scope.append(name)
+            return text
+        return '%s = %s;' % (self.lvalue(scope), self.call(scope, self.exprDepth))
+
+    # append a compound statement of kind with inner statements in its body
+    def compound(self, kind, inner, scope, level, doDepth, lines):
+        indent = '    ' * level
+        counter = self.random.choice(scope)
+        if kind == 'if':
+            lines.append(indent + 'if (%s) {' % self.condition(scope))
+            elseCount = self.random.randint(0, inner // 2) if inner > 1 else 0
+            self.statementList(inner - elseCount, list(scope), level + 1, doDepth, lines)
+            if elseCount:
+                lines.append(indent + '} else {')
+                self.statementList(elseCount, list(scope), level + 1, doDepth, lines)
+            lines.append(indent + '}')
+        elif kind == 'while':
+            lines.append(indent + 'while (%s < %s) {' % (counter, self.expression(scope, 1)))
+            self.statementList(inner, list(scope), level + 1, doDepth, lines)
+            lines.append(indent + '    %s++;' % counter)
+            lines.append(indent + '}')
+        elif kind == 'do':
+            lines.append(indent + 'do {')
+            self.statementList(inner, list(scope), level + 1, doDepth + 1, lines)
+            lines.append(indent + '    %s--;' % counter)
+            lines.append(indent + '} while (%s > %s);' % (counter, self.expression(scope, 1)))
+        else:
+            lines.append(indent + 'for (%s = 0; %s < %s; %s++) {' % (
+                counter, counter, self.expression(scope, 1), counter))
+            self.statementList(inner, list(scope), level + 1, doDepth, lines)
+            lines.append(indent + '}')
+
+    def lvalue(self, scope):
+        if self.random.random() < self.arrayShare:
+            return self.arrayRef(scope, 1)
+        return self.random.choice(scope)
+
+    def arrayRef(self, scope, depth):
+        return '%s[%s]' % (self.random.choice(self.arrays), self.expression(scope, min(depth, 1)))
+
+    def call(self, scope, depth):
+        args = [self.expression(scope, depth - 1) for i in range(self.random.randint(0, 3))]
+        return '%s(%s)' % (self.random.choice(FUNCTIONS), ', '.join(args))
+
+    def condition(self, scope):
+        return '%s %s %s' % (self.expression(scope, 1), self.random.choice(COMPARISONS),
+                             self.expression(scope, 1))
+
+    # an expression with at most depth nested operators
+    def expression(self, scope, depth):
+        pick = self.random.random()
+        if depth <= 0 or pick < 0.35:
+            return self.operand(scope)
+        if pick < 0.8:
+            return '%s %s %s' % (self.expression(scope, depth - 1), self.random.choice(BINARY_OPERATORS),
+                                 self.parenthesized(scope, depth - 1))
+        if pick < 0.87:
+            return '%s%s' % (self.random.choice(UNARY_OPERATORS), self.parenthesized(scope, depth - 1))
+        if pick < 0.94:
+            return '(%s) ? %s : %s' % (self.condition(scope), self.parenthesized(scope, depth - 1),
+                                       self.parenthesized(scope, depth - 1))
+        return self.call(scope, depth)
+
+    # an expression that can follow an operator, '-' followed by '-x' would be a decrement
+    def parenthesized(self, scope, depth):
+        text = self.expression(scope, depth)
+        if ' ' in text or text[0] in UNARY_OPERATORS:
+            return '(' + text + ')'
+        return text
+
+    def operand(self, scope):
+        pick = self.random.random()
+        if pick < 0.3:
+            return str(self.random.randint(0, 100))
+        if pick < 0.3 + 0.7 * self.arrayShare:
+            return self.arrayRef(scope, 0)
+        return self.random.choice(scope)
+
+
+# (name, C text) of count blocks made by a BlockGenerator with the given knobs
+def generateBlocks(count, seed=0, prefix='generated', **knobs):
+    generator = BlockGenerator(seed, **knobs)
+    for i in range(count):
+        yield '%s_%d' % (prefix, i), generator.block()
+
+
+# write the blocks to files named after them in directory, returns their paths
+def writeBlocks(blocks, directory):
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    paths = []
+    for name, text in blocks:
+        path = os.path.join(directory, name)
+        f = open(path, 'w')
+        f.write(text)
+        f.close()
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    argParser = argparse.ArgumentParser(description='Generate synthetic C code blocks.')
+    argParser.add_argument('-n', '--count', type=int, default=1, help='number of blocks')
+    argParser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+    argParser.add_argument('--statements', type=int, default=50, help='statements per block')
+    argParser.add_argument('--depth', type=int, default=3, help='deepest nesting of compound statements')
+    argParser.add_argument('--variables', type=int, default=8, help='size of the variable pool')
+    argParser.add_argument('--arrays', type=float, default=0.2, help='share of array references')
+    argParser.add_argument('--prefix', default='generated', help='name of the blocks (and files)')
+    argParser.add_argument('-o', '--output',
+                           help='directory to write the blocks to, or with --translate the json records file; '
+                                'the blocks are printed when not given')
+    argParser.add_argument('--translate', action='store_true',
+                           help='translate the blocks in memory and write one json record per block')
+    argParser.add_argument('-j', '--jobs', type=int, default=1, help='worker processes used with --translate')
+    args = argParser.parse_args(argv)
+
+    blocks = generateBlocks(args.count, args.seed, args.prefix, statements=args.statements,
+                            depth=args.depth, variables=args.variables, arrays=args.arrays)
+
+    if args.translate:
+        from batch_translate import translateBlocks
+
+        out = open(args.output, 'w') if args.output else sys.stdout
+        try:
+            failed = translateBlocks(list(blocks), out, jobs=args.jobs)
+        finally:
+            if args.output:
+                out.close()
+        sys.stderr.write('%d blocks, %d failed\n' % (args.count, failed))
+        return 1 if failed else 0
+
+    if args.output:
+        writeBlocks(blocks, args.output)
+    else:
+        for name, text in blocks:
+            sys.stdout.write('// %s\n%s\n\n' % (name, text))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
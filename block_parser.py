@@ -0,0 +1,118 @@
+'''
+Parse a raw C code block without going through the file system.
+
+makeDummyCFile writes a '<input>Dummy' file next to the input and parse_file
+then forks the C preprocessor on it before pycparser ever sees the code.
+The functions below build the same block_function wrapper in memory and
+hand the text straight to pycparser's CParser.
+
+The preprocessor is still available for blocks that really contain
+directives: with usePreprocessor=True the wrapped text is piped to cpp
+through stdin, so no temporary file is written either way.
+
+Building a CParser compiles the lexer and loads the parser tables, so
+parsers are kept warm in a ParserPool and reused between blocks. A CParser
+is not safe to share between threads, the pool hands each caller its own.
+'''
+
+import subprocess
+import threading
+from contextlib import contextmanager
+
+from pycparser import c_parser
+
+from pipeline_timings import NULL_TIMER
+
+
+BLOCK_HEADER = "int* block_function(){\n"
+BLOCK_FOOTER = "    return 0;\n}"
+
+
+class ParserPool(object):
+    # maxIdle: number of idle parsers kept around, None keeps all of them
+    def __init__(self, maxIdle=None):
+        self.maxIdle = maxIdle
+        self.idle = []
+        self.lock = threading.Lock()
+
+    # take an idle parser, or build a new one when all of them are in use
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return c_parser.CParser()
+
+    # give a parser back to the pool
+    def release(self, parser):
+        with self.lock:
+            if self.maxIdle is None or len(self.idle) < self.maxIdle:
+                self.idle.append(parser)
+
+    @contextmanager
+    def parser(self):
+        parser = self.acquire()
+        try:
+            yield parser
+        finally:
+            self.release(parser)
+
+    # build count parsers up front so the first blocks do not pay for them
+    def warm(self, count=1):
+        parsers = [self.acquire() for i in range(count)]
+        for parser in parsers:
+            self.release(parser)
+
+
+# parsers shared by every caller in this process
+parserPool = ParserPool()
+
+
+# wrap raw C code into a simple c function, same layout as makeDummyCFile
+def wrapBlock(text):
+    lines = text.split('\n')
+    return BLOCK_HEADER + ''.join("    " + line + "\n" for line in lines) + BLOCK_FOOTER
+
+
+# run the C preprocessor on text given through stdin
+def preprocess(text, cppPath='cpp', cppArgs=None):
+    command = [cppPath] + list(cppArgs or []) + ['-']
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   universal_newlines=True)
+    except OSError as e:
+        raise RuntimeError("Unable to invoke 'cpp'.  " +
+                           'Make sure its path was passed correctly\n' +
+                           ('Original error: %s' % e))
+    output, _ = process.communicate(text)
+    return output
+
+
+# parse a raw C code block (the content of an input file) into a pycparser AST
+#   text:            the C statements of the block
+#   usePreprocessor: pipe the wrapped block through cpp before parsing
+#   parser:          CParser to use, one is borrowed from parserPool when none is given
+#   timer:           PhaseTimer recording the wrap, preprocess and parse phases
+def parseBlock(text, usePreprocessor=False, parser=None, filename='<block>', timer=NULL_TIMER):
+    with timer.phase('wrap', text) as phase:
+        wrapped = phase.result = wrapBlock(text)
+    if usePreprocessor:
+        with timer.phase('preprocess', wrapped) as phase:
+            wrapped = phase.result = preprocess(wrapped)
+    if parser is None:
+        with parserPool.parser() as parser:
+            return parseWrapped(parser, wrapped, filename, timer)
+    return parseWrapped(parser, wrapped, filename, timer)
+
+
+def parseWrapped(parser, wrapped, filename, timer):
+    with timer.phase('parse', wrapped) as phase:
+        ast = phase.result = parser.parse(wrapped, filename)
+    return ast
+
+
+# read a C code block from a file and parse it in memory
+def parseBlockFile(fileName, usePreprocessor=False, parser=None):
+    f = open(fileName, 'r')
+    text = f.read()
+    f.close()
+    return parseBlock(text, usePreprocessor, parser, fileName)
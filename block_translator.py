@@ -0,0 +1,94 @@
+'''
+Translation pipeline shared by the library entry points.
+
+    C block text -> pycparser AST -> minic AST -> myfunctional_ast6 -> simplified
+
+Parsers come from a ParserPool so a process translating many blocks builds
+its CParser once and reuses it for every block. Given a NodeTable the
+functional ASTs are interned in it (see myfunctional_intern), blocks
+translated with the same table then also share their common subtrees.
+
+Given a PhaseTimer (see pipeline_timings) every step of the pipeline is
+timed and the sizes of its input and output are recorded.
+'''
+
+from block_parser import parseBlock, parserPool
+from pyminicMaster.c_ast_to_minic import transform
+from checkin6simp import minicToFunctional, simplify
+from myfunctional_printer import functionalToString
+from pipeline_timings import PhaseTimer, NULL_TIMER
+
+
+# translate one C code block
+# returns the functional AST and its simplified version (None when
+# simplifyOutput is False)
+#   nodeTable: NodeTable to intern both ASTs in, None keeps the mutable nodes
+#   timer:     PhaseTimer recording the phases of the translation
+def translateBlock(text, usePreprocessor=False, simplifyOutput=True, pool=None, filename='<block>',
+                   nodeTable=None, timer=NULL_TIMER):
+    if pool is None:
+        pool = parserPool
+
+    with pool.parser() as parser:
+        ast = parseBlock(text, usePreprocessor, parser, filename, timer)
+
+    with timer.phase('transform', ast) as phase:
+        minicAst = phase.result = transform(ast)
+    with timer.phase('translate', minicAst) as phase:
+        functionalAST = phase.result = minicToFunctional(minicAst, [], [], 1)
+    if nodeTable is not None:
+        with timer.phase('intern', functionalAST) as phase:
+            functionalAST = phase.result = nodeTable.intern(functionalAST)
+
+    simplifiedAST = None
+    if simplifyOutput:
+        with timer.phase('simplify', functionalAST) as phase:
+            simplifiedAST = phase.result = simplify(functionalAST)
+        if nodeTable is not None:
+            with timer.phase('intern', simplifiedAST) as phase:
+                simplifiedAST = phase.result = nodeTable.intern(simplifiedAST)
+    return functionalAST, simplifiedAST
+
+
+# translate the C code block stored in fileName
+def translateFile(fileName, usePreprocessor=False, simplifyOutput=True, pool=None, nodeTable=None,
+                  timer=NULL_TIMER):
+    with timer.phase('read') as phase:
+        f = open(fileName, 'r')
+        text = phase.result = f.read()
+        f.close()
+    return translateBlock(text, usePreprocessor, simplifyOutput, pool, fileName, nodeTable, timer)
+
+
+# translate one input file into a result record that can be dumped as json
+#   input:      name of the input file
+#   ok:         False when the block could not be translated
+#   output:     functional programming version of the block
+#   simplified: simplified functional programming version of the block
+#   error:      why the translation failed
+#   timings:    with timings=True, the phases of the translation (see
+#               PhaseTimer.record), also when it failed
+# Given text, the block is translated from it in memory and fileName only
+# names the record.
+def translateRecord(fileName, usePreprocessor=False, simplifyOutput=True, pool=None, timings=False,
+                    text=None):
+    record = {'input': fileName, 'ok': False}
+    timer = PhaseTimer() if timings else NULL_TIMER
+    try:
+        if text is None:
+            functionalAST, simplifiedAST = translateFile(fileName, usePreprocessor, simplifyOutput, pool,
+                                                         timer=timer)
+        else:
+            functionalAST, simplifiedAST = translateBlock(text, usePreprocessor, simplifyOutput, pool,
+                                                          fileName, timer=timer)
+        with timer.phase('render', functionalAST) as phase:
+            record['output'] = phase.result = functionalToString(functionalAST)
+        if simplifyOutput:
+            with timer.phase('render simplified', simplifiedAST) as phase:
+                record['simplified'] = phase.result = functionalToString(simplifiedAST, storedLevels=True)
+        record['ok'] = True
+    except Exception as e:
+        record['error'] = '%s: %s' % (e.__class__.__name__, e)
+    if timings:
+        record['timings'] = timer.record()
+    return record
@@ -13,22 +13,31 @@ Then print the simplified functional programming equivalent of the C code
 # example of how to run this script
 # python checkin_test.py /Users/abc/Desktop/project3inputs/checkin3_input1
 
-from pycparser import parse_file
 from pycparser.c_ast import *
 sys.path.extend(['.', '..'])
 
 from pyminicMaster.minic.minic_ast import *
 from pyminicMaster.c_ast_to_minic import * 
-import os
+import copy
+import json
 
 import myfunctional_ast6 as my
+from myfunctional_printer import functionalToString
+from myfunctional_compact import toCompact
+from myfunctional_intern import Interned
+from translation_cache import scriptCache
+from pipeline_timings import PhaseTimer, NULL_TIMER
+from block_parser import wrapBlock, parseBlock
+from constant_folding import INT, literal, truth, foldBinary, foldUnary, foldConditional
 
 
 class LHSPrinter(NodeVisitor):
     def __init__(self):
-        self.varLst = set()  # all variables seen in the code
-        self.lhsVar = set()  # variables that have values assigned to it
-        self.declaredVar = set() # all declared variables
+        # dicts used as insertion ordered sets, so the variables keep the
+        # order they are met in
+        self.varLst = {}  # all variables seen in the code
+        self.lhsVar = {}  # variables that have values assigned to it
+        self.declaredVar = {} # all declared variables
 
     def __str__(self):
         allVarTuple = ()
@@ -36,7 +45,7 @@ class LHSPrinter(NodeVisitor):
 
         # use difference between all variables list and declared variable list 
         # to find all non-declared variables
-        nonDeclaredVars = self.varLst.difference(self.declaredVar)
+        nonDeclaredVars = [var for var in self.varLst if var not in self.declaredVar]
         
         return 'func block_function' +'(' + ','.join(map(str, nonDeclaredVars)) + ')' + " return " + '[' + ','.join(map(str, self.lhsVar)) + ']'
 
@@ -44,22 +53,22 @@ class LHSPrinter(NodeVisitor):
     
     def visit_Decl(self, decl):
         if decl.init is not None:
-            self.lhsVar.add(decl.name)
-            self.varLst.add(decl.name)
-            self.declaredVar.add(decl.name)
+            self.lhsVar[decl.name] = None
+            self.varLst[decl.name] = None
+            self.declaredVar[decl.name] = None
             self.visit(decl.init)
         else:
             if not isinstance(decl.type, FuncDecl):
-                self.varLst.add(decl.name)
-                self.declaredVar.add(decl.name)
+                self.varLst[decl.name] = None
+                self.declaredVar[decl.name] = None
 
     def visit_Assignment(self, assignment):
         # get all left hand side variables as written variables
         
         if isinstance(assignment.lvalue, ID):
             varName = assignment.lvalue.name
-            self.varLst.add(varName)
-            self.lhsVar.add(varName) 
+            self.varLst[varName] = None
+            self.lhsVar[varName] = None 
             
         if isinstance(assignment.lvalue, ArrayRef):
             arrayRef = assignment.lvalue
@@ -89,8 +98,8 @@ class LHSPrinter(NodeVisitor):
         if getArrayName:  
             # add variable to the set of modified variables
             # if other statements says it is on the left hand side
-            self.lhsVar.add(id.name)
-        self.varLst.add(id.name)
+            self.lhsVar[id.name] = None
+        self.varLst[id.name] = None
         
     def visit_FuncCall(self, funcCall):
         # visit each of the argument in the function
@@ -118,86 +127,163 @@ class LHSPrinter(NodeVisitor):
         
     def get_DeclaredVar(self):
         return self.declaredVar
-                
-# wrap raw C code into a simple c function
-def makeDummyCFile(file):
-    
-    # read file
-    f = open(file, 'r')
-    input = f.read().split('\n')
-    f.close()
-    
-    # add indentation
-    newInput = "";
-    for line in input:
-        newInput += "    " + line + "\n"
-        
-    fileName, file_extension = os.path.splitext(file)  
-    fileName +=  'Dummy' + file_extension
-        
-    f = open(fileName, 'w')
-    f.write("int* block_function(){\n" + newInput + "    return 0;\n}")
-    f.close()
-    
-    return str(fileName)
+
+
+#------------------------ read / write sets -----------------------------------
+'''
+LHSPrinter walks the whole subtree it is given, and the translator used to
+run one at every if and loop, so nested statements were rescanned once per
+nesting level. VarSets computes the same sets for every statement of the
+AST in one bottom-up pass and keeps them in a side table keyed by node, so
+the translator looks them up instead.
+
+The sets are dicts used as insertion ordered sets: variables appear in the
+order LHSPrinter first meets them. The translation keeps that order (see
+uniqueVars), so the same block always gives the same output, whatever the
+hash seed of the process.
+'''
+
+class NodeVars(object):
+    __slots__ = ('variables', 'written', 'declared', 'read')
+
+    def __init__(self):
+        self.variables = {}  # all variables seen in the code
+        self.written = {}    # variables that have values assigned to it
+        self.declared = {}   # all declared variables
+        self.read = {}       # variables whose value is used
+
+    def update(self, other):
+        self.variables.update(other.variables)
+        self.written.update(other.written)
+        self.declared.update(other.declared)
+        self.read.update(other.read)
+
+
+# statements whose sets are kept in the side table
+STATEMENT_NODES = (Decl, Assignment, If, While, DoWhile, For, Block, Return, FuncDef, FileAST)
+
+
+# the variables of orderedVars without repeats, in the order they first appear
+def uniqueVars(orderedVars):
+    return list(dict.fromkeys(orderedVars))
+
+
+# parameters (variables used but not declared) and returned variables
+# (variables written) of the function of a block whose sets are fileVars
+def functionHeader(fileVars):
+    nonDeclaredVars = [var for var in fileVars.variables if var not in fileVars.declared]
+    lhsVar = list(fileVars.written)
+    return nonDeclaredVars, lhsVar
+
+
+class VarSets(NodeVisitor):
+    def __init__(self):
+        self.table = {}         # node -> NodeVars
+        self.current = None     # NodeVars of the statement being collected
+
+    # sets of node, computed (and kept for its statements) on first use
+    def of(self, node):
+        nodeVars = self.table.get(node)
+        if nodeVars is None:
+            outer = self.current
+            self.current = NodeVars()
+            NodeVisitor.visit(self, node)
+            nodeVars = self.current
+            self.table[node] = nodeVars
+            self.current = outer
+        return nodeVars
+
+    # the single pass over a whole AST
+    analyze = of
+
+    def visit(self, node):
+        # statements already seen are not walked again
+        if isinstance(node, STATEMENT_NODES):
+            self.current.update(self.of(node))
+        else:
+            NodeVisitor.visit(self, node)
+
+    def visit_Decl(self, decl):
+        current = self.current
+        if decl.init is not None:
+            current.written[decl.name] = None
+            current.variables[decl.name] = None
+            current.declared[decl.name] = None
+            self.visit(decl.init)
+        else:
+            if not isinstance(decl.type, FuncDecl):
+                current.variables[decl.name] = None
+                current.declared[decl.name] = None
+
+    def visit_Assignment(self, assignment):
+        if isinstance(assignment.lvalue, ID):
+            varName = assignment.lvalue.name
+            self.current.variables[varName] = None
+            self.current.written[varName] = None
+
+        if isinstance(assignment.lvalue, ArrayRef):
+            self.visit_ArrayRef(assignment.lvalue, True)
+
+        self.visit(assignment.rvalue)
+
+    def visit_BinaryOp(self, binaryOp):
+        self.visit(binaryOp.left)
+        self.visit(binaryOp.right)
+
+    def visit_ID(self, id, getArrayName = False):
+        # an array written element by element keeps its other elements,
+        # so it is read as well
+        if getArrayName:
+            self.current.written[id.name] = None
+        self.current.variables[id.name] = None
+        self.current.read[id.name] = None
+
+    def visit_FuncCall(self, funcCall):
+        if funcCall.args is not None:
+            for exprs, child in funcCall.args.children():
+                self.visit(child)
+
+    def visit_ArrayRef(self, arrayRef, getArrayName = False):
+        if isinstance(arrayRef.name, ID):
+            self.visit_ID(arrayRef.name, getArrayName)
+        elif isinstance(arrayRef.name, ArrayRef):
+            self.visit_ArrayRef(arrayRef.name, getArrayName)
+        else:
+            self.visit(arrayRef.name)
+        self.visit(arrayRef.subscript)
 
 
 # ------------------------ Checkin 3 starts here -------------------------------
 
 
-# blockItemLst: list of statements to be read in the block
+# blockItemLst: list (or StatementCursor) of statements to be read in the block
 # returnLst:    list of availiable bindings
-def minicToFunctional(ast, blockItemLst, returnLst, level = 0):
+# varSets:      read/write sets of the statements (VarSets), shared by the
+#               whole translation of an AST
+def minicToFunctional(ast, blockItemLst, returnLst, level = 0, varSets = None):
 
     if isinstance(ast, FileAST):
+        # compute the read/write sets of every statement once
+        varSets = VarSets()
+        fileVars = varSets.analyze(ast)
+
         statement = None
         blockItems = ast.ext[0].body.block_items
 
         statementCount = len(blockItems)
         for i in range(statementCount):
-            statement = minicToFunctional(blockItems[i], blockItems[i+1:], [], level)
+            statement = minicToFunctional(blockItems[i], StatementCursor(blockItems, i+1), [], level, varSets)
             if statement is not None:
                 break
                   
-        visitorF = LHSPrinter()
-        visitorF.visit(ast)
-        nonDeclaredVars = visitorF.varLst.difference(visitorF.declaredVar)
-        lhsVar = [var for var in visitorF.get_LHSVar()]
+        nonDeclaredVars, lhsVar = functionHeader(fileVars)
         
         return my.FuncDef(nonDeclaredVars, statement, lhsVar)
     
     
-    # filters and convert declaration statement to let ... = ... in ...
-    if isinstance(ast, Decl):   
-        if ast.init is not None:
-            init = minicToFunctional(ast.init, [], returnLst, level + 1)
-            if not blockItemLst:
-                body = returnLst
-            else:
-                body = minicToFunctional(blockItemLst[0], blockItemLst[1:], returnLst + [ast.name], level + 1)
-            
-            return my.Let(ast.name, init, body, level)
-        else:
-            if not blockItemLst:
-                return returnLst
-            else:
-                return minicToFunctional(blockItemLst[0], blockItemLst[1:], returnLst, level)
-            
-    # convert assignment statement to let ... = ... in ...
-    if isinstance(ast, Assignment):
-        identifier = minicToFunctional(ast.lvalue, [], returnLst)
-
-        rv = minicToFunctional(ast.rvalue, [], returnLst, level + 1)
-
-        if not blockItemLst:
-            body = returnLst
-        else:
-            var = identifier
-            while isinstance(var, my.ArrayRef):
-                var = var.name
-                
-            body = minicToFunctional(blockItemLst[0], blockItemLst[1:], returnLst + [var], level + 1)
-        return my.Let(identifier, rv, body, level)
+    # statements that bind variables for the statements following them
+    if isinstance(ast, (Decl, Assignment, If, While, DoWhile, For)):
+        return statementsToFunctional(ast, blockItemLst, returnLst, level, varSets)
         
     if isinstance(ast, ID):
         # structure used to store name of variable
@@ -210,7 +296,7 @@ def minicToFunctional(ast, blockItemLst, returnLst, level = 0):
     if isinstance(ast, Return):
         # C code's block end here.
         # return the list of modified variables in the code block
-        return list(set(str(element) for element in returnLst))
+        return uniqueVars(str(element) for element in returnLst)
 
     if isinstance(ast, BinaryOp):
         # convert a binary expression to functional programming
@@ -257,44 +343,6 @@ def minicToFunctional(ast, blockItemLst, returnLst, level = 0):
         # convert something like a[1,2,b[1]] to functional programming
         exprs = [minicToFunctional(expr, [], returnLst) for expr in ast.exprs]
         return my.ExprList(exprs)
-        
-    # ---------------- Checkin 4 starts here -----------------------------------
-    if isinstance(ast, If):
-        # get all the written variables
-        visitor1 = LHSPrinter()
-        visitor1.visit(ast.iftrue)
-        
-        # determine all written variables in if and else
-        if ast.iffalse is None:
-            allLhs = list(visitor1.get_LHSVar())
-        else:
-            visitor2 = LHSPrinter()
-            visitor2.visit(ast.iffalse)
-            
-            # add the variables together
-            allLhs = list( visitor1.get_LHSVar().union(visitor2.get_LHSVar()) )
-        
-        iftrue = minicToFunctional(ast.iftrue,[],allLhs, level + 2) 
-        
-        if ast.iffalse is None:
-            iffalse = my.ReturnTuples(tuple(allLhs), level + 2)    # make the else statement when it doesn't exist
-        else:
-            # convert else statement to Let
-            iffalse = minicToFunctional(ast.iffalse,[],allLhs, level + 2)  
-            
-        cond = minicToFunctional(ast.cond,[],[])
-        
-        ternary = my.TernaryOp(cond, iftrue, iffalse, level + 1)
-        
-
-        if not blockItemLst:
-            body = my.ReturnTuples(returnLst, level + 1)
-        else:
-            body = minicToFunctional(blockItemLst[0], blockItemLst[1:], returnLst + allLhs, level + 1)
-        
-        letStatement = my.Let(tuple(allLhs), ternary, body, level)
-        
-        return letStatement
 
     if isinstance(ast, Block):
         # handles compound statements for iftrue and iffalse
@@ -307,61 +355,221 @@ def minicToFunctional(ast, blockItemLst, returnLst, level = 0):
 
         statementCount = len(blockItems)
         for i in range(statementCount):
-            statement = minicToFunctional(blockItems[i], blockItems[i+1:], returnLst, level)
+            statement = minicToFunctional(blockItems[i], StatementCursor(blockItems, i+1), returnLst, level, varSets)
             if statement is not None:
                 break
         return statement
     
-    
-    # ------------------------ Checkin 6 starts here ---------------------------        
-    if isinstance(ast, While):
-        # Find all the modified variables in the loop using the visitor 
-        # implmented above
-        visitorF = LHSPrinter()
-        visitorF.visit(ast)
-        nonDeclaredVars = visitorF.varLst.difference(visitorF.declaredVar)
-        lhsVar = tuple([var for var in visitorF.get_LHSVar()])
-        
-        # translate the statements in the loop to functional programming
-        assignedStatements = minicToFunctional(ast.stmt, [], [], level + 3)
-        
-        # make the recusive call for let rec
-        recursiveCall = my.LetrecCall('loop', lhsVar, level + 3)     
-        
-        # takes the statements in the loop as assigned expression and calls on
-        # the let rec function in the body   
-        recursiveLet = my.Let(lhsVar, assignedStatements, recursiveCall, level + 2)
-        
-        cond = minicToFunctional(ast.cond, [], [])
-        ifStatement = my.TernaryOp(cond, recursiveLet, lhsVar, level + 1)        
+    return None
 
-        newReturnLst = returnLst + list(lhsVar) 
-        body = minicToFunctional(blockItemLst[0], blockItemLst[1:], newReturnLst, level + 1)
-        statement = my.Letrec('loop', lhsVar, ifStatement, body, level)
-        return statement
-    
-    if isinstance(ast, DoWhile):
-        # convert Dowhile to statments + while with statements
-        
-        minicWhile = While(ast.cond, ast.stmt)
-        newBlockItemLst = ast.stmt.block_items + [minicWhile] + blockItemLst
-        return minicToFunctional(newBlockItemLst[0], newBlockItemLst[1:], returnLst, level)
-        
+
+'''
+Translation of a sequence of statements.
+
+Each statement becomes a let (or let rec) whose body is the translation of
+the statements after it, so translating statement by statement with
+recursive calls needs one Python frame per statement and long blocks hit
+the recursion limit. Instead the statements are walked with a loop: every
+binding statement pushes a frame (its let without the body) on an explicit
+stack, and once the end of the sequence is reached the lets are built from
+the innermost one outwards.
+
+Only blocks nested in if/while/do/for bodies are translated with a
+recursive call, so the Python stack grows with the nesting depth of the C
+code, not with its length.
+
+The statements still to be read are a StatementCursor rather than a list
+slice, and the bindings are appended to a single list, so a block of n
+statements is translated in linear time.
+'''
+
+class StatementCursor(object):
+    '''
+    Immutable view of the statements still to be translated: items from
+    index on, followed by the statements of the cursor rest.
+    next() and prepend() (used to lower do while and for loops) never copy
+    the remaining statements.
+    '''
+    __slots__ = ('items', 'index', 'rest')
+
+    def __init__(self, items, index = 0, rest = None):
+        # skip used up segments, an empty cursor has no rest
+        while index >= len(items) and rest is not None:
+            items, index, rest = rest.items, rest.index, rest.rest
+        self.items = items
+        self.index = index
+        self.rest = rest
+
+    def __bool__(self):
+        return self.index < len(self.items)
+
+    __nonzero__ = __bool__
+
+    # the next statement, IndexError when there is none
+    def first(self):
+        return self.items[self.index]
+
+    # the statements after the first one
+    def next(self):
+        return StatementCursor(self.items, self.index + 1, self.rest)
+
+    # statements put in front of the remaining ones
+    def prepend(self, statements):
+        if self:
+            return StatementCursor(statements, 0, self)
+        return StatementCursor(statements)
+
+
+# translate the statements from ast on into the frames of their lets
+# returns (frames, body, bindings, last):
+#   frames:   (let class, ident, assigned expression, level), outermost first
+#   body:     body of the innermost let
+#   bindings: returnLst followed by the variables bound by the frames
+#   last:     the statement that ended the sequence
+def statementFrames(ast, blockItemLst, returnLst, level = 0, varSets = None):
+    frames = []
+
+    if varSets is None:
+        varSets = VarSets()
+
+    if not isinstance(blockItemLst, StatementCursor):
+        blockItemLst = StatementCursor(blockItemLst)
+    # bindings are appended to a copy, the caller's list is left alone
+    returnLst = list(returnLst)
     
-    if isinstance(ast, For):
-        # convert for loop to init + while with (statements + next)
+    while True:
+        # filters and convert declaration statement to let ... = ... in ...
+        if isinstance(ast, Decl):   
+            if ast.init is not None:
+                init = minicToFunctional(ast.init, [], returnLst, level + 1)
+                frames.append((my.Let, ast.name, init, level))
+
+                if not blockItemLst:
+                    body = returnLst
+                    break
+
+                returnLst.append(ast.name)
+                level = level + 1
+            else:
+                if not blockItemLst:
+                    body = returnLst
+                    break
+
+        # convert assignment statement to let ... = ... in ...
+        elif isinstance(ast, Assignment):
+            identifier = minicToFunctional(ast.lvalue, [], returnLst)
+
+            rv = minicToFunctional(ast.rvalue, [], returnLst, level + 1)
+            frames.append((my.Let, identifier, rv, level))
+
+            if not blockItemLst:
+                body = returnLst
+                break
+
+            var = identifier
+            while isinstance(var, my.ArrayRef):
+                var = var.name
+            
+            returnLst.append(var)
+            level = level + 1
+
+        # ---------------- Checkin 4 starts here -------------------------------
+        elif isinstance(ast, If):
+            # get all the written variables
+            writtenTrue = varSets.of(ast.iftrue).written
+            
+            # determine all written variables in if and else
+            if ast.iffalse is None:
+                allLhs = list(writtenTrue)
+            else:
+                writtenFalse = varSets.of(ast.iffalse).written
+                
+                # add the variables together
+                allLhs = uniqueVars(list(writtenTrue) + list(writtenFalse))
+            
+            iftrue = minicToFunctional(ast.iftrue,[],allLhs, level + 2, varSets) 
+            
+            if ast.iffalse is None:
+                iffalse = my.ReturnTuples(tuple(allLhs), level + 2)    # make the else statement when it doesn't exist
+            else:
+                # convert else statement to Let
+                iffalse = minicToFunctional(ast.iffalse,[],allLhs, level + 2, varSets)  
+                
+            cond = minicToFunctional(ast.cond,[],[])
+            
+            ternary = my.TernaryOp(cond, iftrue, iffalse, level + 1)
+            frames.append((my.Let, tuple(allLhs), ternary, level))
+
+            if not blockItemLst:
+                body = my.ReturnTuples(returnLst, level + 1)
+                break
+            
+            returnLst.extend(allLhs)
+            level = level + 1
+
+        # ------------------------ Checkin 6 starts here -----------------------
+        elif isinstance(ast, While):
+            # Find all the modified variables in the loop, the loop of a
+            # do while or for is new and gets its sets computed here
+            lhsVar = tuple(varSets.of(ast).written)
+            
+            # translate the statements in the loop to functional programming
+            assignedStatements = minicToFunctional(ast.stmt, [], [], level + 3, varSets)
+            
+            # make the recusive call for let rec
+            recursiveCall = my.LetrecCall('loop', lhsVar, level + 3)     
+            
+            # takes the statements in the loop as assigned expression and calls on
+            # the let rec function in the body   
+            recursiveLet = my.Let(lhsVar, assignedStatements, recursiveCall, level + 2)
+            
+            cond = minicToFunctional(ast.cond, [], [])
+            ifStatement = my.TernaryOp(cond, recursiveLet, lhsVar, level + 1)        
+            frames.append((my.Letrec, lhsVar, ifStatement, level))
+
+            returnLst.extend(lhsVar)
+            level = level + 1
         
-        newStmt = Block(ast.stmt.block_items + [ast.next])
-        minicWhile = While(ast.cond, newStmt)
-        newBlockItemLst = [ast.init, minicWhile] + blockItemLst
+        elif isinstance(ast, DoWhile):
+            # convert Dowhile to statments + while with statements
+            
+            minicWhile = While(ast.cond, ast.stmt)
+            blockItemLst = blockItemLst.prepend(ast.stmt.block_items + [minicWhile])
         
-        return minicToFunctional(newBlockItemLst[0], newBlockItemLst[1:], returnLst, level)
-    
-    return None
+        elif isinstance(ast, For):
+            # convert for loop to init + while with (statements + next)
+            
+            newStmt = Block(ast.stmt.block_items + [ast.next])
+            minicWhile = While(ast.cond, newStmt)
+            blockItemLst = blockItemLst.prepend([ast.init, minicWhile])
 
+        else:
+            # the sequence ends on a statement that does not bind anything,
+            # e.g. the return at the end of a block
+            body = minicToFunctional(ast, blockItemLst, returnLst, level, varSets)
+            break
+        
+        # move on to the next statement
+        ast = blockItemLst.first()
+        blockItemLst = blockItemLst.next()
 
+    return frames, body, returnLst, ast
+
+
+# build the lets of frames around body, from the innermost one outwards
+def buildLets(frames, body):
+    for letClass, ident, assignedExpr, letLevel in reversed(frames):
+        if letClass is my.Letrec:
+            body = my.Letrec('loop', ident, assignedExpr, body, letLevel)
+        else:
+            body = my.Let(ident, assignedExpr, body, letLevel)
+    return body
+
+
+def statementsToFunctional(ast, blockItemLst, returnLst, level = 0, varSets = None):
+    frames, body, bindings, last = statementFrames(ast, blockItemLst, returnLst, level, varSets)
+    return buildLets(frames, body)
 
-import copy
 
 #------------------------ Let binding simplification algorithm -----------------
 '''
@@ -372,269 +580,801 @@ If the variable is modified in a loop (let rec), then undo the simplification
 for this variable.
 
 Then do the simplification for the body expression as well.
+
+The operators whose operands are constants once the variables are replaced
+are folded (see constant_folding and foldOperator) in the same walk, so a
+variable assigned an expression of constants is a constant too and its let
+goes away as well.
+
+An if whose condition is a constant keeps the branch it takes only: the
+lets of the branch take the place of the if (see spliceBranch) and the
+constants they bind are replaced after it. A loop whose condition is false
+when it is reached is dropped, its variables keep their values. The
+conditions also see the variables assigned to a constant whose let is kept
+because a loop after them modifies them.
+
+The functional ASTs are never modified once they are built, so simplify does
+not copy them: a node is only rebuilt (see rebuild) when one of its children
+changed, every unchanged subtree is shared with the input.
+
+simplify walks the AST once. The constants that still have to be replaced
+are carried down in an environment (variable name -> Constant) instead of
+running a replacement over the rest of the block for each of them. Whether a
+let rec modifies the variable is answered by the argument sets of LetrecArgs,
+computed once per node.
 '''
 
-def simplify(ast):
-    newAst = copy.deepcopy(ast)
-    
-    if isinstance(newAst, my.FuncDef):
-        # prototype don't need simplification, but its body does
-        newAst.body = simplify(newAst.body)
-        return newAst
-        
-    if isinstance(newAst, my.Let):        
-        # simplify variables that are assigned to constant
-        if isinstance(newAst.ident, my.ID) and isinstance(newAst.assignedExpr, my.Constant):
-            
-            varName = str(newAst.ident).strip()
-            
-            val = newAst.assignedExpr
-            newAst = replaceVar(newAst.bodyExpr, varName, val)
-            
-            # if variable should not be modified, make a copy of the original
-            # ast again and simplify body expression
-            if newAst is None:
-                newAst = copy.deepcopy(ast)
-                newAst.bodyExpr = simplify(newAst.bodyExpr)
+# node with the given fields replaced, the node itself when none of them changed
+# the other fields of the new node are shared with node
+def rebuild(node, **fields):
+    changed = False
+    for name in fields:
+        if getattr(node, name) is not fields[name]:
+            changed = True
+            break
+    if not changed:
+        return node
+
+    if isinstance(node, Interned):
+        newNode = node.mutable()
+    else:
+        newNode = copy.copy(node)
+    for name in fields:
+        setattr(newNode, name, fields[name])
+    return newNode
+
+
+# name bound by a let whose identifier is an ID, an ArrayRef or a plain name
+def letName(ident):
+    return str(ident).strip()
+
+
+# identifiers bound by a let, a let made for an if of one variable binds it
+# like any other let
+def identItems(ident):
+    if isinstance(ident, (list, tuple)):
+        return ident
+    return [ident]
+
+
+# identifier of a let binding the variables of idents, as my.Let makes it
+def letIdent(idents):
+    if len(idents) == 1:
+        return idents[0]
+    return list(idents)
+
+
+NO_ARGS = frozenset()
+
+# nodes that can hold a let rec, expressions never do
+STATEMENT_EXPRS = (my.Let, my.Letrec, my.TernaryOp, my.FuncDef)
+
+
+'''
+For every node, the variables that can not be replaced by a constant in it
+because a let rec reached from the node takes them as arguments (the
+variable is modified in the loop). The variables of a let (the variables of
+the if for a let made for an if statement) are not counted for its body
+since the replacement stops there.
+
+The sets are memoized per node. Chains of lets and let recs are handled with
+a loop, so long blocks do not hit the recursion limit.
+'''
+class LetrecArgs(object):
+    def __init__(self):
+        self.table = {}
+
+    def of(self, node):
+        if not isinstance(node, STATEMENT_EXPRS):
+            return NO_ARGS
+        table = self.table
+        if node in table:
+            return table[node]
+
+        # lets and let recs whose body continues the chain, innermost last
+        chain = []
+        while isinstance(node, (my.Let, my.Letrec)) and node not in table:
+            chain.append(node)
+            node = node.bodyExpr
+
+        if not chain:
+            args = self.compute(node)
+            table[node] = args
+            return args
+
+        args = self.of(node)
+        for node in reversed(chain):
+            if isinstance(node, my.Letrec):
+                args = args | frozenset(node.args)
+            elif isinstance(node.ident, (list, tuple)):
+                args = args - frozenset([letName(name) for name in node.ident])
+            elif letName(node.ident) in args:
+                args = args - frozenset([letName(node.ident)])
+            assignedArgs = self.of(node.assignedExpr)
+            if assignedArgs:
+                args = args | assignedArgs
+            table[node] = args
+        return args
+
+    # sets of the nodes that do not continue a chain
+    def compute(self, node):
+        if isinstance(node, my.TernaryOp):
+            return self.of(node.iftrue) | self.of(node.iffalse)
+        if isinstance(node, my.FuncDef):
+            return self.of(node.body)
+        return NO_ARGS
+
+
+# marks a variable that was not in the environment
+MISSING = object()
+
+
+class ConstantPropagation(object):
+    def __init__(self):
+        self.letrecArgs = LetrecArgs()
+        # variables assigned to a constant whose let is kept because a loop
+        # after it modifies them, they are only replaced in the conditions
+        # of the ifs and loops before that loop
+        self.known = {}
+
+    # simplified version of ast where the variables of env are replaced by
+    # their constant
+    #   prune: False to keep both branches of an if whose condition is a
+    #          constant (the if of a let rec)
+    #
+    # The chain of bodies (function body, let and let rec bodies) is followed
+    # with a loop, the nodes along it are rebuilt from the end of the chain
+    # once the rest of the block is simplified. env and known are updated in
+    # place as lets are passed and restored before returning.
+    def walk(self, ast, env, prune = True):
+        if not isinstance(ast, STATEMENT_EXPRS):
+            # expressions are not simplified, only their variables replaced
+            return replaceVars(ast, env)
+
+        frames = []     # (node, new ident, new assigned expression), the body is the rest of the chain
+        undo = []       # (environment, name, previous value or MISSING)
+
+        while True:
+            if isinstance(ast, my.FuncDef):
+                # prototype don't need simplification, but its body does
+                frames.append((ast, None, None))
+                ast = ast.body
+                continue
+
+            if isinstance(ast, my.Letrec):
+                loop = ast.assignedExpr
+                if isinstance(loop, my.TernaryOp) and self.condition(loop.cond, env) is False:
+                    # the loop is never entered, its arguments keep their
+                    # values
+                    ast = ast.bodyExpr
+                    self.release(env, ast, undo)
+                    continue
+
+                for name in ast.args:
+                    name = letName(name)
+                    if name in env:
+                        # the let of the constant was dropped because an if
+                        # would bind the variable again, the if is gone
+                        ident = my.ID(name, 0)
+                        frames.append((my.Let(ident, env[name], None, ast.level), ident, env[name]))
+                    self.forget(env, name, undo)
+                # simplify both the assgined Expression as well as the body expression
+                frames.append((ast, ast.ident, self.walk(ast.assignedExpr, env, prune = False)))
+                ast = ast.bodyExpr
+                continue
+
+            if not isinstance(ast, my.Let):
+                break
+
+            if isinstance(ast.assignedExpr, my.TernaryOp) and not isExpression(ast.assignedExpr):
+                # ast is a let made for an if statement, when only one
+                # branch is ever taken its lets take the place of the if
+                condition = self.condition(ast.assignedExpr.cond, env)
+                if condition is not None:
+                    branch = ast.assignedExpr.iftrue if condition else ast.assignedExpr.iffalse
+                    spliced = spliceBranch(ast, branch)
+                    if spliced is not None:
+                        ast = spliced
+                        self.release(env, ast, undo)
+                        continue
+                    ast = rebuild(ast, assignedExpr = branch)
+
+            ident = ast.ident
+            if isinstance(ident, list) or isinstance(ident, tuple):
+                # ast is a let made for if statement, the variables of the
+                # if are not replaced after it
+                frames.append((ast, ident, self.walk(ast.assignedExpr, env)))
+                for name in ident:
+                    self.forget(env, letName(name), undo)
+                ast = ast.bodyExpr
+                continue
+
+            if isinstance(ident, str) and env:
+                ident = my.ID(ident.strip(), 0)
+            if isinstance(ident, my.ArrayRef):
+                ident = replaceVars(ident, env)
+            if isinstance(ast.assignedExpr, STATEMENT_EXPRS) and not isinstance(ident, my.ArrayRef):
+                assignedExpr = self.walk(ast.assignedExpr, env)
             else:
-                newAst = simplify(newAst);
-            return newAst
-            
-        # simplify body expression for array ref
-        if isinstance(newAst.ident, my.ArrayRef):  
-            newAst.bodyExpr = simplify(newAst.bodyExpr)
-            return newAst
-
-        # ast is a let made for if statement
-        # simplify both assgined Expression as well as the body expression
-        newAst.assignedExpr = simplify(newAst.assignedExpr)
-        newAst.bodyExpr = simplify(newAst.bodyExpr)
-        
+                assignedExpr = replaceVars(ast.assignedExpr, env)
 
+            # the variable of the let is not replaced in its body
+            name = letName(ident)
+            self.forget(env, name, undo)
+
+            if (isinstance(ident, my.ID) and isinstance(assignedExpr, my.Constant)
+                    and name not in self.letrecArgs.of(ast.bodyExpr)):
+                # variable assigned to a constant: the let goes away and the
+                # constant is replaced in the body
+                undo.append((env, name, MISSING))
+                env[name] = assignedExpr
+            else:
+                # variable modified in a loop, array update or non constant value
+                frames.append((ast, ident, assignedExpr))
+                if isinstance(ident, my.ID) and isinstance(assignedExpr, my.Constant):
+                    undo.append((self.known, name, MISSING))
+                    self.known[name] = assignedExpr
+            ast = ast.bodyExpr
+
+        condition = None
+        if isinstance(ast, my.TernaryOp) and prune and not isExpression(ast):
+            condition = self.condition(ast.cond, env)
+        if condition is not None:
+            # if whose branch is known, the other one is dropped
+            newAst = self.walk(ast.iftrue if condition else ast.iffalse, env)
+        elif isinstance(ast, my.TernaryOp):
+            newAst = foldOperator(rebuild(ast, cond = replaceVars(ast.cond, env),
+                                          iftrue = self.walk(ast.iftrue, env),
+                                          iffalse = self.walk(ast.iffalse, env)))
+        else:
+            newAst = replaceVars(ast, env)
+
+        for env, name, value in reversed(undo):
+            if value is MISSING:
+                del env[name]
+            else:
+                env[name] = value
+
+        for node, ident, assignedExpr in reversed(frames):
+            if isinstance(node, my.FuncDef):
+                newAst = rebuild(node, body = newAst)
+            else:
+                newAst = rebuild(node, ident = ident, assignedExpr = assignedExpr, bodyExpr = newAst)
         return newAst
-        
-    if isinstance(newAst, my.TernaryOp):
-        newAst.iftrue = simplify(newAst.iftrue) 
-        newAst.iffalse = simplify(newAst.iffalse)
-        
-        return newAst
-        
-    if isinstance(newAst, my.Letrec):
-        # simplify both the assgined Expression as well as the body expression
-        newAst.assignedExpr = simplify(newAst.assignedExpr)
-        newAst.bodyExpr = simplify(newAst.bodyExpr)
-    
-    return newAst
+
+    # name is bound again: its constant (if any) is no longer replaced
+    def forget(self, env, name, undo):
+        if name in env:
+            undo.append((env, name, env.pop(name)))
+        if name in self.known:
+            undo.append((self.known, name, self.known.pop(name)))
+
+    # an if or a loop is dropped: the known variables no loop of ast (the
+    # rest of the chain) modifies are replaced from now on
+    def release(self, env, ast, undo):
+        args = self.letrecArgs.of(ast)
+        for name, value in self.known.items():
+            if name not in env and name not in args:
+                undo.append((env, name, MISSING))
+                env[name] = value
+
+    # truth value of the condition cond of an if or a loop, None when it is
+    # not a constant
+    def condition(self, cond, env):
+        if self.known:
+            env = dict(env, **self.known)
+        cond = replaceVars(cond, env)
+        if isinstance(cond, my.Constant):
+            return truth(cond.value)
+        return None
+
+
+# the lets of branch, the branch of the let made for an if (letNode) that is
+# always taken, followed by the body of letNode. The variables the branch
+# ends with are bound to what the branch gives them. None when the branch
+# can not be spliced: it does not end with a tuple of the variables of the
+# if, or with constants in their place
+def spliceBranch(letNode, branch):
+    idents = identItems(letNode.ident)
+    names = [letName(name) for name in idents]
+    chain = []
+    while isinstance(branch, (my.Let, my.Letrec)):
+        bound = branch.args if isinstance(branch, my.Letrec) else branch.ident
+        for name in identItems(bound):
+            while isinstance(name, my.ArrayRef):
+                name = name.name
+            if letName(name) not in names:
+                return None
+        chain.append(branch)
+        branch = branch.bodyExpr
+
+    if isinstance(branch, my.ReturnTuples):
+        branch = branch.exprs
+    if not isinstance(branch, (list, tuple)) or len(branch) != len(names):
+        return None
+
+    body = letNode.bodyExpr
+    for ident, value in reversed(list(zip(idents, branch))):
+        if isinstance(value, my.Constant):
+            body = my.Let(ident, value, body, letNode.level)
+        elif letName(value) != letName(ident):
+            return None
+    for node in reversed(chain):
+        body = rebuild(node, bodyExpr = body)
+    return body
+
+
+#------------------------ dead binding elimination ----------------------------
+'''
+Removal of the bindings whose value is never read.
+
+minicToFunctional makes a let for every assignment and declaration and the
+lets made for ifs and loops bind every variable written in them. A binding
+is dead when its variable is bound again, or the block ends, before the
+variable is read: no expression after it reads the variable and the tuple
+that ends the block (or the if or the loop) does not return it.
+
+The pass works backwards from the end of the block with the set of the live
+variables (variables read before being bound again):
+  - a let of a dead variable is removed
+  - a let of an element (Let a[i] = e) is removed when the array is dead
+  - a let made for an if only keeps its live variables, the tuples its
+    branches end with lose the same positions
+  - a let rec only keeps the arguments that are live after the loop or read
+    in the loop, found by walking the loop again until the set no longer
+    grows. A loop with no argument left is removed
+
+Bindings whose assigned expression calls a function are kept, the call may
+do more than compute a value. The FuncDef keeps its parameters and returns.
+
+The results are memoized per (node, kept positions of its tuples), so a
+loop walked again only walks the loops nested in it again when the
+positions they keep changed.
+'''
+
+# the nodes, strings and values nested in expr, expr included
+def subnodes(expr):
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+        elif isinstance(node, my.Node) and not isinstance(node, my.Constant):
+            for name in node.__slots__:
+                if name not in ('op', 'level', 'coord', '__weakref__'):
+                    stack.append(getattr(node, name, None))
+
+
+# variables read by expr, a superset when expr holds lets
+def readVars(expr):
+    names = set()
+    for node in subnodes(expr):
+        if isinstance(node, (str, my.ID)):
+            names.add(letName(node))
+    return names
+
+
+def hasCall(expr):
+    for node in subnodes(expr):
+        if isinstance(node, my.FuncCall):
+            return True
+    return False
+
+
+# items of a tuple ending a block, None for any other node
+def tupleItems(node):
+    if isinstance(node, (list, tuple)):
+        return node
+    if isinstance(node, my.ReturnTuples):
+        return node.exprs
+    return None
+
+
+# items at the positions of keep, items itself when keep has them all
+def keptItems(items, keep):
+    if keep is None or len(keep) == len(items):
+        return items
+    return type(items)([items[k] for k in sorted(keep)])
+
+
+# whether every tuple node can end with holds width items
+def endsWithTuples(node, width):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        while isinstance(node, (my.Let, my.Letrec)):
+            node = node.bodyExpr
+        if isinstance(node, my.TernaryOp):
+            stack.append(node.iftrue)
+            stack.append(node.iffalse)
+            continue
+        items = tupleItems(node)
+        if items is None or len(items) != width:
+            return False
+    return True
+
+
+class DeadBindings(object):
+    def __init__(self):
+        self.table = {}
+
+    # (version of ast without its dead bindings, variables live before ast)
+    #   keep: positions of the tuples ast ends with that are read, None for all
+    def walk(self, ast, keep=None):
+        if isinstance(ast, my.FuncDef):
+            body, live = self.walk(ast.body)
+            return rebuild(ast, body = body), live
+        if not isinstance(ast, STATEMENT_EXPRS):
+            items = tupleItems(ast)
+            if items is None:
+                return ast, readVars(ast)
+            items = keptItems(items, keep)
+            if isinstance(ast, my.ReturnTuples):
+                return rebuild(ast, exprs = items), readVars(items)
+            return items, readVars(items)
+
+        key = (ast, keep)
+        if key in self.table:
+            return self.table[key]
+        start = ast
+
+        # lets and let recs of the chain, the end of the chain is walked first
+        chain = []
+        while isinstance(ast, (my.Let, my.Letrec)):
+            chain.append(ast)
+            ast = ast.bodyExpr
+
+        if isinstance(ast, my.TernaryOp):
+            iftrue, liveTrue = self.walk(ast.iftrue, keep)
+            iffalse, liveFalse = self.walk(ast.iffalse, keep)
+            newAst = rebuild(ast, iftrue = iftrue, iffalse = iffalse)
+            live = readVars(ast.cond) | liveTrue | liveFalse
+        else:
+            newAst, live = self.walk(ast, keep)
+
+        for node in reversed(chain):
+            if isinstance(node, my.Letrec):
+                newNode, live = self.walkLetrec(node, live)
+            else:
+                newNode, live = self.walkLet(node, live)
+            if newNode is not None:
+                newAst = rebuild(newNode, bodyExpr = newAst)
+
+        result = self.table[key] = (newAst, live)
+        return result
+
+    # (let without its dead variables or None when they all are, variables
+    # live before it), live: variables live after it
+    def walkLet(self, node, live):
+        ident = node.ident
+        assignedExpr = node.assignedExpr
+
+        if isinstance(ident, (list, tuple)):
+            # let made for an if or the iteration of a loop
+            keep = frozenset([k for k in range(len(ident)) if letName(ident[k]) in live])
+            if not keep and not hasCall(assignedExpr):
+                return None, live
+            if not keep or len(keep) == len(ident) or not endsWithTuples(assignedExpr, len(ident)):
+                keep = None
+            assignedExpr, assignedLive = self.walk(assignedExpr, keep)
+            live = (live - set([letName(name) for name in ident])) | assignedLive
+            if keep is not None:
+                ident = letIdent(keptItems(ident, keep))
+            return rebuild(node, ident = ident, assignedExpr = assignedExpr), live
+
+        if isinstance(ident, my.ArrayRef):
+            array = ident
+            while isinstance(array, my.ArrayRef):
+                array = array.name
+            if letName(array) not in live and not hasCall(ident) and not hasCall(assignedExpr):
+                return None, live
+            assignedExpr, assignedLive = self.walk(assignedExpr)
+            return rebuild(node, assignedExpr = assignedExpr), live | readVars(ident) | assignedLive
+
+        name = letName(ident)
+        if name not in live and not hasCall(assignedExpr):
+            return None, live
+        assignedExpr, assignedLive = self.walk(assignedExpr)
+        live = (live - set([name])) | assignedLive
+        return rebuild(node, assignedExpr = assignedExpr), live
+
+    # like walkLet for a let rec, the loop is
+    #   if cond then (Let args = iteration in loop args) else args
+    def walkLetrec(self, node, live):
+        names = [letName(arg) for arg in node.args]
+        loop = node.assignedExpr
+        if not self.isLoop(node):
+            assignedExpr, assignedLive = self.walk(loop)
+            return rebuild(node, assignedExpr = assignedExpr), live | assignedLive | set(names)
+
+        recursiveLet = loop.iftrue
+        condVars = readVars(loop.cond)
+        kept = set([k for k in range(len(names)) if names[k] in live or names[k] in condVars])
+        if not kept and hasCall(loop):
+            kept = set(range(len(names)))
+        while True:
+            keep = frozenset(kept)
+            iteration, iterationLive = self.walk(recursiveLet.assignedExpr, keep)
+            grown = kept | set([k for k in range(len(names)) if names[k] in iterationLive])
+            if grown == kept:
+                break
+            kept = grown
+
+        if not kept:
+            return None, live
+
+        recursiveCall = recursiveLet.bodyExpr
+        recursiveLet = rebuild(recursiveLet, ident = letIdent(keptItems(identItems(recursiveLet.ident), keep)),
+                               assignedExpr = iteration,
+                               bodyExpr = rebuild(recursiveCall, args = keptItems(recursiveCall.args, keep)))
+        iffalse, falseLive = self.walk(loop.iffalse, keep)
+        loop = rebuild(loop, iftrue = recursiveLet, iffalse = iffalse)
+        args = keptItems(node.args, keep)
+        live = live | condVars | iterationLive | set([letName(arg) for arg in args])
+        return rebuild(node, args = args, assignedExpr = loop), live
+
+    # whether the let rec has the shape minicToFunctional gives loops
+    def isLoop(self, node):
+        names = [letName(arg) for arg in node.args]
+        loop = node.assignedExpr
+        if not isinstance(loop, my.TernaryOp) or not isinstance(loop.iftrue, my.Let):
+            return False
+        recursiveLet = loop.iftrue
+        recursiveCall = recursiveLet.bodyExpr
+        falseItems = tupleItems(loop.iffalse)
+        return ([letName(name) for name in identItems(recursiveLet.ident)] == names
+                and isinstance(recursiveCall, my.LetrecCall)
+                and [letName(arg) for arg in recursiveCall.args] == names
+                and falseItems is not None and [letName(item) for item in falseItems] == names
+                and endsWithTuples(recursiveLet.assignedExpr, len(names)))
+
+
+def eliminateDeadBindings(ast):
+    return DeadBindings().walk(ast)[0]
+
+
+def simplify(ast):
+    return eliminateDeadBindings(ConstantPropagation().walk(ast, {}))
 
 #------------------------ variable replacement algorithm -----------------------
 '''
-Replace variable with name of varName with its value val instead.
-This function is used to help eliminate variables assigned to constants
+Replace the variables named in env with their value (env maps names to
+Constants). This is used by simplify, the names of env are the variables
+assigned to constants whose let has been removed.
 
 Replacement rule:
-Replace every variable with same string name as varName with val
+Replace every variable with the same string name as one of env
 Recursively calls on itself to also do the replacement in the let's body expression
 
-If the identifier to a let binding have the same name as varName, then replacement
-ends after variable is replaced on the right-hand side.
+If the identifier to a let binding have the same name as a variable of env,
+then replacement of that variable ends after it is replaced on the
+right-hand side.
 
-If the variable to be replace is modified in a let rec, return None.
-If replacement results in a None to be returned, return None immediately.
+The operators whose operands are constants after the replacement are
+folded (see foldOperator), with an empty env this only folds.
 
-The AST or None returned helps determine if a simplification step can be taken
+Only the nodes on the path to a replaced variable or a folded operator are
+new, the rest of the returned AST is shared with ast.
 
 '''
 
-def replaceVar(ast, varName, val):
-    
-    if isinstance(ast, my.FuncDef):
-        newAst = copy.deepcopy(ast)
-        newAst.body = replaceVar(newAst.body, varName, val) 
+# replace the variables of env in a list of names and expressions
+# returns lst itself when nothing was replaced
+def replaceVarsInList(lst, env):
+    newLst = []
+    for expr in lst:
+        if isinstance(expr, str):
+            if expr in env:
+                expr = rebuild(env[expr], level = 0)
+        else:
+            expr = replaceVars(expr, env)
+        newLst.append(expr)
 
-        # Check if variable to be replace exist in a loop
-        if newAst.body is None:
-            return None
+    for i in range(len(lst)):
+        if newLst[i] is not lst[i]:
+            return newLst
+    return lst
+
+
+# whether node is an expression, not a statement (the branch of an if or a
+# let, a tuple)
+def isExpression(node):
+    if isinstance(node, my.TernaryOp):
+        return isExpression(node.iftrue) and isExpression(node.iffalse)
+    return not isinstance(node, (my.Let, my.Letrec, my.LetrecCall, my.FuncDef, my.ReturnTuples, list, tuple))
+
+
+# Constant computed by the operator node when its operands are constants
+# (see constant_folding), node itself when it can not be folded
+def foldOperator(node):
+    value = None
+    if isinstance(node, my.BinaryOp) and isinstance(node.left, my.Constant):
+        if isinstance(node.right, my.Constant):
+            value = foldBinary(node.op, node.left.value, node.right.value)
+        elif node.op in ('&&', '||') and truth(node.left.value) == (node.op == '||'):
+            # the right operand is not evaluated
+            value = '1' if node.op == '||' else '0'
+
+    elif isinstance(node, my.UnaryOp) and isinstance(node.expr, my.Constant):
+        value = foldUnary(node.op, node.expr.value)
+
+    elif (isinstance(node, my.TernaryOp) and isinstance(node.cond, my.Constant)
+            and isExpression(node.iftrue) and isExpression(node.iffalse)):
+        # a ?: of C, the ifs are left to the branch pruning
+        condition = truth(node.cond.value)
+        if condition is None:
+            return node
+        chosen, other = (node.iftrue, node.iffalse) if condition else (node.iffalse, node.iftrue)
+        if isinstance(chosen, my.Constant) and isinstance(other, my.Constant):
+            value = foldConditional(chosen.value, other.value)
         else:
-            return newAst
+            # the variables are ints, a constant of another type would
+            # change the type of the ?:
+            constant = chosen if isinstance(chosen, my.Constant) else other
+            if not isinstance(constant, my.Constant):
+                return chosen
+            typed = literal(constant.value)
+            if typed is not None and typed[1] is INT:
+                return chosen
+
+    if value is None:
+        return node
+    return my.Constant(value, node.level)
+
+
+def replaceVars(ast, env):
+    if isinstance(ast, my.FuncDef):
+        return rebuild(ast, body = replaceVars(ast.body, env))
     
     if isinstance(ast, my.Let):
-        newAst = copy.deepcopy(ast)
-        if isinstance(newAst.ident, str):
-            newAst.ident = my.ID(newAst.ident.strip(), 0)
+        ident = ast.ident
+        if isinstance(ident, str) and env:
+            ident = my.ID(ident.strip(), 0)
         
-        if isinstance(newAst.ident, my.ID) or isinstance(newAst.ident, my.ArrayRef):
+        if isinstance(ident, (str, my.ID)) or isinstance(ident, my.ArrayRef):
             
-            if isinstance(newAst.ident, my.ArrayRef):
-                newAst.ident = replaceVar(newAst.ident, varName, val)
-                
-                # Check if variable to be replace exist in a loop
-                if newAst.ident is None:
-                    return None
+            if isinstance(ident, my.ArrayRef):
+                ident = replaceVars(ident, env)
             
-            newAst.assignedExpr = replaceVar(newAst.assignedExpr, varName, val)
-            if newAst.assignedExpr is None:
-                return None
+            assignedExpr = replaceVars(ast.assignedExpr, env)
 
-            
-            # if the name of variable is not the one that need to be replaced,
-            # check if 
-            if (str(newAst.ident).strip() != varName):
-                newAst.bodyExpr = replaceVar(newAst.bodyExpr, varName, val) 
+            # the variable of the let is not replaced in its body
+            bodyEnv = env
+            if letName(ident) in env:
+                bodyEnv = dict(env)
+                del bodyEnv[letName(ident)]
+            bodyExpr = replaceVars(ast.bodyExpr, bodyEnv) 
                 
-                if newAst.bodyExpr is None:
-                    return None
+            return rebuild(ast, ident = ident, assignedExpr = assignedExpr, bodyExpr = bodyExpr)
+        
+        # Do replace of variable for if statements, the variables of the if
+        # are not replaced after it
+        if isinstance(ident, list) or isinstance(ident, tuple):
+            bodyEnv = dict(env)
+            for name in ident:
+                bodyEnv.pop(letName(name), None)
+            return rebuild(ast, assignedExpr = replaceVars(ast.assignedExpr, env),
+                           bodyExpr = replaceVars(ast.bodyExpr, bodyEnv))
                 
-            return newAst
-        
-        # Do replace of variable for if statements        
-        if isinstance(newAst.ident, list) or isinstance(newAst.ident, tuple):
-            newAst.assignedExpr = replaceVar(newAst.assignedExpr, varName, val)
-        
-            if newAst.assignedExpr is None:
-                return None
-                
-        return newAst
+        return ast
         
     if isinstance(ast, my.ID):
-        newAst = copy.deepcopy(ast)
         # replace variable if the name are the same
-        if str(ast).strip() == varName:
-            newAst = copy.deepcopy(val)
-            newAst.level = ast.level 
-        return newAst
+        name = str(ast).strip()
+        if name in env:
+            return rebuild(env[name], level = ast.level)
+        return ast
 
         
     if isinstance(ast, my.ReturnTuples):
-        # Replace the variable named as varName with the value val in the return
-        # tuple
-        newAst = copy.deepcopy(ast)
-        
-        if isinstance(newAst.exprs, tuple):
-            newAst.exprs = list(newAst.exprs)
-        
-        for i in range(len(ast.exprs)):
-            if isinstance(newAst.exprs[i], str) and (newAst.exprs[i] == str(varName).strip()):
-                newAst.exprs[i] = copy.deepcopy(val)
-                newAst.exprs[i].level = 0 
-        return newAst
+        # Replace the variables of env with their value in the return tuple
+        exprs = []
+        for expr in ast.exprs:
+            if isinstance(expr, str) and expr in env:
+                expr = rebuild(env[expr], level = 0)
+            exprs.append(expr)
+
+        for i in range(len(exprs)):
+            if exprs[i] is not ast.exprs[i]:
+                return rebuild(ast, exprs = exprs)
+        return ast
         
         
     if isinstance(ast, my.BinaryOp):
         # Do replacement for the expression on the left and the expression on the right
-        newAst = copy.deepcopy(ast)
-        
-        newAst.left = replaceVar(newAst.left, varName, val)
-        
-        if newAst.left is None:
-            return None
-        
-        newAst.right = replaceVar(newAst.right, varName, val)
-        
-        if newAst.right is None:
-            return None
-        return newAst
+        return foldOperator(rebuild(ast, left = replaceVars(ast.left, env), right = replaceVars(ast.right, env)))
         
     if isinstance(ast, my.TernaryOp):
         # Do replacement in the condition, iftrue, and iffalse
-        newAst = copy.deepcopy(ast)
-        newAst.cond = replaceVar(newAst.cond, varName, val)
-        newAst.iftrue = replaceVar(newAst.iftrue, varName, val)
-        
-        if newAst.iftrue is None:  # variable to be replaced is modified in let rec
-            return None
-        
-        newAst.iffalse = replaceVar(newAst.iffalse, varName, val)
-        
-        if newAst.iffalse is None: # variable to be replaced is modified in let rec
-            return None
-        
-        return newAst
+        return foldOperator(rebuild(ast, cond = replaceVars(ast.cond, env), iftrue = replaceVars(ast.iftrue, env),
+                                    iffalse = replaceVars(ast.iffalse, env)))
         
     if isinstance(ast, my.FuncCall):
-        # look up each argument of the function and replace variable if name is varName
-        newAst = copy.deepcopy(ast)
-        for i in range(len(newAst.args)):
-            if isinstance(newAst.args[i], str) and (newAst.args[i] == str(varName).strip()):
-                newAst.args[i] = copy.deepcopy(val)
-                newAst.args[i].level = 0
-                
-            else:
-                newAst.args[i] = replaceVar(newAst.args[i], varName, val)
-        
-        return newAst
+        # look up each argument of the function and replace the variables of env
+        return rebuild(ast, args = replaceVarsInList(ast.args, env))
 
     if isinstance(ast, my.ArrayRef):
-        # look up each subscript and replace variable if name is varName
-        newAst = copy.deepcopy(ast)
-        if not isinstance(newAst.name, my.ID):
-            newAst.name = replaceVar(newAst.name, varName, val)
+        # look up each subscript and replace the variables of env
+        name = ast.name
+        if not isinstance(name, my.ID):
+            name = replaceVars(name, env)
         
-        newAst.subscript = replaceVar(newAst.subscript, varName, val)
-        return newAst
+        return rebuild(ast, name = name, subscript = replaceVars(ast.subscript, env))
 
     if isinstance(ast, my.UnaryOp):
         # Do replacement for the expressiono in the unary expression
-        newAst = copy.deepcopy(ast)
-        newAst.expr = replaceVar(newAst.expr, varName, val)
-        return newAst
+        return foldOperator(rebuild(ast, expr = replaceVars(ast.expr, env)))
 
     if isinstance(ast, my.ExprList):
         # Do replacement for each of the expression in expression list
-        newAst = copy.deepcopy(ast)
-        for i in range(len(newAst.exprs)):
-            if isinstance(newAst.exprs[i], str) and (newAst.exprs[i] == str(varName).strip()):
-                newAst.exprs[i] = copy.deepcopy(val)
-                newAst.exprs[i].level = 0
-                
-            else:
-                newAst.exprs[i] = replaceVar(newAst.exprs[i], varName, val)
-
-        return newAst
+        return rebuild(ast, exprs = replaceVarsInList(ast.exprs, env))
         
     if isinstance(ast, my.Letrec):
-        
-        # return back a None to indicated that the variable should not be simplified because it is used in a loop
-        if varName in ast.args:
-            return None
-        else:
-            # Replace variable in let rec since variable is not modified in let rec
-            newAst = copy.deepcopy(ast)
-            newAst.assignedExpr = replaceVar(newAst.assignedExpr, varName, val)
-            if newAst.assignedExpr is None:
-                return None
-            
-            # Do the variable replacement to the body of let rec
-            newAst.bodyExpr = replaceVar(newAst.bodyExpr, varName, val)
-            
-            if newAst.bodyExpr is None:
-                return None
-            return newAst
-        
-        
+        # Replace variable in let rec, simplify only keeps the variables that
+        # are not modified in a let rec (see LetrecArgs)
+        return rebuild(ast, assignedExpr = replaceVars(ast.assignedExpr, env),
+                       bodyExpr = replaceVars(ast.bodyExpr, env))
    
     return ast
 #------------------------ variable replacement algorithm End -------------------
 
-inputFile = sys.argv[1]
-dummyName = makeDummyCFile(inputFile)
 
-ast = parse_file(dummyName)    # pycparser to minic_ast  ast
-ast1 = transform(ast)          # minic_ast to myfunctional_ast
+if __name__ == '__main__':
+    # the block is wrapped and parsed in memory, pass --cpp to run the
+    # C preprocessor first for inputs that contain directives
+    # translations are looked up in the translation cache first, pass
+    # --no-cache to translate anyway
+    # pass --timings to write the timings of the phases to stderr as a json
+    # record (see pipeline_timings)
+    inputFile = sys.argv[1]
+    usePreprocessor = '--cpp' in sys.argv[2:]
+    timer = PhaseTimer() if '--timings' in sys.argv[2:] else NULL_TIMER
+
+    with timer.phase('read') as phase:
+        f = open(inputFile, 'r')
+        blockText = phase.result = f.read()
+        f.close()
+
+    cache = scriptCache('checkin6simp.py', sys.argv[2:])
+    entry = None
+    if cache is not None:
+        with timer.phase('cache lookup'):
+            key = cache.key(blockText, usePreprocessor)
+            entry = cache.get(key)
+    cached = entry is not None
+
+    if entry is None:
+        ast = parseBlock(blockText, usePreprocessor, filename=inputFile, timer=timer)    # pycparser ast
+        with timer.phase('transform', ast) as phase:
+            ast2 = phase.result = transform(ast)          # pycparser ast to minic_ast
 
-print("Input:\n")
-f = open(dummyName, 'r')
-input = f.read()
-print(input)
-f.close()
+        with timer.phase('translate', ast2) as phase:
+            functionalAST = phase.result = minicToFunctional(ast2, [], [], 1)
+        with timer.phase('simplify', functionalAST) as phase:
+            simplifiedAST = phase.result = simplify(functionalAST)
+        entry = {}
+        with timer.phase('render', functionalAST) as phase:
+            entry['output'] = phase.result = functionalToString(functionalAST)
+        with timer.phase('render simplified', simplifiedAST) as phase:
+            # simplify keeps the levels of the lets it inlines, print them as before
+            entry['simplified'] = phase.result = functionalToString(simplifiedAST, storedLevels=True)
+        if cache is not None:
+            with timer.phase('cache store'):
+                entry['ast'] = toCompact(functionalAST)
+                entry['simplifiedAST'] = toCompact(simplifiedAST)
+                cache.put(key, entry)
 
+    print("Input:\n")
+    print(wrapBlock(blockText))
 
-print("\n\n----- Output: -----\n")
 
-ast2 = transform(ast)
+    print("\n\n----- Output: -----\n")
+    print(entry['output'])
 
-functionalAST = minicToFunctional(ast2, [], [], 1)
-print(functionalAST)
+    print('\n\n --------- Simplified ----------\n')
+    print(entry['simplified'])
 
-print('\n\n --------- Simplified ----------\n')
-simplifiedAST = simplify(functionalAST)
-print(str(simplifiedAST))
+    if timer is not NULL_TIMER:
+        record = dict(timer.record(), input=inputFile, cached=cached)
+        sys.stderr.write(json.dumps(record) + '\n')
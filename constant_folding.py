@@ -0,0 +1,287 @@
+'''
+C arithmetic on constants, used by simplify to fold the operators whose
+operands are constants.
+
+The value of a constant is typed like C types its literal (C11 6.4.4):
+decimal, octal and hexadecimal integers with or without u, l and ll
+suffixes, character constants (int) and floating constants without suffix
+(double). int is 32 bits wide, long and long long are 64 bits wide (LP64).
+Operands are converted with the usual arithmetic conversions, so
+-1 < 0u is 0 and 1 / 2 is 0 but 1 / 2.0 is 0.5.
+
+An operation is only folded when C defines its result. Nothing is folded
+(the fold functions return None) for:
+  - signed overflow, division or remainder by zero
+  - shift counts that are negative or not smaller than the width of the
+    type, left shifts of negative values, right shifts of negative values
+    (implementation defined)
+  - float and long double constants, string constants, results that are
+    not finite
+The folded constant is written back with the suffix of its type (3u, 5l),
+so folding it again gives the same type.
+'''
+
+
+class IntegerType(object):
+    def __init__(self, name, bits, signed, rank, suffix):
+        self.name = name
+        self.bits = bits
+        self.signed = signed
+        self.rank = rank
+        self.suffix = suffix
+        if signed:
+            self.min, self.max = -2 ** (bits - 1), 2 ** (bits - 1) - 1
+        else:
+            self.min, self.max = 0, 2 ** bits - 1
+
+    def __repr__(self):
+        return self.name
+
+
+INT = IntegerType('int', 32, True, 1, '')
+UINT = IntegerType('unsigned int', 32, False, 1, 'u')
+LONG = IntegerType('long', 64, True, 2, 'l')
+ULONG = IntegerType('unsigned long', 64, False, 2, 'ul')
+LLONG = IntegerType('long long', 64, True, 3, 'll')
+ULLONG = IntegerType('unsigned long long', 64, False, 3, 'ull')
+DOUBLE = 'double'
+
+UNSIGNED = {INT: UINT, LONG: ULONG, LLONG: ULLONG}
+
+# integer suffix -> (types of a decimal literal, types of an octal or
+# hexadecimal literal), the first one that holds the value is its type
+LITERAL_TYPES = {
+    '': ((INT, LONG, LLONG), (INT, UINT, LONG, ULONG, LLONG, ULLONG)),
+    'u': ((UINT, ULONG, ULLONG), (UINT, ULONG, ULLONG)),
+    'l': ((LONG, LLONG), (LONG, ULONG, LLONG, ULLONG)),
+    'ul': ((ULONG, ULLONG), (ULONG, ULLONG)),
+    'll': ((LLONG,), (LLONG, ULLONG)),
+    'ull': ((ULLONG,), (ULLONG,)),
+}
+
+SUFFIXES = {'': '', 'u': 'u', 'l': 'l', 'ul': 'ul', 'lu': 'ul', 'll': 'll', 'ull': 'ull', 'llu': 'ull'}
+
+
+# (value, type) of the text of a constant, None when it is not folded
+def literal(text):
+    text = str(text).strip()
+    negative = text.startswith('-')
+    if negative:
+        # constants written back by a fold
+        text = text[1:]
+    if not text:
+        return None
+
+    if text.startswith("'"):
+        value = characterValue(text)
+        if value is None:
+            return None
+        return (-value if negative else value), INT
+
+    lowered = text.lower()
+    isHex = lowered.startswith('0x')
+    if '.' in lowered or (isHex and 'p' in lowered) or (not isHex and 'e' in lowered):
+        if lowered.endswith(('f', 'l')):
+            # float and long double are not folded
+            return None
+        try:
+            value = float.fromhex(text) if isHex else float(text)
+        except ValueError:
+            return None
+        return (-value if negative else value), DOUBLE
+
+    digits = lowered.rstrip('ul')
+    suffix = SUFFIXES.get(lowered[len(digits):])
+    if suffix is None or not digits:
+        return None
+    try:
+        if isHex:
+            value = int(digits[2:], 16)
+        elif digits.startswith('0'):
+            value = int(digits, 8)
+        else:
+            value = int(digits)
+    except ValueError:
+        return None
+
+    decimalTypes, otherTypes = LITERAL_TYPES[suffix]
+    for ctype in (otherTypes if isHex or digits.startswith('0') else decimalTypes):
+        if negative and ctype.min <= -value <= ctype.max:
+            return -value, ctype
+        if not negative and value <= ctype.max:
+            return value, ctype
+    return None
+
+
+# value of a character constant of one character, None for the others
+def characterValue(text):
+    if len(text) < 3 or not text.endswith("'"):
+        return None
+    char = text[1:-1]
+    if char.startswith('\\'):
+        try:
+            char = char.encode('latin-1').decode('unicode_escape')
+        except (UnicodeError, ValueError):
+            return None
+    if len(char) != 1:
+        return None
+    value = ord(char)
+    # char is signed
+    return value - 256 if 128 <= value < 256 else value
+
+
+# text of a constant of value and type
+def constantText(value, ctype):
+    if ctype is DOUBLE:
+        if value != value or value in (float('inf'), float('-inf')):
+            return None
+        return repr(value)
+    return str(value) + ctype.suffix
+
+
+# value converted to the integer type ctype
+def converted(value, ctype):
+    if ctype is DOUBLE:
+        return float(value)
+    if not ctype.signed:
+        return value % 2 ** ctype.bits
+    return value
+
+
+# type of the operands of a binary operator (usual arithmetic conversions)
+def commonType(left, right):
+    if left is DOUBLE or right is DOUBLE:
+        return DOUBLE
+    if left is right:
+        return left
+    if left.signed == right.signed:
+        return left if left.rank >= right.rank else right
+    unsigned, signed = (right, left) if left.signed else (left, right)
+    if unsigned.rank >= signed.rank:
+        return unsigned
+    if signed.bits > unsigned.bits:
+        return signed
+    return UNSIGNED[signed]
+
+
+# value wrapped into ctype, None on signed overflow
+def inRange(value, ctype):
+    if ctype is DOUBLE:
+        return value
+    if not ctype.signed:
+        return value % 2 ** ctype.bits
+    if ctype.min <= value <= ctype.max:
+        return value
+    return None
+
+
+def truncatedDivision(a, b):
+    quotient = abs(a) // abs(b)
+    return -quotient if (a < 0) != (b < 0) else quotient
+
+
+# truth value of the text of a constant, None when it is not known
+def truth(text):
+    constant = literal(text)
+    if constant is None:
+        return None
+    return constant[0] != 0
+
+
+ARITHMETIC = ('+', '-', '*', '/', '%')
+COMPARISONS = {
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '<=': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b,
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+}
+BITWISE = {
+    '&': lambda a, b: a & b,
+    '|': lambda a, b: a | b,
+    '^': lambda a, b: a ^ b,
+}
+
+
+# text of the constant left op right, None when it is not folded
+def foldBinary(op, left, right):
+    left, right = literal(left), literal(right)
+    if left is None or right is None:
+        return None
+    (a, leftType), (b, rightType) = left, right
+
+    if op in ('&&', '||'):
+        value = (a != 0 and b != 0) if op == '&&' else (a != 0 or b != 0)
+        return constantText(int(value), INT)
+
+    if op in ('<<', '>>'):
+        # the type of a shift is the type of its left operand
+        if leftType is DOUBLE or rightType is DOUBLE or b < 0 or b >= leftType.bits:
+            return None
+        if leftType.signed and a < 0:
+            return None
+        value = a << b if op == '<<' else a >> b
+        value = inRange(value, leftType)
+        return None if value is None else constantText(value, leftType)
+
+    ctype = commonType(leftType, rightType)
+    a, b = converted(a, ctype), converted(b, ctype)
+
+    if op in COMPARISONS:
+        return constantText(int(COMPARISONS[op](a, b)), INT)
+
+    if op in BITWISE:
+        if ctype is DOUBLE:
+            return None
+        return constantText(inRange(BITWISE[op](a, b), ctype), ctype)
+
+    if op not in ARITHMETIC:
+        return None
+    if op in ('/', '%') and b == 0:
+        return None
+    if op == '%' and ctype is DOUBLE:
+        return None
+
+    if op == '+':
+        value = a + b
+    elif op == '-':
+        value = a - b
+    elif op == '*':
+        value = a * b
+    elif op == '/':
+        value = a / b if ctype is DOUBLE else truncatedDivision(a, b)
+    else:
+        value = a - b * truncatedDivision(a, b)
+    value = inRange(value, ctype)
+    return None if value is None else constantText(value, ctype)
+
+
+# text of the constant op operand, None when it is not folded
+def foldUnary(op, operand):
+    constant = literal(operand)
+    if constant is None:
+        return None
+    value, ctype = constant
+
+    if op == '!':
+        return constantText(int(value == 0), INT)
+    if op == '+':
+        return constantText(value, ctype)
+    if op == '-':
+        value = inRange(-value, ctype)
+        return None if value is None else constantText(value, ctype)
+    if op == '~' and ctype is not DOUBLE:
+        return constantText(inRange(~value, ctype), ctype)
+    return None
+
+
+# text of the operand chosen by a ?: whose condition is a constant,
+# converted to the type of the ?: (that of chosen and other), None when it
+# is not folded
+def foldConditional(chosen, other):
+    chosen, other = literal(chosen), literal(other)
+    if chosen is None or other is None:
+        return None
+    ctype = commonType(chosen[1], other[1])
+    return constantText(converted(chosen[0], ctype), ctype)
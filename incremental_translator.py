@@ -0,0 +1,377 @@
+'''
+Incremental re-translation of an edited C code block.
+
+translateBlock parses, lowers and translates the whole block again after
+every edit, even when only one statement changed. An IncrementalTranslator
+keeps what it computed for the previous version of the block:
+  - the block is split into its top-level statements, and each statement
+    is fingerprinted by its tokens (comments and the amount of spacing do
+    not count)
+  - the minic statements and read/write sets (VarSets) of a fingerprint are
+    kept, only statements with a new fingerprint are parsed, all of them in
+    one call to the parser
+  - the lets (frames, see checkin6simp.statementFrames) of a statement
+    depend on the statement and on its level only, they are kept and
+    reused while the statements before it bind the same number of
+    variables. An edit that adds or removes a let re-translates the
+    statements after it at their new level
+  - the returned tuple and the function header are rebuilt from the kept
+    bindings and read/write sets, so a change of the written variables is
+    seen everywhere
+  - the lets after the last changed statement are shared with the previous
+    translation when their frames and the returned tuple did not change,
+    only the lets in front of it are rebuilt
+
+The result is the same AST as translateBlock gives for the new text. Blocks
+that can not be split safely (preprocessor lines, typedefs, text the
+splitter gets wrong) are parsed whole and translated without reuse.
+
+timings and stats describe the last translation, see
+benchmarks/bench_incremental.py for the saving against translateBlock.
+'''
+
+import re
+import time
+
+from pycparser.plyparser import ParseError
+
+from block_parser import parseBlock, parserPool, wrapBlock
+from pyminicMaster.c_ast_to_minic import transform
+from pyminicMaster.minic import minic_ast as mc
+from checkin6simp import VarSets, NodeVars, StatementCursor, statementFrames, functionHeader, simplify
+import myfunctional_ast6 as my
+
+
+# statements that bind variables for the statements following them
+BINDING_STATEMENTS = (mc.Decl, mc.Assignment, mc.If, mc.While, mc.DoWhile, mc.For)
+
+TOKEN = re.compile(r'''
+      (?P<comment>//[^\n]*|/\*.*?\*/)
+    | (?P<literal>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+    | (?P<space>\s+)
+    | (?P<word>[A-Za-z_]\w*)
+    | (?P<number>\.?\d(?:[\w.]|[eEpP][+-])*)
+    | (?P<other>.)
+''', re.VERBOSE | re.DOTALL)
+
+OPENING = '([{'
+CLOSING = ')]}'
+
+
+# split a block into its top-level statements
+# returns a list of (text, fingerprint) or None when the block has
+# preprocessor lines or typedefs, which the statements can not be parsed
+# without
+def splitStatements(text):
+    tokens = []     # (start, end, text) of the tokens that are not spaces or comments
+    spaced = []     # the text of each token, after a space when one was before it
+    separated = False
+    for match in TOKEN.finditer(text):
+        kind = match.lastgroup
+        if kind == 'comment' or kind == 'space':
+            separated = True
+            continue
+        token = match.group()
+        if token == 'typedef' or (token == '#' and text[:match.start()].rstrip(' \t')[-1:] in ('', '\n')):
+            return None
+        tokens.append((match.start(), match.end(), token))
+        spaced.append(' ' + token if separated else token)
+        separated = False
+
+    statements = []
+    first = 0           # index of the first token of the current statement
+    depth = 0
+    seenWhile = False   # the while of a do statement was met
+    for i, (start, end, token) in enumerate(tokens):
+        if token in OPENING:
+            depth += 1
+            continue
+        if token in CLOSING:
+            depth -= 1
+            if depth != 0 or token != '}':
+                continue
+        elif depth != 0:
+            continue
+        elif token == 'while':
+            seenWhile = True
+            continue
+        elif token != ';':
+            continue
+
+        # a ';' or a '}' at the top level ends the statement unless more of it follows
+        following = tokens[i + 1][2] if i + 1 < len(tokens) else None
+        if tokens[first][2] == 'do' and not seenWhile:
+            continue
+        if following == 'else' or (token == '}' and following in (';', ',', '=', 'while')):
+            continue
+        statements.append((text[tokens[first][0]:end], fingerprint(tokens, spaced, first, i + 1)))
+        first = i + 1
+        seenWhile = False
+
+    if first < len(tokens):
+        statements.append((text[tokens[first][0]:], fingerprint(tokens, spaced, first, len(tokens))))
+    return statements
+
+
+# the tokens first to end of a statement with one space where the text had
+# spaces or comments, so that i++ + 1 and i + ++1 stay different
+def fingerprint(tokens, spaced, first, end):
+    return tokens[first][2] + ''.join(spaced[first + 1:end])
+
+
+class Statement(object):
+    '''
+    A top-level statement of the block (one C statement, a declaration may
+    hold several minic statements) and what was computed for it.
+    '''
+    __slots__ = ('items', 'varSets', 'frames', 'usedFrames')
+
+    def __init__(self, items):
+        self.items = items          # minic statements
+        self.varSets = VarSets()    # read/write sets of the items
+        # (id of an item, level) -> (frames, bindings) or None, for the
+        # levels of the last translation (the same statement can appear at
+        # several levels) and for the translation being built
+        self.frames = {}
+        self.usedFrames = {}
+        for item in items:
+            self.varSets.of(item)
+
+
+# ends the statements translated on their own, so that statementFrames
+# stops right after them
+class EndOfStatement(mc.Node):
+    __slots__ = ()
+    attr_names = ()
+
+    def children(self):
+        return ()
+
+
+END_OF_STATEMENT = EndOfStatement()
+END_CURSOR = StatementCursor([END_OF_STATEMENT])
+
+# the return 0 wrapBlock adds after the statements
+BLOCK_RETURN = mc.Return(mc.Constant('int', '0'))
+
+
+class IncrementalTranslator(object):
+    def __init__(self, simplifyOutput=True, pool=None):
+        self.simplifyOutput = simplifyOutput
+        self.pool = pool if pool is not None else parserPool
+        self.source = None
+        self.result = None
+        self.statements = {}    # fingerprint -> Statement of the last translation
+        self.lets = []          # (frame, let) of the last translation, outermost first
+        self.body = None        # returned tuple of the innermost of those lets
+        self.timings = {}       # seconds of each phase of the last translation
+        self.stats = {}
+
+    # translate the block text, reusing what is kept from the previous text
+    # returns the functional AST and its simplified version (None when
+    # simplifyOutput is False), like translateBlock
+    def translate(self, source):
+        start = time.perf_counter()
+        timings = self.timings = {}
+        stats = self.stats = {'statements': 0, 'parsed': 0, 'translated': 0, 'reusedLets': 0}
+
+        statements = self.parseStatements(source)
+        timings['parse'] = time.perf_counter() - start
+
+        functionalAST = self.translateStatements(statements)
+        timings['translate'] = time.perf_counter() - start - timings['parse']
+
+        simplifiedAST = None
+        if self.simplifyOutput:
+            simplifiedAST = simplify(functionalAST)
+        timings['simplify'] = time.perf_counter() - start - timings['parse'] - timings['translate']
+        timings['total'] = time.perf_counter() - start
+
+        stats['statements'] = len(statements)
+        self.source = source
+        self.result = functionalAST, simplifiedAST
+        return self.result
+
+    # translate newSource, an edited version of oldSource
+    def update(self, oldSource, newSource):
+        if self.source != oldSource:
+            self.translate(oldSource)
+        if newSource == oldSource:
+            return self.result
+        return self.translate(newSource)
+
+    # Statements of source, the kept ones when their fingerprint is known.
+    # The new statements are parsed together, each on its own lines, and
+    # the minic statements are given to the statement their line is in.
+    def parseStatements(self, source):
+        split = splitStatements(source)
+        if split is not None:
+            known = self.statements
+            newTexts = []
+            for text, fingerprint in split:
+                if fingerprint not in known:
+                    newTexts.append((text, fingerprint))
+
+            parsed = self.parseTexts(newTexts)
+            if parsed is not None:
+                kept = {}
+                statements = []
+                for text, fingerprint in split:
+                    statement = kept.get(fingerprint) or known.get(fingerprint) or parsed[fingerprint]
+                    kept[fingerprint] = statement
+                    statements.append(statement)
+                self.statements = kept
+                return statements
+
+        # parse the whole block, nothing is kept
+        self.statements = {}
+        self.stats['parsed'] = 1
+        ast = parseBlock(source, pool=self.pool)
+        return [Statement([item]) for item in transform(ast).ext[0].body.block_items[:-1]]
+
+    # fingerprint -> Statement of the (text, fingerprint) pairs, None when
+    # they do not parse to one or more statements each
+    def parseTexts(self, texts):
+        if not texts:
+            return {}
+        lines = []      # last line of each text in the joined block
+        count = 0
+        for text, fingerprint in texts:
+            count += text.count('\n') + 1
+            lines.append(count)
+
+        try:
+            with self.pool.parser() as parser:
+                ast = parser.parse(wrapBlock('\n'.join(text for text, fingerprint in texts)), '<block>')
+        except ParseError:
+            return None
+        items = ast.ext[0].body.block_items[:-1]
+
+        # line 1 of the wrapped block is the function header
+        grouped = [[] for text in texts]
+        index = 0
+        for item in items:
+            line = item.coord.line - 1
+            while index < len(lines) and line > lines[index]:
+                index += 1
+            if index == len(lines):
+                return None
+            grouped[index].append(item)
+        if not all(grouped):
+            return None
+
+        self.stats['parsed'] = len(texts)
+        return dict((fingerprint, Statement([transform(item) for item in group]))
+                    for (text, fingerprint), group in zip(texts, grouped))
+
+    # functional AST of the block made of statements, the same as
+    # minicToFunctional gives for the whole block
+    def translateStatements(self, statements):
+        items = []
+        owners = []
+        for statement in statements:
+            items.extend(statement.items)
+            owners.extend([statement] * len(statement.items))
+        items.append(BLOCK_RETURN)
+        owners.append(None)
+
+        # the function header, from the sets of the statements in order
+        fileVars = NodeVars()
+        for statement in statements:
+            for item in statement.items:
+                fileVars.update(statement.varSets.of(item))
+        nonDeclaredVars, lhsVar = functionHeader(fileVars)
+
+        # like minicToFunctional on a FileAST, statements translated to
+        # nothing at the start of the block are skipped
+        body = None
+        for first in range(len(items)):
+            frames, body = self.sequenceFrames(items, owners, first)
+            if frames or body is not None:
+                break
+
+        # keep the frames of the levels used this time only
+        for statement in statements:
+            if statement.usedFrames:
+                statement.frames, statement.usedFrames = statement.usedFrames, {}
+        return my.FuncDef(nonDeclaredVars, self.buildLets(frames, body), lhsVar)
+
+    # frames and body of the statements from items[first] on
+    def sequenceFrames(self, items, owners, first):
+        frames = []
+        bindings = []
+        level = 1
+        for i in range(first, len(items)):
+            item = items[i]
+            statement = owners[i]
+            if statement is not None and isinstance(item, BINDING_STATEMENTS):
+                itemFrames = self.itemFrames(statement, item, level)
+                if itemFrames is not None:
+                    frames.extend(itemFrames[0])
+                    bindings.extend(itemFrames[1])
+                    level += len(itemFrames[0])
+                    continue
+                varSets = statement.varSets
+            else:
+                varSets = statement.varSets if statement is not None else VarSets()
+
+            # the sequence ends in this statement, its body depends on the
+            # bindings and statements around it
+            self.stats['translated'] += 1
+            itemFrames, body, bindings, last = statementFrames(item, StatementCursor(items, i + 1), bindings,
+                                                               level, varSets)
+            return frames + itemFrames, body
+        return frames, None
+
+    # (frames, bindings) of a binding statement at level, None when it
+    # ends the sequence
+    def itemFrames(self, statement, item, level):
+        key = (id(item), level)
+        if key in statement.usedFrames:
+            return statement.usedFrames[key]
+        if key in statement.frames:
+            result = statement.frames[key]
+        else:
+            self.stats['translated'] += 1
+            frames, body, bindings, last = statementFrames(item, END_CURSOR, [], level, statement.varSets)
+            result = (frames, bindings) if last is END_OF_STATEMENT else None
+        statement.usedFrames[key] = result
+        return result
+
+    # lets of frames around body, sharing the innermost lets with the
+    # previous translation while their frames and body are the same
+    def buildLets(self, frames, body):
+        oldLets = self.lets
+        sameBody = isinstance(body, list) and isinstance(self.body, list) and body == self.body
+
+        lets = [None] * len(frames)
+        inner = body
+        reused = 0
+        for back in range(1, len(frames) + 1):
+            frame = frames[-back]
+            if sameBody and back <= len(oldLets) and oldLets[-back][0] is frame:
+                inner = oldLets[-back][1]
+                reused += 1
+            else:
+                sameBody = False
+                letClass, ident, assignedExpr, letLevel = frame
+                if letClass is my.Letrec:
+                    inner = my.Letrec('loop', ident, assignedExpr, inner, letLevel)
+                else:
+                    inner = my.Let(ident, assignedExpr, inner, letLevel)
+            lets[-back] = (frame, inner)
+
+        self.stats['reusedLets'] = reused
+        self.lets = lets
+        self.body = body
+        return inner
+
+
+# translator kept by update() between calls in this process
+incrementalTranslator = IncrementalTranslator()
+
+
+# translate newSource, an edited version of oldSource, reusing what was
+# computed for oldSource by the previous call
+def update(oldSource, newSource):
+    return incrementalTranslator.update(oldSource, newSource)
@@ -0,0 +1,487 @@
+'''
+Compact, array backed storage for the functional programming ASTs.
+
+A block of 100k statements becomes millions of small myfunctional_ast6
+objects, each with its own level and __weakref__ slots, and the garbage
+collector walks all of them on every full collection. A CompactAST keeps
+the same tree in a few flat columns instead:
+  - kinds:  array('B'), the node class of each node (index in NODE_CLASSES)
+  - levels: array('i'), the level field of each node
+  - starts: array('I'), where the fields of each node start in slots
+  - slots:  array('i'), the encoded fields of the nodes and the items of
+            their lists and tuples
+  - names:  list of the distinct strings (variable names, operators,
+            constants), each stored once
+  - objects: the few values that are none of the above (None, the parameter
+            set of the function, ...), kept as they are
+
+An encoded value is an int whose low TAG_BITS bits say what it is (NODE,
+NAME, LIST, TUPLE, INT or OBJECT) and whose other bits are the index of the
+node, name or object, the offset of the sequence in slots (its length
+followed by its items) or the int itself. The fields of a node are the
+slots of its class except level and __weakref__, in that order.
+
+Nodes are stored children first, so the root is the last node. The
+nodes of an interned AST (see myfunctional_intern) are stored once however
+often they appear, the nodes of a mutable AST once per occurrence. toCompact and fromCompact
+convert between the two forms, printCompact prints a CompactAST directly
+with the same text as printFunctional.
+
+The columns are plain array.array objects, numpyColumns gives NumPy views
+of them when NumPy is installed.
+'''
+
+import io
+import sys
+from array import array
+
+import myfunctional_ast6 as my
+from myfunctional_printer import FunctionalPrinter, INDENT, isMultiline
+
+
+TAG_BITS = 3
+TAG_MASK = (1 << TAG_BITS) - 1
+NODE, NAME, LIST, TUPLE, INT, OBJECT = range(6)
+
+# ints stored in the slots themselves, others are kept as objects
+INT_LIMIT = 1 << (31 - TAG_BITS)
+
+# node classes, the kind of a node is the index of its class
+NODE_CLASSES = tuple(sorted((cls for cls in vars(my).values()
+                             if isinstance(cls, type) and issubclass(cls, my.Node)
+                             and '__slots__' in vars(cls) and cls.__slots__),
+                            key=lambda cls: cls.__name__))
+KINDS = dict((cls, kind) for kind, cls in enumerate(NODE_CLASSES))
+
+# names of the stored fields of each kind, and their positions
+FIELDS = tuple(tuple(name for name in cls.__slots__ if name not in ('level', '__weakref__'))
+               for cls in NODE_CLASSES)
+FIELD_POSITIONS = tuple(dict((name, position) for position, name in enumerate(fields))
+                        for fields in FIELDS)
+HAS_LEVEL = tuple('level' in cls.__slots__ for cls in NODE_CLASSES)
+
+# kinds that always span several lines, see myfunctional_printer
+MULTILINE_KINDS = frozenset(KINDS[cls] for cls in (my.Let, my.Letrec, my.TernaryOp, my.FuncDef))
+
+ID, CONSTANT, BINARY_OP, ARRAY_REF, FUNC_CALL, UNARY_OP, EXPR_LIST, RETURN_TUPLES, LETREC_CALL, \
+    LET, LETREC, TERNARY_OP, FUNC_DEF = [KINDS[cls] for cls in (
+        my.ID, my.Constant, my.BinaryOp, my.ArrayRef, my.FuncCall, my.UnaryOp, my.ExprList,
+        my.ReturnTuples, my.LetrecCall, my.Let, my.Letrec, my.TernaryOp, my.FuncDef)]
+
+
+# class of a node, the mutable class for interned nodes
+def nodeClass(node):
+    return getattr(node, 'mutableClass', node.__class__)
+
+
+class CompactAST(object):
+    def __init__(self):
+        self.kinds = array('B')
+        self.levels = array('i')
+        self.starts = array('I')
+        self.slots = array('i')
+        self.names = []
+        self.objects = [None]
+        self.root = OBJECT          # encoded root value, None until built
+
+    # number of nodes
+    def __len__(self):
+        return len(self.kinds)
+
+    # bytes used by the columns (the names and objects are not counted)
+    def nbytes(self):
+        return sum(len(column) * column.itemsize
+                   for column in (self.kinds, self.levels, self.starts, self.slots))
+
+    # NumPy arrays sharing the memory of the columns
+    def numpyColumns(self):
+        import numpy
+        return dict((name, numpy.frombuffer(getattr(self, name), dtype=getattr(self, name).typecode))
+                    for name in ('kinds', 'levels', 'starts', 'slots'))
+
+    # node index of the encoded value, or None when it is not a node
+    def nodeIndex(self, value):
+        if value & TAG_MASK == NODE:
+            return value >> TAG_BITS
+        return None
+
+    # kind of the encoded value, or None when it is not a node
+    def kind(self, value):
+        if value & TAG_MASK == NODE:
+            return self.kinds[value >> TAG_BITS]
+        return None
+
+    # encoded field called name of the encoded node
+    def field(self, value, name):
+        index = value >> TAG_BITS
+        return self.slots[self.starts[index] + FIELD_POSITIONS[self.kinds[index]][name]]
+
+    def level(self, value):
+        return self.levels[value >> TAG_BITS]
+
+    def isSequence(self, value):
+        return value & TAG_MASK in (LIST, TUPLE)
+
+    # encoded items of an encoded list or tuple
+    def items(self, value):
+        offset = value >> TAG_BITS
+        return self.slots[offset + 1:offset + 1 + self.slots[offset]]
+
+    # python value of an encoded value, nodes are rebuilt as
+    # myfunctional_ast6 nodes
+    def decode(self, value):
+        tag = value & TAG_MASK
+        if tag == NAME:
+            return self.names[value >> TAG_BITS]
+        if tag == INT:
+            return value >> TAG_BITS
+        if tag == OBJECT:
+            return self.objects[value >> TAG_BITS]
+        return self.toNodes(value)
+
+    # myfunctional_ast6 version of the encoded value (a node or a
+    # sequence). Nodes shared in the compact form are shared in the result.
+    def toNodes(self, root):
+        needed = set()
+        stack = [root]
+        while stack:
+            value = stack.pop()
+            tag = value & TAG_MASK
+            if tag == NODE:
+                index = value >> TAG_BITS
+                if index in needed:
+                    continue
+                needed.add(index)
+                start = self.starts[index]
+                stack.extend(self.slots[start:start + len(FIELDS[self.kinds[index]])])
+            elif tag == LIST or tag == TUPLE:
+                stack.extend(self.items(value))
+
+        built = {}
+        for index in sorted(needed):
+            kind = self.kinds[index]
+            node = object.__new__(NODE_CLASSES[kind])
+            start = self.starts[index]
+            for position, name in enumerate(FIELDS[kind]):
+                setattr(node, name, self.plainValue(self.slots[start + position], built))
+            if HAS_LEVEL[kind]:
+                node.level = self.levels[index]
+            built[index] = node
+        return self.plainValue(root, built)
+
+    # python value of an encoded value whose nodes are in built
+    def plainValue(self, value, built):
+        tag = value & TAG_MASK
+        if tag == NODE:
+            return built[value >> TAG_BITS]
+        if tag == NAME:
+            return self.names[value >> TAG_BITS]
+        if tag == LIST:
+            return [self.plainValue(item, built) for item in self.items(value)]
+        if tag == TUPLE:
+            return tuple(self.plainValue(item, built) for item in self.items(value))
+        if tag == INT:
+            return value >> TAG_BITS
+        return self.objects[value >> TAG_BITS]
+
+
+# marks the entries of the build stack whose children are encoded
+PENDING = object()
+
+
+class CompactBuilder(object):
+    def __init__(self):
+        self.compact = CompactAST()
+        self.nameIndex = {}
+        self.internedIndex = {}     # id of an interned input node -> encoded node
+
+    # encoded value of a string, an int or another plain value
+    def encodePlain(self, value):
+        if isinstance(value, str):
+            index = self.nameIndex.get(value)
+            if index is None:
+                index = self.nameIndex[value] = len(self.compact.names)
+                self.compact.names.append(value)
+            return (index << TAG_BITS) | NAME
+        if value.__class__ is int and -INT_LIMIT <= value < INT_LIMIT:
+            return (value << TAG_BITS) | INT
+        if value is None:
+            return OBJECT
+        self.compact.objects.append(value)
+        return ((len(self.compact.objects) - 1) << TAG_BITS) | OBJECT
+
+    # store the AST value, children first
+    #
+    # Like Converter.convert in c_ast_to_minic, the stack holds values still
+    # to be encoded and (PENDING, value, count) tuples for nodes, lists and tuples
+    # whose count encoded fields or items are on top of the results stack.
+    # Interned nodes are stored once, other nodes once per occurrence, so
+    # no table of all the nodes of a large AST is needed.
+    def build(self, root):
+        compact = self.compact
+        kinds, levels, starts, slots = compact.kinds, compact.levels, compact.starts, compact.slots
+        internedIndex = self.internedIndex
+        results = []
+        stack = [root]
+        while stack:
+            value = stack.pop()
+            cls = value.__class__
+
+            if cls is tuple and value and value[0] is PENDING:
+                _, value, count = value
+                if count:
+                    items = results[-count:]
+                    del results[-count:]
+                else:
+                    items = []
+                if isinstance(value, my.Node):
+                    kind = KINDS[nodeClass(value)]
+                    encoded = (len(kinds) << TAG_BITS) | NODE
+                    kinds.append(kind)
+                    levels.append(getattr(value, 'level', 0) if HAS_LEVEL[kind] else 0)
+                    starts.append(len(slots))
+                    if hasattr(value, 'mutableClass'):
+                        internedIndex[id(value)] = encoded
+                else:
+                    encoded = (len(slots) << TAG_BITS) | (LIST if isinstance(value, list) else TUPLE)
+                    slots.append(count)
+                slots.extend(items)
+                results.append(encoded)
+
+            elif isinstance(value, my.Node):
+                encoded = internedIndex.get(id(value))
+                if encoded is not None:
+                    results.append(encoded)
+                    continue
+                fields = FIELDS[KINDS[nodeClass(value)]]
+                stack.append((PENDING, value, len(fields)))
+                for name in reversed(fields):
+                    stack.append(getattr(value, name, None))
+
+            elif cls is list or cls is tuple:
+                stack.append((PENDING, value, len(value)))
+                stack.extend(reversed(value))
+
+            else:
+                results.append(self.encodePlain(value))
+
+        compact.root = results[0]
+        return compact
+
+
+# CompactAST of the functional programming AST root (mutable or interned)
+def toCompact(root):
+    return CompactBuilder().build(root)
+
+
+# myfunctional_ast6 AST of a CompactAST
+def fromCompact(compact):
+    return compact.toNodes(compact.root)
+
+
+class CompactPrinter(object):
+    '''
+    FunctionalPrinter for a CompactAST, it reads the columns directly and
+    produces the same text. Values are encoded values, values kept as
+    objects are printed by a FunctionalPrinter.
+    '''
+    def __init__(self, compact, out, storedLevels = False):
+        self.compact = compact
+        self.out = out
+        self.storedLevels = storedLevels
+        self.plain = FunctionalPrinter(None, storedLevels)
+
+    def indent(self, value, depth):
+        compact = self.compact
+        if self.storedLevels and value & TAG_MASK == NODE and HAS_LEVEL[compact.kind(value)]:
+            depth = compact.level(value)
+        return depth * INDENT
+
+    def write(self, value, depth = 0):
+        compact = self.compact
+        out = self.out
+        stack = [(value, depth)]
+        while stack:
+            task = stack.pop()
+            if isinstance(task, str):
+                out.write(task)
+                continue
+
+            value, depth = task
+            kind = compact.kind(value)
+            indent = self.indent(value, depth)
+
+            if kind == LET:
+                ident = compact.field(value, 'ident')
+                if compact.isSequence(ident):
+                    out.write(indent + "Let (" + ", ".join(self.inlineItems(ident)) + ") = ")
+                else:
+                    out.write(indent + "Let " + self.inline(ident) + " = ")
+
+                body = compact.field(value, 'bodyExpr')
+                if body & TAG_MASK == LIST:
+                    stack.append("\n" + indent + "in " + self.returnList(body))
+                else:
+                    self.pushChild(stack, body, depth + 1)
+                    stack.append("\n" + indent + "in ")
+                self.pushChild(stack, compact.field(value, 'assignedExpr'), depth + 1)
+
+            elif kind == LETREC:
+                args = " ".join(self.inlineItems(compact.field(value, 'args')))
+                out.write(indent + "let rec " + self.inline(compact.field(value, 'ident')) + " " + args + " = \n")
+
+                body = compact.field(value, 'bodyExpr')
+                if compact.kind(body) == RETURN_TUPLES:
+                    stack.append(self.render(body, depth + 1).strip())
+                else:
+                    stack.append((body, depth + 1))
+                    stack.append("\n")
+                stack.append("\n" + indent + "in ")
+                stack.append((compact.field(value, 'assignedExpr'), depth + 1))
+
+            elif kind == TERNARY_OP:
+                out.write(indent + "if " + self.inline(compact.field(value, 'cond')) + "\n" + indent + "then\n")
+                stack.append((compact.field(value, 'iffalse'), depth + 1))
+                stack.append("\n" + indent + "else\n")
+                stack.append((compact.field(value, 'iftrue'), depth + 1))
+
+            elif kind == FUNC_DEF:
+                parameters = ", ".join(self.inlineItems(compact.field(value, 'parameters')))
+                returns = ", ".join(self.inlineItems(compact.field(value, 'returns')))
+                out.write("func block_function(" + parameters + ") return (" + returns + ") =\n")
+                stack.append((compact.field(value, 'body'), depth + 1))
+
+            else:
+                out.write(self.expression(value, depth))
+
+    def pushChild(self, stack, child, depth):
+        if self.isMultiline(child):
+            stack.append((child, depth))
+            stack.append("\n")
+        else:
+            stack.append(self.render(child, depth).strip())
+
+    def isMultiline(self, value):
+        compact = self.compact
+        kind = compact.kind(value)
+        if kind is None:
+            tag = value & TAG_MASK
+            if tag == NAME:
+                return '\n' in compact.names[value >> TAG_BITS]
+            if tag == OBJECT:
+                return isMultiline(compact.decode(value))
+            return False
+        if kind in MULTILINE_KINDS:
+            return True
+        if kind == ID:
+            return '\n' in str(compact.decode(compact.field(value, 'name')))
+        if kind == CONSTANT:
+            return '\n' in str(compact.decode(compact.field(value, 'value')))
+        if kind == BINARY_OP:
+            return self.isMultiline(compact.field(value, 'left')) or self.isMultiline(compact.field(value, 'right'))
+        if kind == ARRAY_REF:
+            return (self.isMultiline(compact.field(value, 'name'))
+                    or self.isMultiline(compact.field(value, 'subscript')))
+        if kind == FUNC_CALL:
+            return self.isMultiline(compact.field(value, 'name')) or self.anyMultiline(compact.field(value, 'args'))
+        if kind == UNARY_OP:
+            return self.isMultiline(compact.field(value, 'expr'))
+        if kind in (EXPR_LIST, RETURN_TUPLES):
+            exprs = compact.field(value, 'exprs')
+            if kind == RETURN_TUPLES and not compact.isSequence(exprs):
+                return False
+            return self.anyMultiline(exprs)
+        if kind == LETREC_CALL:
+            return self.anyMultiline(compact.field(value, 'args'))
+        return False
+
+    # True when an item of the encoded sequence spans several lines
+    def anyMultiline(self, value):
+        if self.compact.isSequence(value):
+            return any(self.isMultiline(item) for item in self.compact.items(value))
+        return any(isMultiline(item) for item in self.compact.decode(value))
+
+    def inline(self, value):
+        return self.render(value, 0)
+
+    # inline texts of the items of an encoded sequence (or of a set kept as
+    # an object)
+    def inlineItems(self, value):
+        if self.compact.isSequence(value):
+            return [self.inline(item) for item in self.compact.items(value)]
+        return [self.plain.inline(item) for item in self.compact.decode(value)]
+
+    def render(self, value, depth):
+        if self.compact.kind(value) in MULTILINE_KINDS:
+            buf = io.StringIO()
+            CompactPrinter(self.compact, buf, self.storedLevels).write(value, depth)
+            return buf.getvalue()
+        return self.expression(value, depth)
+
+    def expression(self, value, depth):
+        compact = self.compact
+        kind = compact.kind(value)
+        if kind is None:
+            # names, lists of names and missing bodies
+            return str(compact.decode(value))
+
+        indent = self.indent(value, depth)
+        if kind == ID:
+            return indent + str(compact.decode(compact.field(value, 'name')))
+        if kind == CONSTANT:
+            return indent + str(compact.decode(compact.field(value, 'value')))
+        if kind == BINARY_OP:
+            return (indent + "(" + self.inline(compact.field(value, 'left')) + " "
+                    + str(compact.decode(compact.field(value, 'op'))) + " "
+                    + self.inline(compact.field(value, 'right')) + ")")
+        if kind == ARRAY_REF:
+            return (indent + self.inline(compact.field(value, 'name'))
+                    + "[" + self.inline(compact.field(value, 'subscript')) + "]")
+        if kind == FUNC_CALL:
+            return (indent + self.inline(compact.field(value, 'name'))
+                    + "(" + ", ".join(self.inlineItems(compact.field(value, 'args'))) + ")")
+        if kind == UNARY_OP:
+            return (indent + str(compact.decode(compact.field(value, 'op')))
+                    + "(" + self.inline(compact.field(value, 'expr')) + ")")
+        if kind == EXPR_LIST:
+            return "[" + ", ".join(self.inlineItems(compact.field(value, 'exprs'))) + "]"
+        if kind == RETURN_TUPLES:
+            exprs = compact.field(value, 'exprs')
+            if compact.isSequence(exprs):
+                items = compact.items(exprs)
+                if len(items) != 1:
+                    return indent + "(" + ", ".join(self.inline(item) for item in items) + ")"
+                return indent + self.inline(items[0])
+            return indent
+        if kind == LETREC_CALL:
+            return (indent + str(compact.decode(compact.field(value, 'ident')))
+                    + "".join(" " + text for text in self.inlineItems(compact.field(value, 'args'))))
+        if kind in MULTILINE_KINDS:
+            return self.render(value, depth)
+        return str(compact.decode(value))
+
+    def returnList(self, value):
+        items = self.inlineItems(value)
+        if len(items) == 1:
+            return items[0]
+        return "(" + ", ".join(items) + ")"
+
+
+# write the CompactAST to out (stdout by default), like printFunctional
+#   depth:        indentation of the first line, the level of the root when not given
+#   storedLevels: indent by the stored levels
+def printCompact(compact, out = None, depth = None, storedLevels = False):
+    if out is None:
+        out = sys.stdout
+    root = compact.root
+    if depth is None:
+        kind = compact.kind(root)
+        depth = compact.level(root) if kind is not None and HAS_LEVEL[kind] else 0
+    CompactPrinter(compact, out, storedLevels).write(root, depth)
+
+
+# text of the CompactAST, same as functionalToString of the AST it stores
+def compactToString(compact, depth = None, storedLevels = False):
+    buf = io.StringIO()
+    printCompact(compact, buf, depth, storedLevels)
+    return buf.getvalue()
@@ -0,0 +1,407 @@
+'''
+Evaluation of the functional programming ASTs (myfunctional_ast6).
+
+compileFunction turns the FuncDef of a translated (or simplified) block into
+nested Python closures once. Calling the result runs the block on an
+environment of parameter values, no node is looked at again:
+
+    block = compileFunction(functionalAST, functions={'f': f})
+    block({'n': 10, 'a': [1, 2, 3]})     ->  {'s': 6, 'i': 3, ...}
+
+Variables live in slots of a frame (a list) numbered at compile time. A let
+writes its slot and goes on with its body, which gives the values of the
+nested lets: every let inside an if or a loop binds a variable the let made
+for the if or the loop binds again once it is done.
+
+Chains of lets and let recs are run by a loop over their steps, so a long
+block does not need a Python frame per statement. A let rec runs as a while
+loop: its call (LetrecCall) assigns the arguments and returns CONTINUE
+instead of recursing, so loops may run any number of iterations. Python
+frames only grow with the nesting depth of the ifs and loops.
+
+Values follow C on Python ints: comparisons and logical operators give 0
+or 1, && and || short circuit, / and % truncate toward zero. Integers do not
+wrap. Arrays are lists (or dicts, or anything indexable with a copy
+method). Functions called by the block are looked up in functions when they
+are called.
+
+Arrays are values: a let of an element (Let a[i] = e) gives a new array and
+leaves the old one as it was. The first update of an array a variable holds
+copies it, the copy is then owned by the variable (slot) and the next
+updates write it in place, so a loop updating an element per iteration does
+not copy the array each time. A variable loses the ownership of its array
+when the array is bound to another variable, stored in an array or passed
+to a function, its next update copies it again. The arrays given in the
+environment are never modified.
+'''
+
+import myfunctional_ast6 as my
+
+
+class EvaluationError(Exception):
+    pass
+
+
+# value of a variable that was never given nor bound
+UNSET = None
+
+# returned by a let rec call to start the next iteration of its loop
+CONTINUE = object()
+
+# slot of the frame holding the owned arrays: slot -> array only that slot holds
+OWNERS = 0
+
+
+# value of a C literal: integers (decimal, hex, octal, with suffixes),
+# floats, characters, strings are kept as text
+def constantValue(text):
+    text = str(text).strip()
+    if text.startswith("'") and text.endswith("'") and len(text) >= 3:
+        char = text[1:-1]
+        if char.startswith('\\'):
+            char = char.encode('latin-1').decode('unicode_escape')
+        return ord(char)
+    if text.startswith('"'):
+        return text
+    stripped = text.rstrip('uUlL')
+    try:
+        if stripped.lower().startswith('0x'):
+            return int(stripped, 16)
+        if stripped.startswith('0') and len(stripped) > 1 and stripped.isdigit():
+            return int(stripped, 8)
+        return int(stripped)
+    except ValueError:
+        pass
+    try:
+        return float(text.rstrip('fFlL'))
+    except ValueError:
+        raise EvaluationError("unsupported constant %r" % text)
+
+
+def cDivide(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        quotient = abs(a) // abs(b)
+        return -quotient if (a < 0) != (b < 0) else quotient
+    return a / b
+
+
+def cModulo(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return a - b * cDivide(a, b)
+    raise EvaluationError("%% of non integer values %r and %r" % (a, b))
+
+
+BINARY_OPS = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': cDivide,
+    '%': cModulo,
+    '<<': lambda a, b: a << b,
+    '>>': lambda a, b: a >> b,
+    '&': lambda a, b: a & b,
+    '|': lambda a, b: a | b,
+    '^': lambda a, b: a ^ b,
+    '<': lambda a, b: 1 if a < b else 0,
+    '>': lambda a, b: 1 if a > b else 0,
+    '<=': lambda a, b: 1 if a <= b else 0,
+    '>=': lambda a, b: 1 if a >= b else 0,
+    '==': lambda a, b: 1 if a == b else 0,
+    '!=': lambda a, b: 1 if a != b else 0,
+}
+
+UNARY_OPS = {
+    '-': lambda a: -a,
+    '+': lambda a: a,
+    '!': lambda a: 0 if a else 1,
+    '~': lambda a: ~a,
+}
+
+
+# copy of array with the element at keys (outermost subscript first) set to value
+def updatedArray(array, keys, value):
+    if array is UNSET:
+        raise EvaluationError("element of an array that was never given")
+    array = array.copy()
+    if len(keys) == 1:
+        array[keys[0]] = value
+    else:
+        array[keys[0]] = updatedArray(array[keys[0]], keys[1:], value)
+    return array
+
+
+# array of slot to update in place: the array of the slot if the slot owns
+# it, or a copy the slot owns from now on
+def ownedArray(frame, slot):
+    array = frame[slot]
+    if array is UNSET:
+        raise EvaluationError("element of an array that was never given")
+    owners = frame[OWNERS]
+    if owners.get(slot) is not array:
+        array = owners[slot] = frame[slot] = array.copy()
+    return array
+
+
+# value is about to be held by slot (None for an array element or a function
+# argument) too, the slot owning it, if any other, loses it
+def share(owners, value, slot=None):
+    for owner, array in owners.items():
+        if array is value:
+            if owner != slot:
+                del owners[owner]
+            return
+
+
+# name bound by a let or read by a return tuple: a string or an ID
+def variableName(value):
+    if isinstance(value, my.ID):
+        return value.name
+    return str(value).strip()
+
+
+class Compiler(object):
+    def __init__(self):
+        self.slots = {}     # variable name -> slot of the frame
+        self.loops = []     # argument slots of the enclosing let recs, innermost last, with their names
+
+    def slot(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            # slot OWNERS comes first
+            slot = self.slots[name] = len(self.slots) + 1
+        return slot
+
+    # closure computing the value of node from a frame
+    def compile(self, node):
+        if isinstance(node, (my.Let, my.Letrec)):
+            return self.compileChain(node)
+        if isinstance(node, my.Constant):
+            value = constantValue(node.value)
+            return lambda frame: value
+        if isinstance(node, (my.ID, str)):
+            slot = self.slot(variableName(node))
+            return lambda frame: frame[slot]
+        if isinstance(node, my.BinaryOp):
+            return self.compileBinaryOp(node)
+        if isinstance(node, my.UnaryOp):
+            return self.compileUnaryOp(node)
+        if isinstance(node, my.TernaryOp):
+            cond, iftrue, iffalse = self.compile(node.cond), self.compile(node.iftrue), self.compile(node.iffalse)
+            return lambda frame: iftrue(frame) if cond(frame) else iffalse(frame)
+        if isinstance(node, my.ArrayRef):
+            name, subscript = self.compile(node.name), self.compile(node.subscript)
+            return lambda frame: name(frame)[subscript(frame)]
+        if isinstance(node, my.FuncCall):
+            return self.compileFuncCall(node)
+        if isinstance(node, my.ExprList):
+            exprs = [self.compile(expr) for expr in node.exprs]
+            return lambda frame: [expr(frame) for expr in exprs][-1]
+        if isinstance(node, my.ReturnTuples):
+            return self.compileTuple(node.exprs)
+        if isinstance(node, (list, tuple)):
+            return self.compileTuple(node)
+        if isinstance(node, my.LetrecCall):
+            return self.compileLetrecCall(node)
+        raise EvaluationError("can not evaluate %s nodes" % node.__class__.__name__)
+
+    def compileBinaryOp(self, node):
+        left, right = self.compile(node.left), self.compile(node.right)
+        if node.op == '&&':
+            return lambda frame: 1 if left(frame) and right(frame) else 0
+        if node.op == '||':
+            return lambda frame: 1 if left(frame) or right(frame) else 0
+        op = BINARY_OPS.get(node.op)
+        if op is None:
+            raise EvaluationError("unsupported binary operator %s" % node.op)
+        return lambda frame: op(left(frame), right(frame))
+
+    def compileUnaryOp(self, node):
+        op = UNARY_OPS.get(node.op)
+        if op is None:
+            raise EvaluationError("unsupported unary operator %s" % node.op)
+        expr = self.compile(node.expr)
+        return lambda frame: op(expr(frame))
+
+    def compileFuncCall(self, node):
+        name = variableName(node.name)
+        args = [self.compile(arg) for arg in node.args]
+        compiler = self
+
+        def call(frame):
+            function = compiler.functions.get(name)
+            if function is None:
+                raise EvaluationError("function %s is not defined" % name)
+            values = [arg(frame) for arg in args]
+            owners = frame[OWNERS]
+            if owners:
+                for value in values:
+                    share(owners, value)
+            return function(*values)
+        return call
+
+    # closure building the tuple of the values of exprs (names or expressions)
+    def compileTuple(self, exprs):
+        if all(isinstance(expr, (str, my.ID)) for expr in exprs):
+            slots = [self.slot(variableName(expr)) for expr in exprs]
+            if len(slots) == 1:
+                slot = slots[0]
+                return lambda frame: (frame[slot],)
+            return lambda frame: tuple([frame[slot] for slot in slots])
+        values = [self.compile(expr) for expr in exprs]
+        return lambda frame: tuple([value(frame) for value in values])
+
+    def compileLetrecCall(self, node):
+        for name, slots in reversed(self.loops):
+            if name == variableName(node.ident):
+                break
+        else:
+            raise EvaluationError("call of %s outside of its let rec" % node.ident)
+        args = [self.slot(variableName(arg)) for arg in node.args]
+        if args == slots:
+            # the arguments are already in place
+            return lambda frame: CONTINUE
+        values = self.compileTuple(node.args)
+
+        def call(frame):
+            owners = frame[OWNERS]
+            for slot, value in zip(slots, values(frame)):
+                if owners:
+                    share(owners, value, slot)
+                frame[slot] = value
+            return CONTINUE
+        return call
+
+    # closure running a chain of lets and let recs and returning the value of
+    # the expression that ends it
+    def compileChain(self, node):
+        steps = []
+        while isinstance(node, (my.Let, my.Letrec)):
+            if isinstance(node, my.Letrec):
+                steps.append(self.compileLetrec(node))
+            else:
+                steps.append(self.compileLet(node))
+            node = node.bodyExpr
+        last = self.compile(node)
+
+        def chain(frame):
+            for step in steps:
+                step(frame)
+            return last(frame)
+        return chain
+
+    # step of a let: compute the assigned expression and bind it
+    def compileLet(self, node):
+        assigned = self.compile(node.assignedExpr)
+        ident = node.ident
+
+        if isinstance(ident, (list, tuple)):
+            slots = [self.slot(variableName(name)) for name in ident]
+
+            def bindAll(frame):
+                owners = frame[OWNERS]
+                for slot, value in zip(slots, assigned(frame)):
+                    if owners:
+                        share(owners, value, slot)
+                    frame[slot] = value
+            return bindAll
+
+        if isinstance(ident, my.ArrayRef):
+            keys = []
+            while isinstance(ident, my.ArrayRef):
+                keys.append(self.compile(ident.subscript))
+                ident = ident.name
+            keys.reverse()
+            slot = self.slot(variableName(ident))
+
+            def bindElement(frame):
+                value = assigned(frame)
+                if type(value) is tuple:
+                    value = value[0]
+                if frame[OWNERS]:
+                    share(frame[OWNERS], value)
+                subscripts = [key(frame) for key in keys]
+                array = ownedArray(frame, slot)
+                if len(subscripts) == 1:
+                    array[subscripts[0]] = value
+                else:
+                    # the inner arrays may be held elsewhere, they are copied
+                    array[subscripts[0]] = updatedArray(array[subscripts[0]], subscripts[1:], value)
+            return bindElement
+
+        slot = self.slot(variableName(ident))
+        if isinstance(node.assignedExpr, (my.Constant, my.BinaryOp, my.UnaryOp)):
+            # a new value, never an array a slot owns
+            def bindNew(frame):
+                frame[slot] = assigned(frame)
+            return bindNew
+
+        def bind(frame):
+            value = assigned(frame)
+            # an if binding a single variable gives a tuple of one value
+            if type(value) is tuple:
+                value = value[0]
+            if frame[OWNERS]:
+                share(frame[OWNERS], value, slot)
+            frame[slot] = value
+        return bind
+
+    # step of a let rec: run the loop until its condition fails, then bind
+    # the arguments to their final values
+    def compileLetrec(self, node):
+        slots = [self.slot(variableName(arg)) for arg in node.args]
+        self.loops.append((variableName(node.ident), slots))
+        try:
+            iteration = self.compile(node.assignedExpr)
+        finally:
+            self.loops.pop()
+
+        def loop(frame):
+            result = iteration(frame)
+            while result is CONTINUE:
+                result = iteration(frame)
+            owners = frame[OWNERS]
+            for slot, value in zip(slots, result):
+                if owners:
+                    share(owners, value, slot)
+                frame[slot] = value
+        return loop
+
+
+class CompiledFunction(object):
+    # funcDef:   FuncDef of a block
+    # functions: name -> Python function, for the calls in the block
+    def __init__(self, funcDef, functions=None):
+        if not isinstance(funcDef, my.FuncDef):
+            raise EvaluationError("only FuncDef nodes can be compiled, not %s" % funcDef.__class__.__name__)
+        compiler = Compiler()
+        compiler.functions = self.functions = dict(functions or {})
+        self.parameters = [variableName(name) for name in funcDef.parameters]
+        self.returns = [variableName(name) for name in funcDef.returns]
+        self.parameterSlots = [compiler.slot(name) for name in self.parameters]
+        self.body = compiler.compile(funcDef.body)
+        self.slots = compiler.slots
+
+    # run the block on env (parameter name -> value), parameters that are not
+    # given start as UNSET
+    # returns the returned variables of the block and their values
+    def __call__(self, env=None, **values):
+        if env:
+            values = dict(env, **values)
+        frame = [UNSET] * (len(self.slots) + 1)
+        frame[OWNERS] = {}
+        for name, slot in zip(self.parameters, self.parameterSlots):
+            if name in values:
+                frame[slot] = values[name]
+        result = self.body(frame)
+        if type(result) is not tuple or len(result) != len(self.returns):
+            raise EvaluationError("the block returned %r for (%s)" % (result, ', '.join(self.returns)))
+        return dict(zip(self.returns, result))
+
+
+def compileFunction(funcDef, functions=None):
+    return CompiledFunction(funcDef, functions)
+
+
+# run the FuncDef of a block once on env
+def evaluate(funcDef, env=None, functions=None):
+    return CompiledFunction(funcDef, functions)(env)
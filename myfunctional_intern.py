@@ -0,0 +1,201 @@
+'''
+Hash-consed, immutable nodes for the functional programming ASTs.
+
+The nodes of myfunctional_ast6 are mutable and compared by identity, and
+the translation builds a new node for every occurrence of a variable, a
+constant or a repeated expression. NodeTable.intern returns an equivalent
+AST made of interned nodes:
+  - structurally identical subtrees are the same object, so an AST keeps one
+    ID('i'), one Constant('1') and one (i + 1) however often they appear
+  - interned nodes are instances of immutable subclasses of the node classes
+    (InternedID is a my.ID, ...), setting an attribute raises AttributeError
+  - they compare structurally and their hash is computed once, when they are
+    interned, from the cached hashes of their children. Inside one table two
+    nodes are equal exactly when they are the same object, so equality
+    checks and dictionaries keyed by nodes cost O(1) per lookup
+
+The list fields (arguments, return tuples, ...) are kept as lists with
+interned elements and must not be modified either. An interned node is its
+own copy (copy.copy and copy.deepcopy return it) and unpickles to the node
+of sharedTable with its structure. node.mutable() gives an ordinary mutable
+node, which is how the passes of checkin6simp build modified versions of an
+AST (see rebuild).
+'''
+
+import myfunctional_ast6 as my
+
+
+class Interned(object):
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("interned %s nodes can not be modified" % self.mutableClass.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError("interned %s nodes can not be modified" % self.mutableClass.__name__)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Interned):
+            return NotImplemented
+        return sameStructure(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def __hash__(self):
+        return self._hash
+
+    # mutable copy, the lists are copied too
+    def mutable(self):
+        node = object.__new__(self.mutableClass)
+        for name in self.fieldNames:
+            value = getattr(self, name)
+            if isinstance(value, list):
+                value = list(value)
+            setattr(node, name, value)
+        return node
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    # unpickled nodes are interned in sharedTable, their children are
+    # unpickled (and interned) first
+    def __reduce__(self):
+        return (unpickleInterned, (self.mutableClass, tuple(getattr(self, name) for name in self.fieldNames)))
+
+
+# True when the interned nodes (or field values) a and b have the same structure
+# The trees are compared with an explicit stack, each pair of subtrees once.
+def sameStructure(a, b):
+    compared = set()
+    stack = [(a, b)]
+    while stack:
+        a, b = stack.pop()
+        if a is b or (id(a), id(b)) in compared:
+            continue
+        compared.add((id(a), id(b)))
+
+        if isinstance(a, Interned):
+            if (not isinstance(b, Interned) or a.mutableClass is not b.mutableClass
+                    or a._hash != b._hash):
+                return False
+            for name in a.fieldNames:
+                stack.append((getattr(a, name), getattr(b, name)))
+        elif isinstance(a, (list, tuple)):
+            if a.__class__ is not b.__class__ or len(a) != len(b):
+                return False
+            stack.extend(zip(a, b))
+        elif isinstance(b, Interned) or a != b:
+            return False
+    return True
+
+
+# names of the fields of a node class
+def fieldNames(cls):
+    return tuple(name for name in cls.__slots__ if name != '__weakref__')
+
+
+# mutable node class -> interned node class
+INTERNED_CLASSES = {}
+
+for _cls in list(vars(my).values()):
+    if isinstance(_cls, type) and issubclass(_cls, my.Node) and '__slots__' in vars(_cls) and _cls.__slots__:
+        INTERNED_CLASSES[_cls] = type('Interned' + _cls.__name__, (Interned, _cls), {
+            '__slots__': ('_hash',),
+            '__module__': __name__,
+            'mutableClass': _cls,
+            'fieldNames': fieldNames(_cls),
+        })
+del _cls
+
+
+# hashable version of a field value whose nodes are already interned
+def fieldKey(value):
+    if isinstance(value, (list, tuple)):
+        return (value.__class__, tuple(fieldKey(item) for item in value))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+
+# interned node of class cls (a mutable node class) with the given field
+# values, built without calling the constructor of cls
+def makeInterned(cls, values):
+    internedClass = INTERNED_CLASSES[cls]
+    node = object.__new__(internedClass)
+    for name, value in zip(internedClass.fieldNames, values):
+        object.__setattr__(node, name, value)
+    object.__setattr__(node, '_hash', hash((cls, tuple(fieldKey(value) for value in values))))
+    return node
+
+
+class NodeTable(object):
+    def __init__(self):
+        self.nodes = {}     # interned node -> itself
+
+    def __len__(self):
+        return len(self.nodes)
+
+    # interned node of class cls with the given field values (children
+    # must already be interned in this table)
+    def make(self, cls, *values):
+        node = makeInterned(cls, values)
+        return self.nodes.setdefault(node, node)
+
+    # interned version of value: a node, a list or tuple of nodes and names,
+    # or a plain value (names, None, ...) which is returned as it is
+    #
+    # The AST is walked with an explicit stack, children first, so deep
+    # chains of lets do not hit the recursion limit. Subtrees shared in the
+    # input are interned once.
+    def intern(self, root):
+        nodes = self.nodes
+        done = {}           # id of an input value -> interned value
+        stack = [(root, False)]
+        while stack:
+            value, childrenDone = stack.pop()
+            if id(value) in done:
+                continue
+
+            if isinstance(value, my.Node):
+                if isinstance(value, Interned) and nodes.get(value) is value:
+                    done[id(value)] = value
+                    continue
+                cls = getattr(value, 'mutableClass', value.__class__)
+                children = [getattr(value, name) for name in INTERNED_CLASSES[cls].fieldNames]
+            elif isinstance(value, (list, tuple)):
+                children = value
+            else:
+                done[id(value)] = value
+                continue
+
+            if not childrenDone:
+                stack.append((value, True))
+                for child in children:
+                    if id(child) not in done:
+                        stack.append((child, False))
+                continue
+
+            children = [done[id(child)] for child in children]
+            if isinstance(value, my.Node):
+                node = makeInterned(cls, children)
+                done[id(value)] = nodes.setdefault(node, node)
+            else:
+                done[id(value)] = value.__class__(children)
+        return done[id(root)]
+
+
+# table the unpickled interned nodes are interned in
+sharedTable = NodeTable()
+
+
+def unpickleInterned(cls, values):
+    return sharedTable.make(cls, *values)
@@ -0,0 +1,207 @@
+'''
+Streaming printer for the functional programming ASTs of myfunctional_ast6.
+
+The __str__ methods of Let, Letrec, TernaryOp and FuncDef build their
+output by concatenating the strings of their children, and Let splits the
+string of each child again to decide between a one line and a multi line
+layout. A chain of n lets is therefore rendered (and rescanned) once per
+enclosing let, which is quadratic, and deep chains also hit the recursion
+limit.
+
+printFunctional writes the same text to a file-like object in a single
+traversal driven by an explicit stack:
+  - whether a child spans several lines is decided from its node type
+    (lets, let recs, ifs and functions always do, other expressions only
+    when they contain one of those), so no child is rendered twice
+  - the indentation of a node comes from where it is in the tree, not from
+    its level field: the body of a function, the assigned expression and
+    body of a let or let rec and the branches of an if are one level
+    deeper than their parent, expressions inside expressions start at 0
+
+For ASTs built by minicToFunctional this is byte-identical to str(ast).
+simplify() drops lets without re-indenting what was under them, there
+str(ast) keeps the old (deeper) indentation and the printer indents by the
+actual nesting. storedLevels=True indents every node by its level field
+instead, which reproduces str(ast) for any AST.
+'''
+
+import io
+import sys
+
+import myfunctional_ast6 as my
+
+
+INDENT = "    "
+
+# nodes that always span several lines
+MULTILINE_NODES = (my.Let, my.Letrec, my.TernaryOp, my.FuncDef)
+
+
+# True when the text of value contains a new line
+def isMultiline(value):
+    if isinstance(value, MULTILINE_NODES):
+        return True
+    if isinstance(value, str):
+        return '\n' in value
+    if isinstance(value, (my.ID, my.Constant)):
+        return '\n' in str(value.name if isinstance(value, my.ID) else value.value)
+    if isinstance(value, my.BinaryOp):
+        return isMultiline(value.left) or isMultiline(value.right)
+    if isinstance(value, my.ArrayRef):
+        return isMultiline(value.name) or isMultiline(value.subscript)
+    if isinstance(value, my.FuncCall):
+        return isMultiline(value.name) or any(isMultiline(arg) for arg in value.args)
+    if isinstance(value, my.UnaryOp):
+        return isMultiline(value.expr)
+    if isinstance(value, my.ExprList):
+        return any(isMultiline(expr) for expr in value.exprs)
+    if isinstance(value, my.ReturnTuples):
+        if isinstance(value.exprs, (tuple, list)):
+            return any(isMultiline(expr) for expr in value.exprs)
+        return False
+    if isinstance(value, my.LetrecCall):
+        return any(isMultiline(arg) for arg in value.args)
+    return False
+
+
+class FunctionalPrinter(object):
+    # storedLevels: indent nodes by their level field like __str__ does
+    def __init__(self, out, storedLevels = False):
+        self.out = out
+        self.storedLevels = storedLevels
+
+    # indentation of node when its parent puts it at depth
+    def indent(self, node, depth):
+        if self.storedLevels:
+            depth = getattr(node, 'level', depth)
+        return depth * INDENT
+
+    # write node with its first line indented depth levels
+    def write(self, node, depth = 0):
+        out = self.out
+        # pending work, last item first: strings are written as they are,
+        # (node, depth) pairs are expanded
+        stack = [(node, depth)]
+        while stack:
+            task = stack.pop()
+            if isinstance(task, str):
+                out.write(task)
+                continue
+
+            node, depth = task
+            indent = self.indent(node, depth)
+
+            if isinstance(node, my.Let):
+                if isinstance(node.ident, (list, tuple)):
+                    out.write(indent + "Let (" + ", ".join(self.inline(ident) for ident in node.ident) + ") = ")
+                else:
+                    out.write(indent + "Let " + self.inline(node.ident) + " = ")
+
+                # pushed in reverse order: assigned expression, 'in', body
+                if isinstance(node.bodyExpr, list):
+                    stack.append("\n" + indent + "in " + self.returnList(node.bodyExpr))
+                else:
+                    self.pushChild(stack, node.bodyExpr, depth + 1)
+                    stack.append("\n" + indent + "in ")
+                self.pushChild(stack, node.assignedExpr, depth + 1)
+
+            elif isinstance(node, my.Letrec):
+                args = " ".join(self.inline(arg) for arg in node.args)
+                out.write(indent + "let rec " + self.inline(node.ident) + " " + args + " = \n")
+
+                if isinstance(node.bodyExpr, my.ReturnTuples):
+                    stack.append(self.render(node.bodyExpr, depth + 1).strip())
+                else:
+                    stack.append((node.bodyExpr, depth + 1))
+                    stack.append("\n")
+                stack.append("\n" + indent + "in ")
+                stack.append((node.assignedExpr, depth + 1))
+
+            elif isinstance(node, my.TernaryOp):
+                out.write(indent + "if " + self.inline(node.cond) + "\n" + indent + "then\n")
+                stack.append((node.iffalse, depth + 1))
+                stack.append("\n" + indent + "else\n")
+                stack.append((node.iftrue, depth + 1))
+
+            elif isinstance(node, my.FuncDef):
+                parameters = ", ".join(self.inline(parameter) for parameter in node.parameters)
+                returns = ", ".join(self.inline(returnVar) for returnVar in node.returns)
+                out.write("func block_function(" + parameters + ") return (" + returns + ") =\n")
+                stack.append((node.body, depth + 1))
+
+            else:
+                out.write(self.expression(node, depth))
+
+    # push a child that goes on the same line when it fits on one,
+    # or on the next lines otherwise
+    def pushChild(self, stack, child, depth):
+        if isMultiline(child):
+            stack.append((child, depth))
+            stack.append("\n")
+        else:
+            stack.append(self.render(child, depth).strip())
+
+    # text of a node inside a line
+    def inline(self, value):
+        return self.render(value, 0)
+
+    # text of a node, only used for expressions and other small subtrees
+    def render(self, value, depth):
+        if isinstance(value, MULTILINE_NODES):
+            buf = io.StringIO()
+            FunctionalPrinter(buf, self.storedLevels).write(value, depth)
+            return buf.getvalue()
+        return self.expression(value, depth)
+
+    def expression(self, node, depth):
+        indent = self.indent(node, depth)
+        if isinstance(node, my.ID):
+            return indent + str(node.name)
+        if isinstance(node, my.Constant):
+            return indent + str(node.value)
+        if isinstance(node, my.BinaryOp):
+            return indent + "(" + self.inline(node.left) + " " + str(node.op) + " " + self.inline(node.right) + ")"
+        if isinstance(node, my.ArrayRef):
+            return indent + self.inline(node.name) + "[" + self.inline(node.subscript) + "]"
+        if isinstance(node, my.FuncCall):
+            return indent + self.inline(node.name) + "(" + ", ".join(self.inline(arg) for arg in node.args) + ")"
+        if isinstance(node, my.UnaryOp):
+            return indent + str(node.op) + "(" + self.inline(node.expr) + ")"
+        if isinstance(node, my.ExprList):
+            return "[" + ", ".join(self.inline(expr) for expr in node.exprs) + "]"
+        if isinstance(node, my.ReturnTuples):
+            if isinstance(node.exprs, (tuple, list)):
+                if len(node.exprs) != 1:
+                    return indent + "(" + ", ".join(self.inline(expr) for expr in node.exprs) + ")"
+                return indent + self.inline(node.exprs[0])
+            return indent
+        if isinstance(node, my.LetrecCall):
+            return indent + str(node.ident) + "".join(" " + self.inline(arg) for arg in node.args)
+        if isinstance(node, MULTILINE_NODES):
+            return self.render(node, depth)
+        # names, lists of names and missing bodies
+        return str(node)
+
+    # the tuple of a let whose body is still a plain list
+    def returnList(self, returnLst):
+        if len(returnLst) == 1:
+            return self.inline(returnLst[0])
+        return "(" + ", ".join(self.inline(expr) for expr in returnLst) + ")"
+
+
+# write the functional programming AST node to out (stdout by default)
+#   depth:        indentation of the first line, the level of node when not given
+#   storedLevels: indent by the level fields, see FunctionalPrinter
+def printFunctional(node, out = None, depth = None, storedLevels = False):
+    if out is None:
+        out = sys.stdout
+    if depth is None:
+        depth = getattr(node, 'level', 0)
+    FunctionalPrinter(out, storedLevels).write(node, depth)
+
+
+# text of the functional programming AST node, same as str(node)
+def functionalToString(node, depth = None, storedLevels = False):
+    buf = io.StringIO()
+    printFunctional(node, buf, depth, storedLevels)
+    return buf.getvalue()
@@ -0,0 +1,400 @@
+'''
+Evaluation of a translated block over many environments at once, with NumPy.
+
+compileVector compiles the FuncDef of a block like myfunctional_eval does,
+but every variable holds a NumPy array with one value per lane (one lane per
+row of the parameter table) and every closure works on all the lanes:
+
+    block = compileVector(simplifiedAST)
+    block({'x': numpy.arange(100000), 'n': 10})   ->  {'s': array([...]), ...}
+
+  - parameters are columns of the same length, a scalar is the same value
+    for every lane and a missing parameter is UNSET. An array parameter is a
+    2-D array, row i is the array of lane i
+  - a variable set in some lanes only (e.g. declared in a branch of an if)
+    is a masked array (numpy.ma) whose unset lanes are masked, returned
+    variables are masked the same way
+  - a chain of lets and operators runs once per batch, whatever the number
+    of lanes
+  - every closure gets the mask of the lanes it runs for. An if (TernaryOp)
+    runs each branch for the lanes that take it, on its own copy of the
+    frame, and merges the results with numpy.where. A branch no lane takes
+    is not run
+  - a let rec loops while one of its lanes still meets the condition, the
+    lanes that are done keep their values
+
+Values are int64 arrays: they wrap around like C integers instead of
+growing like the Python ints of myfunctional_eval. The right side of && and
+|| only runs for the lanes that need it, and a division by zero raises
+EvaluationError only in a lane that runs it. The functions the block calls
+get the arguments of all the lanes of the call as arrays (e.g. NumPy
+ufuncs).
+
+NumPy is only imported when a block is compiled.
+'''
+
+from myfunctional_eval import EvaluationError, UNSET, constantValue, variableName
+import myfunctional_ast6 as my
+
+
+def importNumpy():
+    try:
+        import numpy
+    except ImportError:
+        raise EvaluationError("vectorized evaluation needs numpy")
+    return numpy
+
+
+class VectorCompiler(object):
+    def __init__(self, numpy, functions):
+        self.np = numpy
+        self.functions = functions
+        self.slots = {}     # variable name -> slot of the frame
+        self.loops = []     # (name, argument slots) of the enclosing let recs, innermost last
+
+    def slot(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = len(self.slots)
+        return slot
+
+    # closure computing the values of node for the lanes of mask from a frame
+    def compile(self, node):
+        np = self.np
+        if isinstance(node, (my.Let, my.Letrec)):
+            return self.compileChain(node)
+        if isinstance(node, my.Constant):
+            value = constantValue(node.value)
+            return lambda frame, mask: value
+        if isinstance(node, (my.ID, str)):
+            slot = self.slot(variableName(node))
+            return lambda frame, mask: frame[slot]
+        if isinstance(node, my.BinaryOp):
+            return self.compileBinaryOp(node)
+        if isinstance(node, my.UnaryOp):
+            return self.compileUnaryOp(node)
+        if isinstance(node, my.TernaryOp):
+            return self.compileTernaryOp(node)
+        if isinstance(node, my.ArrayRef):
+            name, subscript = self.compile(node.name), self.compile(node.subscript)
+
+            def element(frame, mask):
+                # lanes that do not run get a valid subscript
+                index = np.where(mask, subscript(frame, mask), 0)
+                return name(frame, mask)[np.arange(len(mask)), index]
+            return element
+        if isinstance(node, my.FuncCall):
+            return self.compileFuncCall(node)
+        if isinstance(node, my.ExprList):
+            exprs = [self.compile(expr) for expr in node.exprs]
+            return lambda frame, mask: [expr(frame, mask) for expr in exprs][-1]
+        if isinstance(node, my.ReturnTuples):
+            return self.compileTuple(node.exprs)
+        if isinstance(node, (list, tuple)):
+            return self.compileTuple(node)
+        if isinstance(node, my.LetrecCall):
+            # the arguments of the next iteration, see compileLetrec
+            return self.compileTuple(node.args)
+        raise EvaluationError("can not evaluate %s nodes" % node.__class__.__name__)
+
+    def compileBinaryOp(self, node):
+        np = self.np
+        left, right = self.compile(node.left), self.compile(node.right)
+        op = node.op
+        if op == '/':
+            return lambda frame, mask: self.divide(left(frame, mask), right(frame, mask), mask)
+        if op == '%':
+            def modulo(frame, mask):
+                a, b = left(frame, mask), right(frame, mask)
+                return a - b * self.divide(a, b, mask)
+            return modulo
+        if op in ('&&', '||'):
+            # the right side only runs for the lanes whose left side does
+            # not decide the result
+            isAnd = op == '&&'
+
+            def logical(frame, mask):
+                decided = np.equal(left(frame, mask), 0) == isAnd
+                rightMask = mask & ~decided
+                if not rightMask.any():
+                    return np.where(decided, 1 - isAnd, 0).astype(np.int64)
+                rightValue = np.not_equal(right(frame, rightMask), 0)
+                return np.where(decided, 1 - isAnd, rightValue).astype(np.int64)
+            return logical
+        function = {
+            '+': np.add, '-': np.subtract, '*': np.multiply,
+            '<<': np.left_shift, '>>': np.right_shift,
+            '&': np.bitwise_and, '|': np.bitwise_or, '^': np.bitwise_xor,
+        }.get(op)
+        if function is not None:
+            return lambda frame, mask: function(left(frame, mask), right(frame, mask))
+        comparison = {
+            '<': np.less, '>': np.greater, '<=': np.less_equal, '>=': np.greater_equal,
+            '==': np.equal, '!=': np.not_equal,
+        }.get(op)
+        if comparison is None:
+            raise EvaluationError("unsupported binary operator %s" % op)
+        return lambda frame, mask: comparison(left(frame, mask), right(frame, mask)).astype(np.int64)
+
+    # C division (truncated toward zero) of the lanes
+    def divide(self, a, b, mask):
+        np = self.np
+        zero = np.equal(b, 0)
+        if np.any(zero & mask):
+            raise EvaluationError("division by zero")
+        b = np.where(zero, 1, b)
+        quotient = np.floor_divide(np.abs(a), np.abs(b))
+        return np.where(np.less(a, 0) != np.less(b, 0), -quotient, quotient)
+
+    def compileUnaryOp(self, node):
+        np = self.np
+        expr = self.compile(node.expr)
+        function = {
+            '-': np.negative,
+            '+': np.positive,
+            '~': np.invert,
+            '!': lambda a: np.equal(a, 0).astype(np.int64),
+        }.get(node.op)
+        if function is None:
+            raise EvaluationError("unsupported unary operator %s" % node.op)
+        return lambda frame, mask: function(expr(frame, mask))
+
+    def compileTernaryOp(self, node):
+        np = self.np
+        cond, iftrue, iffalse = self.compile(node.cond), self.compile(node.iftrue), self.compile(node.iffalse)
+        # branches holding lets write the frame, each one gets its own copy
+        copyFrame = binds(node.iftrue) or binds(node.iffalse)
+
+        def ternary(frame, mask):
+            taken = np.not_equal(cond(frame, mask), 0)
+            trueMask = mask & taken
+            falseMask = mask & ~taken
+            if not trueMask.any():
+                return iffalse(frame, falseMask)
+            if not falseMask.any():
+                return iftrue(frame, trueMask)
+            if copyFrame:
+                return merge(np, taken, iftrue(list(frame), trueMask), iffalse(list(frame), falseMask))
+            return merge(np, taken, iftrue(frame, trueMask), iffalse(frame, falseMask))
+        return ternary
+
+    def compileFuncCall(self, node):
+        name = variableName(node.name)
+        args = [self.compile(arg) for arg in node.args]
+        functions = self.functions
+
+        def call(frame, mask):
+            function = functions.get(name)
+            if function is None:
+                raise EvaluationError("function %s is not defined" % name)
+            return function(*[arg(frame, mask) for arg in args])
+        return call
+
+    def compileTuple(self, exprs):
+        values = [self.compile(expr) for expr in exprs]
+        return lambda frame, mask: tuple([value(frame, mask) for value in values])
+
+    def compileChain(self, node):
+        steps = []
+        while isinstance(node, (my.Let, my.Letrec)):
+            if isinstance(node, my.Letrec):
+                steps.append(self.compileLetrec(node))
+            else:
+                steps.append(self.compileLet(node))
+            node = node.bodyExpr
+        last = self.compile(node)
+
+        def chain(frame, mask):
+            for step in steps:
+                step(frame, mask)
+            return last(frame, mask)
+        return chain
+
+    def compileLet(self, node):
+        np = self.np
+        assigned = self.compile(node.assignedExpr)
+        ident = node.ident
+
+        if isinstance(ident, (list, tuple)):
+            slots = [self.slot(variableName(name)) for name in ident]
+
+            def bindAll(frame, mask):
+                for slot, value in zip(slots, assigned(frame, mask)):
+                    frame[slot] = value
+            return bindAll
+
+        if isinstance(ident, my.ArrayRef):
+            keys = []
+            while isinstance(ident, my.ArrayRef):
+                keys.append(self.compile(ident.subscript))
+                ident = ident.name
+            keys.reverse()
+            slot = self.slot(variableName(ident))
+
+            def bindElement(frame, mask):
+                value = single(assigned(frame, mask))
+                array = frame[slot]
+                if array is UNSET:
+                    raise EvaluationError("element of an array that was never given")
+                array = array.copy()
+                lanes = np.nonzero(mask)[0]
+                index = tuple(np.broadcast_to(key(frame, mask), mask.shape)[lanes] for key in keys)
+                array[(lanes,) + index] = np.broadcast_to(value, mask.shape)[lanes]
+                frame[slot] = array
+            return bindElement
+
+        slot = self.slot(variableName(ident))
+
+        def bind(frame, mask):
+            frame[slot] = single(assigned(frame, mask))
+        return bind
+
+    # a let rec made for a loop:
+    #   let rec loop args = if cond then (Let args = body in loop args) else args
+    # runs body for the lanes meeting cond until none of them does
+    def compileLetrec(self, node):
+        np = self.np
+        ternary = node.assignedExpr
+        if not isinstance(ternary, my.TernaryOp) or not endsWithCall(ternary.iftrue, node.ident):
+            raise EvaluationError("let rec %s is not a loop" % node.ident)
+        slots = [self.slot(variableName(arg)) for arg in node.args]
+        falseSlots = [self.slot(variableName(arg)) for arg in tupleItems(ternary.iffalse)]
+        if falseSlots != slots:
+            raise EvaluationError("let rec %s does not return its arguments" % node.ident)
+
+        self.loops.append((variableName(node.ident), slots))
+        try:
+            cond = self.compile(ternary.cond)
+            iteration = self.compile(ternary.iftrue)
+        finally:
+            self.loops.pop()
+
+        def loop(frame, mask):
+            active = mask
+            while True:
+                active = active & np.not_equal(cond(frame, active), 0)
+                if not active.any():
+                    return
+                values = iteration(list(frame), active)
+                for slot, value in zip(slots, values):
+                    frame[slot] = select(np, active, value, frame[slot])
+        return loop
+
+
+# True when node holds a let, so evaluating it writes the frame
+def binds(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (my.Let, my.Letrec)):
+            return True
+        if isinstance(node, my.TernaryOp):
+            stack.extend((node.iftrue, node.iffalse))
+    return False
+
+
+# True when the chain of lets of node ends on a call of the let rec name
+def endsWithCall(node, name):
+    while isinstance(node, (my.Let, my.Letrec)):
+        node = node.bodyExpr
+    return isinstance(node, my.LetrecCall) and variableName(node.ident) == variableName(name)
+
+
+def tupleItems(node):
+    if isinstance(node, my.ReturnTuples):
+        return node.exprs
+    if isinstance(node, (list, tuple)):
+        return node
+    return (node,)
+
+
+# the value of a let binding one variable, an if gives a tuple of one value
+def single(value):
+    if type(value) is tuple:
+        return value[0]
+    return value
+
+
+# lane by lane choice between a and b, for values with more dimensions
+# (arrays) the choice is made per row
+#
+# A lane that picks an UNSET side is unset: the result is a masked array
+# (numpy.ma) whose unset lanes are masked, and UNSET when no lane is set.
+def select(np, choice, a, b):
+    if a is UNSET and b is UNSET:
+        return UNSET
+    partial = a is UNSET or b is UNSET or np.ma.isMaskedArray(a) or np.ma.isMaskedArray(b)
+    a = np.ma.masked if a is UNSET else np.asanyarray(a)
+    b = np.ma.masked if b is UNSET else np.asanyarray(b)
+    dimensions = max(np.ndim(a), np.ndim(b))
+    if dimensions > 1:
+        choice = choice.reshape(choice.shape + (1,) * (dimensions - 1))
+    if not partial:
+        return np.where(choice, a, b)
+    value = np.ma.where(choice, a, b)
+    if not np.ma.is_masked(value):
+        return value.filled()
+    if np.ma.getmaskarray(value).all():
+        return UNSET
+    return value
+
+
+# lane by lane choice between two results (values or tuples of values)
+def merge(np, choice, a, b):
+    if type(a) is tuple:
+        return tuple([select(np, choice, x, y) for x, y in zip(a, b)])
+    return select(np, choice, a, b)
+
+
+class VectorFunction(object):
+    # funcDef:   FuncDef of a block
+    # functions: name -> function on arrays, for the calls in the block
+    def __init__(self, funcDef, functions=None):
+        if not isinstance(funcDef, my.FuncDef):
+            raise EvaluationError("only FuncDef nodes can be compiled, not %s" % funcDef.__class__.__name__)
+        self.np = importNumpy()
+        compiler = VectorCompiler(self.np, dict(functions or {}))
+        self.parameters = [variableName(name) for name in funcDef.parameters]
+        self.returns = [variableName(name) for name in funcDef.returns]
+        self.parameterSlots = [compiler.slot(name) for name in self.parameters]
+        self.body = compiler.compile(funcDef.body)
+        self.slots = compiler.slots
+
+    # run the block for every lane of columns (parameter name -> column or scalar)
+    # returns the returned variables of the block and their column of values
+    def __call__(self, columns=None, **values):
+        np = self.np
+        if columns:
+            values = dict(columns, **values)
+        lanes = None
+        frame = [UNSET] * len(self.slots)
+        for name, slot in zip(self.parameters, self.parameterSlots):
+            if name not in values:
+                continue
+            value = values[name]
+            if np.ndim(value) > 0:
+                value = np.asarray(value, dtype=np.int64)
+                if lanes is not None and len(value) != lanes:
+                    raise EvaluationError("column %s has %d values instead of %d" % (name, len(value), lanes))
+                lanes = len(value)
+            frame[slot] = value
+        if lanes is None:
+            lanes = 1
+
+        result = self.body(frame, np.ones(lanes, dtype=bool))
+        if type(result) is not tuple or len(result) != len(self.returns):
+            raise EvaluationError("the block returned %r for (%s)" % (result, ', '.join(self.returns)))
+        columns = {}
+        for name, value in zip(self.returns, result):
+            if np.ma.isMaskedArray(value):
+                value = value.astype(np.int64)
+            elif value is not UNSET:
+                value = np.asarray(value, dtype=np.int64)
+                if value.ndim == 0:
+                    value = np.full(lanes, value, dtype=np.int64)
+            columns[name] = value
+        return columns
+
+
+def compileVector(funcDef, functions=None):
+    return VectorFunction(funcDef, functions)
@@ -0,0 +1,156 @@
+'''
+Per phase timings of the translation pipeline.
+
+A PhaseTimer records, for every phase a block goes through (wrap,
+preprocess, parse, transform, translate, simplify, render, ...):
+  - wall: elapsed time in seconds (time.perf_counter)
+  - cpu:  CPU time of this process in seconds (time.process_time), the cpp
+          child started by preprocess only shows in wall
+  - the size of what the phase got and what it produced: nodesIn/nodesOut
+    for ASTs (distinct node objects, see countNodes), charsIn/charsOut for
+    text
+
+    timer = PhaseTimer()
+    with timer.phase('simplify', functionalAST) as phase:
+        simplifiedAST = phase.result = simplify(functionalAST)
+    json.dumps(timer.record())
+
+The sizes are counted outside the timed part of a phase. Code that takes
+an optional timer uses NULL_TIMER when it is not given, its phases do
+nothing and count nothing.
+
+to see the timings of a block, do
+python checkin6simp.py project3inputs/checkin6_input1 --timings
+python batch_translate.py project3inputs --timings
+'''
+
+import time
+
+from pycparser import c_ast
+
+import myfunctional_ast6 as my
+from pyminicMaster.minic import minic_ast
+
+
+NODE_CLASSES = (c_ast.Node, minic_ast.Node, my.Node)
+
+
+# number of distinct nodes of a pycparser, minic or functional AST
+# (or of a list of them), subtrees shared by several parents count once
+def countNodes(root):
+    seen = set()
+    count = 0
+    stack = [root]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, NODE_CLASSES) and id(value) not in seen:
+            seen.add(id(value))
+            count += 1
+            for cls in value.__class__.__mro__:
+                for name in cls.__dict__.get('__slots__', ()):
+                    if name not in ('coord', '__weakref__'):
+                        stack.append(getattr(value, name, None))
+    return count
+
+
+# ('nodes', count) for ASTs, ('chars', length) for text, None for anything else
+def measure(value):
+    if isinstance(value, str):
+        return 'chars', len(value)
+    if isinstance(value, NODE_CLASSES) or (isinstance(value, (list, tuple)) and value
+                                          and isinstance(value[0], NODE_CLASSES)):
+        return 'nodes', countNodes(value)
+    return None
+
+
+class Phase(object):
+    # the phase stores what it produced in result
+    def __init__(self, timer, name, input):
+        self.timer = timer
+        self.name = name
+        self.input = input
+        self.result = None
+
+    def __enter__(self):
+        self.record = {'phase': self.name}
+        self.addSize('In', self.input)
+        self.input = None
+        self.start = time.perf_counter()
+        self.startCPU = time.process_time()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.record['wall'] = time.perf_counter() - self.start
+        self.record['cpu'] = time.process_time() - self.startCPU
+        if excType is None:
+            self.addSize('Out', self.result)
+        else:
+            self.record['error'] = excType.__name__
+        self.result = None
+        self.timer.phases.append(self.record)
+        return False
+
+    def addSize(self, suffix, value):
+        size = measure(value)
+        if size is not None:
+            self.record[size[0] + suffix] = size[1]
+
+
+class PhaseTimer(object):
+    def __init__(self):
+        self.phases = []    # records of the finished phases, in order
+
+    # context manager timing the phase name, input is what the phase works on
+    def phase(self, name, input=None):
+        return Phase(self, name, input)
+
+    # json ready record of the phases and their totals
+    def record(self):
+        return {
+            'phases': list(self.phases),
+            'wall': sum(phase['wall'] for phase in self.phases),
+            'cpu': sum(phase['cpu'] for phase in self.phases),
+        }
+
+
+class NullPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+    # result is dropped
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_PHASE = NullPhase()
+
+
+class NullTimer(object):
+    def phase(self, name, input=None):
+        return NULL_PHASE
+
+    def record(self):
+        return {'phases': [], 'wall': 0.0, 'cpu': 0.0}
+
+
+NULL_TIMER = NullTimer()
+
+
+# totals per phase of many timing records (e.g. the records of a batch):
+# phase name -> {'count', 'wall', 'cpu'}, in the order the phases were first met
+def aggregate(records):
+    totals = {}
+    for record in records:
+        for phase in record['phases']:
+            total = totals.setdefault(phase['phase'], {'count': 0, 'wall': 0.0, 'cpu': 0.0})
+            total['count'] += 1
+            total['wall'] += phase['wall']
+            total['cpu'] += phase['cpu']
+    return totals
@@ -1,48 +1,10 @@
 from __future__ import print_function
 from pycparser import c_ast
-import minic.minic_ast as mc
-from minic.mutils import lmap
-
-
-# Assignments are all converted into assignments using the '=' operator.
-# All assignments using other operators are converted into assignments
-# using the '=' and the expression on the right hand side is a binary
-# expression such that the assignment has the same semantics.
-def of_assignment(orig):
-    lvalue = transform(orig.lvalue)
-    if orig.rvalue is not None:
-        rvalue = transform(orig.rvalue)
-    else:
-        rvalue = None
-
-    final_rvalue = {
-        '=': rvalue,
-        '+=': mc.BinaryOp('+', lvalue, rvalue),
-        '-=': mc.BinaryOp('-', lvalue, rvalue),
-        '*=': mc.BinaryOp('*', lvalue, rvalue),
-        '/=': mc.BinaryOp('/', lvalue, rvalue),
-        '%=': mc.BinaryOp('%', lvalue, rvalue),
-        '^=': mc.BinaryOp('^', lvalue, rvalue),
-        '|=': mc.BinaryOp('|', lvalue, rvalue),
-        '>>=': mc.BinaryOp('>>', lvalue, rvalue),
-        '<<=': mc.BinaryOp('<<', lvalue, rvalue),
-        '&=': mc.BinaryOp('&', lvalue, rvalue),
-        '++': mc.BinaryOp('+', lvalue, mc.Constant('int', '1')),
-        '--': mc.BinaryOp('-', lvalue, mc.Constant('int', '1')),
-    }.get(orig.op, mc.EmptyStatement())
-
-    return mc.Assignment(lvalue, final_rvalue, coord=orig.coord)
-
-
-# PyCParser represents increment and decrement as unary operations, we convert them
-# to assignments. Other unary operators are kept as is.
-def maybe_special_unary(orig):
-    return {
-        'p--': (lambda x: mc.Assignment(x, mc.BinaryOp('-', x, mc.Constant('int', '1')))),
-        'p++': (lambda x: mc.Assignment(x, mc.BinaryOp('+', x, mc.Constant('int', '1')))),
-        '--': (lambda x: mc.Assignment(x, mc.BinaryOp('-', x, mc.Constant('int', '1')))),
-        '++': (lambda x: mc.Assignment(x, mc.BinaryOp('+', x, mc.Constant('int', '1'))))
-    }.get(orig.op, lambda x: mc.UnaryOp(orig.op, x))(transform(orig.expr))
+try:
+    from .minic import minic_ast as mc
+except (ImportError, ValueError):
+    # imported as a top level module (e.g. from inside pyminicMaster)
+    import minic.minic_ast as mc
 
 
 # Checks that the original construct is a value, a not any another construct. It helps
@@ -56,13 +18,6 @@ def v(orig):
         raise TypeError
 
 
-def tmap(x):
-    if isinstance(x, list):
-        return lmap(transform, x)
-    else:
-        return transform(x)
-
-
 class ErrorUnsupportedConstruct(TypeError):
     def __init__(self, construct):
         self.messsage = "Unsupported construct %s" % construct
@@ -77,41 +32,260 @@ def unsupported(y):
         raise ErrorUnsupportedConstruct(y)
 
 
+# Right hand side of the '=' assignment equivalent to each assignment operator.
+ASSIGNMENT_OPS = {
+    '+=': '+', '-=': '-', '*=': '*', '/=': '/', '%=': '%', '^=': '^', '|=': '|',
+    '>>=': '>>', '<<=': '<<', '&=': '&', '++': '+', '--': '-',
+}
+
+# Unary operators that are really assignments.
+SPECIAL_UNARY_OPS = {'p--': '-', 'p++': '+', '--': '-', '++': '+'}
+
+# Value types kept as is (None is a missing child, e.g. an if without else).
+VALUE_TYPES = (str, int, float, type(None))
+
+
+# Declares the attributes of a PyCParser node that are converted before the
+# node itself. The converter method then receives them, in that order, after
+# the original node.
+def converts(*fields):
+    def decorate(method):
+        method.fields = fields
+        return method
+    return decorate
+
+
+# Builds the class -> (converter method, converted fields in reverse order) table
+# of a Converter class. Every method named of_<Name> converts the PyCParser node
+# class c_ast.<Name>.
+def build_dispatch(cls):
+    table = {}
+    for value_type in VALUE_TYPES:
+        table[value_type] = (None, ())
+    for attr in dir(cls):
+        if not attr.startswith('of_'):
+            continue
+        construct = getattr(c_ast, attr[3:], None)
+        if construct is None:
+            raise ValueError("%s.%s does not name a PyCParser node class" % (cls.__name__, attr))
+        method = getattr(cls, attr)
+        table[construct] = (method, tuple(reversed(getattr(method, 'fields', ()))))
+    return table
+
+
+class Converter(object):
+    """ Maps PyCparser AST nodes to Minic nodes.
+
+        The table from node class to converter method is built once per
+        Converter class, not on every call. To support a new construct,
+        subclass Converter, add an of_<Name> method for c_ast.<Name> and
+        call convert() on the subclass instance. The attributes listed with
+        @converts are converted first and passed to the method.
+
+        The conversion uses an explicit stack instead of recursion, so the
+        depth of the tree is not limited by the Python recursion limit.
+    """
+    _dispatch_tables = {}
+
+    def __init__(self):
+        cls = self.__class__
+        if cls not in Converter._dispatch_tables:
+            Converter._dispatch_tables[cls] = build_dispatch(cls)
+        self.dispatch = Converter._dispatch_tables[cls]
+
+    # The stack holds nodes still to be converted and (node, method, count)
+    # tuples for nodes whose count converted fields are on top of the
+    # result stack. Lists are built with a None method.
+    def convert(self, root):
+        dispatch = self.dispatch
+        results = []
+        stack = [root]
+        while stack:
+            x = stack.pop()
+            cls = x.__class__
+
+            if cls is tuple:
+                orig, method, count = x
+                if count:
+                    args = results[-count:]
+                    del results[-count:]
+                else:
+                    args = []
+                if method is None:
+                    results.append(args)
+                else:
+                    results.append(method(self, orig, *args))
+            elif cls is list:
+                stack.append((x, None, len(x)))
+                stack.extend(reversed(x))
+            else:
+                entry = dispatch.get(cls)
+                if entry is None:
+                    results.append(unsupported(x))
+                    continue
+                method, fields = entry
+                if method is None:
+                    results.append(x)
+                elif not fields:
+                    results.append(method(self, x))
+                else:
+                    stack.append((x, method, len(fields)))
+                    for field in fields:
+                        stack.append(getattr(x, field))
+        return results[0]
+
+    def tmap(self, x):
+        return self.convert(x)
+
+    # Assignments are all converted into assignments using the '=' operator.
+    # All assignments using other operators are converted into assignments
+    # using the '=' and the expression on the right hand side is a binary
+    # expression such that the assignment has the same semantics.
+    @converts('lvalue', 'rvalue')
+    def of_Assignment(self, orig, lvalue, rvalue):
+        if orig.op == '=':
+            final_rvalue = rvalue
+        elif orig.op in ('++', '--'):
+            final_rvalue = mc.BinaryOp(ASSIGNMENT_OPS[orig.op], lvalue, mc.Constant('int', '1'))
+        elif orig.op in ASSIGNMENT_OPS:
+            final_rvalue = mc.BinaryOp(ASSIGNMENT_OPS[orig.op], lvalue, rvalue)
+        else:
+            final_rvalue = mc.EmptyStatement()
+
+        return mc.Assignment(lvalue, final_rvalue, coord=orig.coord)
+
+    # PyCParser represents increment and decrement as unary operations, we convert them
+    # to assignments. Other unary operators are kept as is.
+    @converts('expr')
+    def of_UnaryOp(self, orig, x):
+        op = SPECIAL_UNARY_OPS.get(orig.op)
+        if op is None:
+            return mc.UnaryOp(orig.op, x)
+        return mc.Assignment(x, mc.BinaryOp(op, x, mc.Constant('int', '1')))
+
+    @converts('type')
+    def of_ArrayDecl(self, orig, type):
+        return mc.ArrayDecl(type, orig.dim, coord=orig.coord)
+
+    @converts('name', 'subscript')
+    def of_ArrayRef(self, orig, name, subscript):
+        return mc.ArrayRef(name, subscript)
+
+    @converts('left', 'right')
+    def of_BinaryOp(self, orig, left, right):
+        return mc.BinaryOp(v(orig.op), left, right, coord=orig.coord)
+
+    @converts('block_items')
+    def of_Compound(self, orig, block_items):
+        return mc.Block(block_items, coord=orig.coord)
+
+    @converts('type')
+    def of_Constant(self, orig, type):
+        return mc.Constant(type, v(orig.value), coord=orig.coord)
+
+    @converts('name', 'funcspec', 'type', 'init')
+    def of_Decl(self, orig, name, funcspec, type, init):
+        return mc.Decl(name, funcspec, type, init, coord=orig.coord)
+
+    @converts('decls')
+    def of_DeclList(self, orig, decls):
+        return mc.DeclList(decls, coord=orig.coord)
+
+    @converts('cond', 'stmt')
+    def of_DoWhile(self, orig, cond, stmt):
+        return mc.DoWhile(cond, stmt, coord=orig.coord)
+
+    def of_EmptyStatement(self, orig):
+        return mc.EmptyStatement()
+
+    @converts('exprs')
+    def of_ExprList(self, orig, exprs):
+        return mc.ExprList(exprs)
+
+    @converts('ext')
+    def of_FileAST(self, orig, ext):
+        return mc.FileAST(ext)
+
+    @converts('init', 'cond', 'next', 'stmt')
+    def of_For(self, orig, init, cond, next, stmt):
+        return mc.For(init, cond, next, stmt, coord=orig.coord)
+
+    @converts('name', 'args')
+    def of_FuncCall(self, orig, name, args):
+        return mc.FuncCall(name, args)
+
+    @converts('args', 'type')
+    def of_FuncDecl(self, orig, args, type):
+        return mc.FuncDecl(args, type)
+
+    @converts('decl', 'param_decls', 'body')
+    def of_FuncDef(self, orig, decl, param_decls, body):
+        return mc.FuncDef(decl, param_decls, body)
+
+    def of_ID(self, orig):
+        return mc.ID(v(orig.name))
+
+    @converts('names')
+    def of_IdentifierType(self, orig, names):
+        return mc.IdentifierType(names)
+
+    @converts('cond', 'iftrue', 'iffalse')
+    def of_If(self, orig, cond, iftrue, iffalse):
+        return mc.If(cond, iftrue, iffalse)
+
+    @converts('exprs')
+    def of_InitList(self, orig, exprs):
+        return mc.InitList(exprs)
+
+    @converts('expr')
+    def of_NamedInitializer(self, orig, expr):
+        return mc.NamedInitializer(v(orig.name), expr)
+
+    @converts('params')
+    def of_ParamList(self, orig, params):
+        return mc.ParamList(params)
+
+    @converts('type')
+    def of_PtrDecl(self, orig, type):
+        return mc.PtrDecl(type)
+
+    @converts('expr')
+    def of_Return(self, orig, expr):
+        return mc.Return(expr)
+
+    @converts('cond', 'iftrue', 'iffalse')
+    def of_TernaryOp(self, orig, cond, iftrue, iffalse):
+        return mc.TernaryOp(cond, iftrue, iffalse)
+
+    @converts('type')
+    def of_Typename(self, orig, type):
+        return mc.Typename(v(orig.name), type)
+
+    @converts('type')
+    def of_TypeDecl(self, orig, type):
+        return mc.TypeDecl(v(orig.declname), type)
+
+    @converts('cond', 'stmt')
+    def of_While(self, orig, cond, stmt):
+        return mc.While(cond, stmt)
+
+
+_converter = Converter()
+
+
 # The main transformer function. This is close to a mapping for PyCparser AST nodes to Minic nodes, except
 # that there are less constructs and we have to transform assignments and unary operators.
 def transform(x):
-    return {
-        c_ast.ArrayDecl: (lambda orig: mc.ArrayDecl(transform(orig.type), orig.dim, coord=orig.coord)),
-        c_ast.ArrayRef: (lambda orig: mc.ArrayRef(transform(orig.name), transform(orig.subscript))),
-        c_ast.Assignment: (lambda orig: of_assignment(orig)),
-        c_ast.BinaryOp: (lambda orig: mc.BinaryOp(v(orig.op), transform(orig.left), transform(orig.right), coord=orig.coord)),
-        c_ast.Compound: (lambda orig: mc.Block(lmap(transform, orig.block_items), coord=orig.coord)),
-        c_ast.Constant: (lambda orig: mc.Constant(transform(orig.type), v(orig.value), coord=orig.coord)),
-        c_ast.Decl: (lambda orig: mc.Decl(transform(orig.name), transform(orig.funcspec), transform(orig.type), transform(orig.init), coord=orig.coord)),
-        c_ast.DeclList: (lambda orig: mc.DeclList(tmap(orig.decls), coord=orig.coord)),
-        c_ast.DoWhile: (lambda orig: mc.DoWhile(transform(orig.cond), transform(orig.stmt), coord=orig.coord)),
-        c_ast.EmptyStatement: (lambda orig: mc.EmptyStatement()),
-        c_ast.ExprList: (lambda orig: mc.ExprList(tmap(orig.exprs))),
-        c_ast.FileAST: (lambda orig: mc.FileAST(lmap(transform, orig.ext))),
-        c_ast.For: (lambda orig: mc.For(transform(orig.init), transform(orig.cond), transform(orig.next), transform(orig.stmt), coord=orig.coord)),
-        c_ast.FuncCall: (lambda orig: mc.FuncCall(transform(orig.name), tmap(orig.args))),
-        c_ast.FuncDecl: (lambda orig: mc.FuncDecl(tmap(orig.args), transform(orig.type))),
-        c_ast.FuncDef: (lambda orig: mc.FuncDef(transform(orig.decl), tmap(orig.param_decls), transform(orig.body))),
-        c_ast.ID: (lambda orig: mc.ID(v(orig.name))),
-        c_ast.IdentifierType: (lambda orig: mc.IdentifierType(tmap(orig.names))),
-        c_ast.If: (lambda orig: mc.If(transform(orig.cond), transform(orig.iftrue), transform(orig.iffalse))),
-        c_ast.InitList: (lambda orig: mc.InitList(tmap(orig.exprs))),
-        c_ast.NamedInitializer: (lambda orig: mc.NamedInitializer(v(orig.name), transform(orig.expr))),
-        c_ast.ParamList: (lambda orig: mc.ParamList(tmap(orig.params))),
-        c_ast.PtrDecl: (lambda orig: mc.PtrDecl(transform(orig.type))),
-        c_ast.Return: (lambda orig: mc.Return(transform(orig.expr))),
-        c_ast.TernaryOp: (lambda orig: mc.TernaryOp(transform(orig.cond), transform(orig.iftrue), transform(orig.iffalse))),
-        c_ast.Typename: (lambda orig: mc.Typename(v(orig.name), transform(orig.type))),
-        c_ast.TypeDecl: (lambda orig: mc.TypeDecl(v(orig.declname), transform(orig.type))),
-        c_ast.UnaryOp: (lambda orig: maybe_special_unary(orig)),
-        c_ast.While: (lambda orig: mc.While(transform(orig.cond), transform(orig.stmt))),
-        str: (lambda orig: orig),
-        int: (lambda orig: orig),
-        float: (lambda orig: orig),
-        list: (lambda orig: tmap(orig)),
-    }.get(x.__class__, lambda y: unsupported(y))(x)
+    return _converter.convert(x)
+
+
+def tmap(x):
+    return _converter.convert(x)
+
+
+def of_assignment(orig):
+    return _converter.convert(orig)
+
+
+def maybe_special_unary(orig):
+    return _converter.convert(orig)
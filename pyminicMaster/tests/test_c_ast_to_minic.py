@@ -1,13 +1,21 @@
 from __future__ import print_function
+import os
+import sys
 import unittest
 from pycparser import parse_file
-import minic.c_ast_to_minic as ctoc
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+import c_ast_to_minic as ctoc
 import minic.minic_ast as mast
 
+MINIC_C = os.path.join(TEST_DIR, 'c_files', 'minic.c')
+
 
 class TestConversion1(unittest.TestCase):
     def test_parse_and_convert(self):
-        fullc_ast = parse_file('./c_files/minic.c')
+        fullc_ast = parse_file(MINIC_C)
         converted = ctoc.transform(fullc_ast)
         self.failUnless(isinstance(converted, mast.FileAST))
         self.assertEqual(len(converted.ext), 2)
@@ -0,0 +1,61 @@
+import os
+import sys
+import unittest
+from pycparser import c_parser
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+import c_ast_to_minic as ctoc
+import minic.minic_ast as mast
+
+
+def parse_body(code):
+    ast = c_parser.CParser().parse("int f(){\n" + code + "\n}")
+    return ast.ext[0].body
+
+
+class TestConverter(unittest.TestCase):
+    def test_compound_assignment(self):
+        block = ctoc.transform(parse_body("a <<= b; c++;"))
+        shift, incr = block.block_items
+        self.assertTrue(isinstance(shift, mast.Assignment))
+        self.assertEqual(shift.rvalue.op, '<<')
+        self.assertEqual(shift.rvalue.left.name, 'a')
+        self.assertEqual(shift.rvalue.right.name, 'b')
+        self.assertTrue(isinstance(incr, mast.Assignment))
+        self.assertEqual(incr.rvalue.op, '+')
+        self.assertEqual(incr.rvalue.right.value, '1')
+
+    def test_unsupported(self):
+        self.assertRaises(ctoc.ErrorUnsupportedConstruct, ctoc.transform, parse_body("goto end; end: ;"))
+
+    def test_extension(self):
+        class GotoConverter(ctoc.Converter):
+            def of_Goto(self, orig):
+                return mast.EmptyStatement()
+
+        body = parse_body("goto end; a = 1;")
+        block = GotoConverter().convert(body)
+        self.assertTrue(isinstance(block.block_items[0], mast.EmptyStatement))
+        self.assertTrue(isinstance(block.block_items[1], mast.Assignment))
+        # the extension does not leak into the default converter
+        self.assertRaises(ctoc.ErrorUnsupportedConstruct, ctoc.transform, body)
+
+    def test_bad_method_name(self):
+        class BadConverter(ctoc.Converter):
+            def of_Gotoo(self, orig):
+                return None
+
+        self.assertRaises(ValueError, BadConverter)
+
+    def test_deep_expression(self):
+        # deeper than the default recursion limit
+        depth = sys.getrecursionlimit() * 2
+        code = "a = " + "(" * depth + "1" + " + 1)" * depth + ";"
+        assignment = ctoc.transform(parse_body(code)).block_items[0]
+        expr = assignment.rvalue
+        for i in range(depth):
+            self.assertTrue(isinstance(expr, mast.BinaryOp))
+            expr = expr.left
+        self.assertEqual(expr.value, '1')
@@ -1,8 +1,16 @@
+import os
+import sys
 import unittest
 from pycparser import parse_file
-import minic.c_ast_to_minic as ctoc
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+import c_ast_to_minic as ctoc
 import minic.minic_ast as mast
 
+MINIC_C = os.path.join(TEST_DIR, 'c_files', 'minic.c')
+
 
 class TestVisitor(mast.NodeVisitor):
 
@@ -20,7 +28,7 @@ class TestVisitor(mast.NodeVisitor):
 
 class TestNodeVisit(unittest.TestCase):
     def test_visit(self):
-        ast = ctoc.transform(parse_file('./c_files/minic.c'))
+        ast = ctoc.transform(parse_file(MINIC_C))
         vs = TestVisitor()
         vs.visit(ast)
         self.assertEqual(vs.assignment_counter, 5)
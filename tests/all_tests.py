@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+import os
+import unittest
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+suite = unittest.TestLoader().loadTestsFromNames(
+    [
+        'test_incremental_translator',
+        'test_myfunctional_eval',
+        'test_myfunctional_vector',
+        'test_simplify',
+        'test_constant_folding',
+        'test_translation_cache',
+        'test_myfunctional_intern',
+        'test_myfunctional_compact',
+        'test_deterministic_output',
+        'test_pipeline_timings',
+        'test_block_parser',
+        'test_batch_translate',
+        'test_block_generator'
+    ]
+)
+
+testresult = unittest.TextTestRunner(verbosity=1).run(suite)
+sys.exit(0 if testresult.wasSuccessful() else 1)
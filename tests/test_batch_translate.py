@@ -0,0 +1,140 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+from batch_translate import expandInputs, translateAll, translateBlocks, translateParallel, main
+from block_generator import generateBlocks
+from block_translator import translateFile, translateRecord
+from myfunctional_printer import functionalToString
+
+INPUTS = os.path.join(TEST_DIR, '..', 'project3inputs')
+
+
+class TestExpandInputs(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for name in ('b', 'a', 'aDummy', 'c.c'):
+            f = open(os.path.join(self.directory, name), 'w')
+            f.write('x = 1;\n')
+            f.close()
+        os.mkdir(os.path.join(self.directory, 'sub'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_directory(self):
+        self.assertEqual(expandInputs([self.directory]), [self.path('a'), self.path('b'), self.path('c.c')])
+
+    def test_order_and_duplicates(self):
+        self.assertEqual(expandInputs([self.path('b'), self.path('*.c'), self.directory]),
+                         [self.path('b'), self.path('c.c'), self.path('a')])
+
+    def test_missing(self):
+        self.assertEqual(expandInputs([self.path('missing'), self.path('*.h')]), [])
+
+
+class TestTranslateAll(unittest.TestCase):
+    def translate(self, files, **options):
+        out = io.StringIO()
+        failed = translateAll(files, out, **options)
+        return failed, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_records(self):
+        files = expandInputs([INPUTS])
+        failed, records = self.translate(files)
+        self.assertEqual(failed, 0)
+        self.assertEqual([record['input'] for record in records], files)
+        for fileName, record in zip(files, records):
+            functionalAST, simplifiedAST = translateFile(fileName)
+            self.assertTrue(record['ok'])
+            self.assertEqual(record['output'], functionalToString(functionalAST))
+            self.assertEqual(record['simplified'], functionalToString(simplifiedAST, storedLevels=True))
+
+    def test_no_simplify(self):
+        failed, records = self.translate([os.path.join(INPUTS, 'p3_input1')], simplifyOutput=False)
+        self.assertEqual(failed, 0)
+        self.assertTrue('output' in records[0] and 'simplified' not in records[0])
+
+    def test_failed_block(self):
+        blocks = [('good', 'x = 1;'), ('goto', 'goto l;'), ('syntax', 'x = ;'), ('after', 'y = 2;')]
+        out = io.StringIO()
+        self.assertEqual(translateBlocks(blocks, out), 2)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([record['input'] for record in records], ['good', 'goto', 'syntax', 'after'])
+        self.assertEqual([record['ok'] for record in records], [True, False, False, True])
+        self.assertTrue(records[1]['error'].startswith('ErrorUnsupportedConstruct'))
+        self.assertTrue(records[2]['error'].startswith('ParseError'))
+        self.assertFalse('output' in records[1])
+
+    def test_error_record(self):
+        record = translateRecord(os.path.join(INPUTS, 'missing'))
+        self.assertFalse(record['ok'])
+        self.assertTrue(record['error'].startswith('FileNotFoundError'))
+
+    def test_main(self):
+        directory = tempfile.mkdtemp()
+        try:
+            output = os.path.join(directory, 'results.jsonl')
+            stderr = sys.stderr
+            sys.stderr = io.StringIO()
+            try:
+                status = main([os.path.join(INPUTS, 'checkin6_*'), '-o', output])
+                self.assertEqual(sys.stderr.getvalue(), '3 inputs, 0 failed\n')
+            finally:
+                sys.stderr = stderr
+            self.assertEqual(status, 0)
+            f = open(output, 'r')
+            records = [json.loads(line) for line in f]
+            f.close()
+            self.assertEqual([os.path.basename(record['input']) for record in records],
+                             ['checkin6_input1', 'checkin6_input2', 'checkin6_input3'])
+        finally:
+            shutil.rmtree(directory)
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        self.blocks = list(generateBlocks(12, seed=5, statements=15))
+        self.blocks.insert(4, ('goto', 'goto l;'))
+
+    def records(self, jobs, chunkSize=None):
+        out = io.StringIO()
+        failed = translateBlocks(self.blocks, out, jobs=jobs, chunkSize=chunkSize)
+        return failed, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_same_records(self):
+        failed, records = self.records(1)
+        self.assertEqual(failed, 1)
+        self.assertEqual([record['input'] for record in records], [name for name, text in self.blocks])
+        self.assertFalse(records[4]['ok'])
+        for chunkSize in (None, 1, 5):
+            self.assertEqual(self.records(2, chunkSize), (failed, records))
+
+    def test_input_order(self):
+        records = list(translateParallel(self.blocks, 3, chunkSize=2))
+        self.assertEqual([record['input'] for record in records], [name for name, text in self.blocks])
+        self.assertEqual(records, [translateRecord(name, text=text) for name, text in self.blocks])
+
+    def test_files(self):
+        files = expandInputs([INPUTS])
+        records = [self.translateFiles(files, jobs) for jobs in (1, 2)]
+        self.assertEqual(records[0], records[1])
+
+    def translateFiles(self, files, jobs):
+        out = io.StringIO()
+        translateAll(files, out, jobs=jobs, chunkSize=3)
+        return out.getvalue()
+
+
+if __name__ == '__main__':
+    unittest.main()
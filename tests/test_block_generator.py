@@ -0,0 +1,61 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+from block_generator import BlockGenerator, generateBlocks, writeBlocks
+from block_translator import translateRecord
+
+
+class TestBlockGenerator(unittest.TestCase):
+    def test_seed(self):
+        blocks = list(generateBlocks(5, seed=11, statements=60))
+        self.assertEqual(list(generateBlocks(5, seed=11, statements=60)), blocks)
+        self.assertNotEqual(list(generateBlocks(5, seed=12, statements=60)), blocks)
+        self.assertEqual(len(set(text for name, text in blocks)), 5)
+        self.assertEqual([name for name, text in blocks], ['generated_%d' % i for i in range(5)])
+
+    def test_generator_state(self):
+        # a generator gives the same sequence of blocks as generateBlocks
+        generator = BlockGenerator(3, statements=30)
+        self.assertEqual([generator.block() for i in range(3)],
+                         [text for name, text in generateBlocks(3, seed=3, statements=30)])
+
+    def test_knobs(self):
+        lines = BlockGenerator(statements=40, depth=0).block().split('\n')
+        self.assertEqual(len(lines), 40)
+        self.assertTrue(all(line.endswith(';') and not line.startswith(' ') for line in lines))
+
+        for text in (BlockGenerator(seed, statements=80, depth=2).block() for seed in range(5)):
+            indents = [len(line) - len(line.lstrip(' ')) for line in text.split('\n')]
+            self.assertTrue(max(indents) <= 2 * 4 + 4)
+
+        text = BlockGenerator(statements=80, arrays=0).block()
+        self.assertFalse('[' in text)
+        self.assertTrue('[' in BlockGenerator(statements=80, arrays=0.8).block())
+
+    def test_translates(self):
+        for name, text in generateBlocks(10, seed=4, statements=40, depth=3):
+            record = translateRecord(name, text=text)
+            self.assertTrue(record['ok'], '%s: %s' % (name, record.get('error')))
+
+    def test_write(self):
+        directory = tempfile.mkdtemp()
+        try:
+            blocks = list(generateBlocks(3, seed=2, prefix='stress', statements=10))
+            paths = writeBlocks(blocks, os.path.join(directory, 'out'))
+            self.assertEqual(paths, [os.path.join(directory, 'out', 'stress_%d' % i) for i in range(3)])
+            for path, (name, text) in zip(paths, blocks):
+                f = open(path, 'r')
+                self.assertEqual(f.read(), text)
+                f.close()
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
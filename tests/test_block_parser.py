@@ -0,0 +1,132 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+from pycparser import c_ast
+from pycparser.plyparser import ParseError
+
+from block_parser import ParserPool, parserPool, wrapBlock, parseBlock, parseBlockFile
+
+INPUTS = os.path.join(TEST_DIR, '..', 'project3inputs')
+
+
+# text of a pycparser AST without the coordinates
+def astText(ast):
+    buf = io.StringIO()
+    ast.show(buf)
+    return buf.getvalue()
+
+
+class TestParseBlock(unittest.TestCase):
+    def test_wrap(self):
+        self.assertEqual(wrapBlock('x = 1;\ny = x;'),
+                         'int* block_function(){\n    x = 1;\n    y = x;\n    return 0;\n}')
+
+    def test_block_function(self):
+        ast = parseBlock('x = 1;\ny = x;')
+        self.assertEqual(len(ast.ext), 1)
+        function = ast.ext[0]
+        self.assertTrue(isinstance(function, c_ast.FuncDef))
+        self.assertEqual(function.decl.name, 'block_function')
+        statements = function.body.block_items
+        self.assertEqual([item.__class__ for item in statements],
+                         [c_ast.Assignment, c_ast.Assignment, c_ast.Return])
+
+    def test_preprocessor(self):
+        for name in sorted(os.listdir(INPUTS)):
+            f = open(os.path.join(INPUTS, name), 'r')
+            text = f.read()
+            f.close()
+            self.assertEqual(astText(parseBlock(text, usePreprocessor=True)), astText(parseBlock(text)), name)
+
+    def test_directives(self):
+        text = '#define N 10\nx = N;'
+        self.assertRaises(ParseError, parseBlock, text)
+        self.assertEqual(astText(parseBlock(text, usePreprocessor=True)), astText(parseBlock('x = 10;')))
+
+    def test_no_dummy_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            fileName = os.path.join(directory, 'block')
+            f = open(fileName, 'w')
+            f.write('x = 1;\n')
+            f.close()
+            for usePreprocessor in (False, True):
+                ast = parseBlockFile(fileName, usePreprocessor)
+                self.assertEqual(astText(ast), astText(parseBlock('x = 1;\n')))
+            self.assertEqual(os.listdir(directory), ['block'])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_error_names_file(self):
+        try:
+            parseBlock('x = ;', filename='input7')
+        except ParseError as e:
+            self.assertTrue(str(e).startswith('input7:2:'))
+        else:
+            self.fail('no ParseError')
+
+
+class TestParserPool(unittest.TestCase):
+    def test_reuse(self):
+        pool = ParserPool()
+        with pool.parser() as first:
+            pass
+        with pool.parser() as second:
+            self.assertTrue(second is first)
+            # a parser in use is not handed out again
+            with pool.parser() as third:
+                self.assertFalse(third is first)
+        self.assertEqual(len(pool.idle), 2)
+
+    def test_max_idle(self):
+        pool = ParserPool(maxIdle=1)
+        pool.warm(3)
+        self.assertEqual(len(pool.idle), 1)
+
+    def test_parse_with_pool_parser(self):
+        pool = ParserPool()
+        pool.warm()
+        parser = pool.acquire()
+        try:
+            for text in ('x = 1;', 'for (i = 0; i < n; i++) { s = s + i; }', 'y = x;'):
+                self.assertEqual(astText(parseBlock(text, parser=parser)), astText(parseBlock(text)))
+        finally:
+            pool.release(parser)
+
+    def test_shared_pool(self):
+        parserPool.warm()
+        idle = list(parserPool.idle)
+        parseBlock('x = 1;')
+        parseBlock('y = 2;')
+        self.assertEqual(parserPool.idle, idle)
+
+    def test_threads(self):
+        pool = ParserPool()
+        texts = ['x%d = %d;\ny = x%d * 2;' % (i, i, i) for i in range(40)]
+        expected = [astText(parseBlock(text)) for text in texts]
+        results = [None] * len(texts)
+
+        def work(start):
+            for i in range(start, len(texts), 4):
+                with pool.parser() as parser:
+                    results[i] = astText(parseBlock(texts[i], parser=parser))
+
+        threads = [threading.Thread(target=work, args=(start,)) for start in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, expected)
+        self.assertTrue(1 <= len(pool.idle) <= 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
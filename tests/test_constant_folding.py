@@ -0,0 +1,107 @@
+import os
+import sys
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+from constant_folding import (INT, UINT, LONG, ULONG, LLONG, ULLONG, DOUBLE, literal, truth, foldBinary,
+                              foldUnary, foldConditional)
+
+
+class TestLiteral(unittest.TestCase):
+    def test_integer_types(self):
+        self.assertEqual(literal('1'), (1, INT))
+        self.assertEqual(literal('2147483647'), (2147483647, INT))
+        # a decimal literal that does not fit int is a long, an octal or
+        # hexadecimal one is an unsigned int first
+        self.assertEqual(literal('2147483648'), (2147483648, LONG))
+        self.assertEqual(literal('0x80000000'), (2147483648, UINT))
+        self.assertEqual(literal('017'), (15, INT))
+        self.assertEqual(literal('1u'), (1, UINT))
+        self.assertEqual(literal('1L'), (1, LONG))
+        self.assertEqual(literal('1lu'), (1, ULONG))
+        self.assertEqual(literal('1ll'), (1, LLONG))
+        self.assertEqual(literal('18446744073709551615u'), (18446744073709551615, ULONG))
+        self.assertEqual(literal('0xffffffffffffffffll'), (18446744073709551615, ULLONG))
+        self.assertEqual(literal('18446744073709551616'), None)
+
+    def test_other_constants(self):
+        self.assertEqual(literal("'a'"), (97, INT))
+        self.assertEqual(literal("'\\n'"), (10, INT))
+        self.assertEqual(literal('1.5'), (1.5, DOUBLE))
+        self.assertEqual(literal('1e3'), (1000.0, DOUBLE))
+        self.assertEqual(literal('1.5f'), None)
+        self.assertEqual(literal('"text"'), None)
+
+    def test_truth(self):
+        self.assertEqual(truth('0'), False)
+        self.assertEqual(truth('0x10'), True)
+        self.assertEqual(truth('0.0'), False)
+        self.assertEqual(truth('x'), None)
+
+
+class TestFold(unittest.TestCase):
+    def test_promotion(self):
+        self.assertEqual(foldBinary('+', '1', '2u'), '3u')
+        self.assertEqual(foldBinary('+', '1u', '2l'), '3l')
+        self.assertEqual(foldBinary('+', '1ll', '2ul'), '3ull')
+        self.assertEqual(foldBinary('<', '-1', '0u'), '0')
+        self.assertEqual(foldBinary('<', '-1', '0l'), '1')
+        self.assertEqual(foldBinary('/', '1', '2'), '0')
+        self.assertEqual(foldBinary('/', '1', '2.0'), '0.5')
+        self.assertEqual(foldConditional('5', '1u'), '5u')
+        self.assertEqual(foldConditional('1', '2.0'), '1.0')
+
+    def test_wraparound(self):
+        self.assertEqual(foldBinary('-', '0u', '1'), '4294967295u')
+        self.assertEqual(foldBinary('*', '4294967295u', '2'), '4294967294u')
+        self.assertEqual(foldBinary('+', '18446744073709551615ul', '1'), '0ul')
+        self.assertEqual(foldUnary('-', '1u'), '4294967295u')
+        self.assertEqual(foldUnary('~', '0u'), '4294967295u')
+        self.assertEqual(foldUnary('~', '0'), '-1')
+        self.assertEqual(foldBinary('<<', '1u', '31'), '2147483648u')
+        # signed overflow is undefined, it is not folded
+        self.assertEqual(foldBinary('+', '2147483647', '1'), None)
+        self.assertEqual(foldBinary('*', '65536', '65536'), None)
+        self.assertEqual(foldBinary('*', '65536l', '65536'), '4294967296l')
+        self.assertEqual(foldUnary('-', '2147483648'), '-2147483648l')
+
+    def test_division(self):
+        # / truncates toward zero and a % b has the sign of a
+        self.assertEqual(foldBinary('/', '-7', '2'), '-3')
+        self.assertEqual(foldBinary('%', '-7', '2'), '-1')
+        self.assertEqual(foldBinary('/', '7', '-2'), '-3')
+        self.assertEqual(foldBinary('%', '7', '-2'), '1')
+        self.assertEqual(foldBinary('/', '-7', '-2'), '3')
+        self.assertEqual(foldBinary('%', '-7', '-2'), '-1')
+        self.assertEqual(foldBinary('/', '-7', '2u'), '2147483644u')
+        self.assertEqual(foldBinary('/', '-2147483648l', '-1'), '2147483648l')
+        self.assertEqual(foldBinary('/', '-2147483648', '-1'), None)
+
+    def test_not_folded(self):
+        self.assertEqual(foldBinary('/', '1', '0'), None)
+        self.assertEqual(foldBinary('%', '1', '0'), None)
+        self.assertEqual(foldBinary('/', '1.0', '0'), None)
+        self.assertEqual(foldBinary('%', '1.0', '2'), None)
+        self.assertEqual(foldBinary('<<', '1', '32'), None)
+        self.assertEqual(foldBinary('<<', '1', '-1'), None)
+        self.assertEqual(foldBinary('>>', '1l', '64'), None)
+        self.assertEqual(foldBinary('<<', '1', '31'), None)
+        self.assertEqual(foldBinary('<<', '-1', '1'), None)
+        self.assertEqual(foldBinary('>>', '-8', '1'), None)
+        self.assertEqual(foldBinary('&', '1.0', '1'), None)
+        self.assertEqual(foldBinary('+', '1.5f', '1'), None)
+        self.assertEqual(foldBinary('+', 'x', '1'), None)
+        self.assertEqual(foldBinary('*', '1e308', '10'), None)
+
+    def test_logical(self):
+        self.assertEqual(foldBinary('&&', '2', '0'), '0')
+        self.assertEqual(foldBinary('||', '0', '0.5'), '1')
+        self.assertEqual(foldUnary('!', '0u'), '1')
+        self.assertEqual(foldBinary('>>', '8', '2'), '2')
+        self.assertEqual(foldBinary('^', '6', '3'), '5')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(TEST_DIR, '..')
+sys.path.insert(0, ROOT)
+
+from block_generator import generateBlocks, writeBlocks
+
+INPUTS = os.path.join(ROOT, 'project3inputs')
+
+# prints the functional and the simplified version of every file in argv
+TRANSLATE = '''
+import sys
+from block_translator import translateFile
+from myfunctional_printer import functionalToString
+for fileName in sys.argv[1:]:
+    for ast in translateFile(fileName):
+        sys.stdout.write(functionalToString(ast))
+'''
+
+
+# output of TRANSLATE on the files under the given hash seed
+def translateWithSeed(fileNames, seed):
+    env = dict(os.environ)
+    env['PYTHONHASHSEED'] = str(seed)
+    process = subprocess.Popen([sys.executable, '-c', TRANSLATE] + fileNames, cwd=ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    if process.returncode != 0:
+        raise AssertionError(err.decode())
+    return out.decode()
+
+
+class TestHashSeed(unittest.TestCase):
+    def assertSameOutput(self, fileNames):
+        first = translateWithSeed(fileNames, 1)
+        self.assertTrue(first)
+        self.assertEqual(translateWithSeed(fileNames, 2), first)
+
+    def test_inputs(self):
+        self.assertSameOutput([os.path.join(INPUTS, name) for name in sorted(os.listdir(INPUTS))])
+
+    def test_generated(self):
+        directory = tempfile.mkdtemp()
+        try:
+            self.assertSameOutput(writeBlocks(generateBlocks(5, seed=3, statements=40), directory))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
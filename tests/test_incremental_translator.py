@@ -0,0 +1,63 @@
+import os
+import sys
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+from block_translator import translateBlock
+from incremental_translator import IncrementalTranslator
+from myfunctional_printer import functionalToString
+
+BLOCK = '''
+int s = 0;
+x = a + 1;
+for (i = 0; i < n; i++) {
+    s = s + i;
+    if (s > x) {
+        y = s;
+    }
+}
+z = s * 2;
+'''
+
+
+class TestIncrementalTranslator(unittest.TestCase):
+    def setUp(self):
+        self.translator = IncrementalTranslator()
+        self.translator.translate(BLOCK)
+
+    def assertTranslates(self, text):
+        functionalAST, simplifiedAST = self.translator.update(self.translator.source, text)
+        expectedAST, expectedSimplified = translateBlock(text)
+        self.assertEqual(functionalToString(functionalAST), functionalToString(expectedAST))
+        self.assertEqual(functionalToString(simplifiedAST, storedLevels=True),
+                         functionalToString(expectedSimplified, storedLevels=True))
+
+    def test_first_translation(self):
+        self.assertTranslates(BLOCK)
+
+    def test_insert(self):
+        self.assertTranslates(BLOCK.replace('z = s * 2;', 'w = x - 1;\nz = s * 2;'))
+        self.assertEqual(self.translator.stats['parsed'], 1)
+        # a new binding in front of the loop moves everything after it
+        self.assertTranslates('v = 3;\n' + self.translator.source)
+
+    def test_delete(self):
+        self.assertTranslates(BLOCK.replace('x = a + 1;\n', ''))
+        self.assertEqual(self.translator.stats['parsed'], 0)
+        self.assertTranslates(self.translator.source.replace('z = s * 2;\n', ''))
+
+    def test_edit_inside_loop(self):
+        self.assertTranslates(BLOCK.replace('s = s + i;', 's = s + i * i;'))
+        self.assertEqual(self.translator.stats['parsed'], 1)
+        # the loop now writes a variable it did not write before
+        self.assertTranslates(self.translator.source.replace('y = s;', 'y = s;\n        x = 0;'))
+
+    def test_spacing(self):
+        self.assertTranslates(BLOCK.replace('x = a + 1;', 'x  =  a  +\n    1;'))
+        self.assertEqual(self.translator.stats['parsed'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+from block_generator import BlockGenerator
+from block_translator import translateBlock, translateFile
+from myfunctional_compact import toCompact, fromCompact, compactToString
+from myfunctional_intern import NodeTable
+from myfunctional_printer import functionalToString
+
+INPUTS = os.path.join(TEST_DIR, '..', 'project3inputs')
+
+
+class TestCompactRoundtrip(unittest.TestCase):
+    def assertRoundtrip(self, ast):
+        text = functionalToString(ast)
+        compact = toCompact(ast)
+        self.assertEqual(compactToString(compact), text)
+        self.assertEqual(functionalToString(fromCompact(compact)), text)
+        self.assertEqual(compactToString(compact, storedLevels=True), functionalToString(ast, storedLevels=True))
+        self.assertEqual(functionalToString(fromCompact(compact), storedLevels=True),
+                         functionalToString(ast, storedLevels=True))
+        return compact
+
+    def test_inputs(self):
+        for name in sorted(os.listdir(INPUTS)):
+            functional, simplified = translateFile(os.path.join(INPUTS, name))
+            for ast in (functional, simplified):
+                self.assertRoundtrip(ast)
+
+    def test_interned(self):
+        for name in sorted(os.listdir(INPUTS)):
+            functional = translateFile(os.path.join(INPUTS, name), simplifyOutput=False)[0]
+            interned = NodeTable().intern(functional)
+            compact = self.assertRoundtrip(interned)
+            # shared subtrees are stored once
+            self.assertTrue(len(compact) <= len(toCompact(functional)))
+
+    def test_large_block(self):
+        text = BlockGenerator(seed=7, statements=3000).block()
+        functional, simplified = translateBlock(text)
+        for ast in (functional, simplified):
+            self.assertRoundtrip(ast)
+
+
+if __name__ == '__main__':
+    unittest.main()
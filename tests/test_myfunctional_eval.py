@@ -0,0 +1,118 @@
+import os
+import sys
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+from block_translator import translateBlock, translateFile
+from myfunctional_eval import compileFunction
+import myfunctional_ast6 as my
+
+INPUTS = os.path.join(TEST_DIR, '..', 'project3inputs')
+
+# (input, parameter values, returned values), the returned values are what
+# the block gives compiled with gcc
+KNOWN = [
+    ('checkin3_input3', dict(a=0, b=3, c=3, d=0), dict(a=1, b=1, c=1)),
+    ('checkin3_input3', dict(a=0, b=1, c=2, d=5), dict(a=0, b=1, c=1)),
+    ('p3_input3', dict(a=4, b=0, c=4, e=7), dict(b=1, e=8)),
+    ('p3_input3', dict(a=4, b=0, c=5, e=7), dict(b=0, e=7)),
+    ('checkin5_input2', dict(a=0, b=9, c=9), dict(b=1, c=3)),
+    ('checkin5_input2', dict(a=1, b=9, c=9), dict(b=9, c=9)),
+    ('testing3', dict(a=5, b=3, c=1, d=0, e=0, k=9), dict(a=1, b=3, c=1, d=1, e=5, k=2)),
+    ('testing3', dict(a=5, b=3, c=1, d=0, e=0, k=1), dict(a=1, b=3, c=1, d=1, e=2, k=1)),
+    ('testing4', dict(x1=0, y=0, x=0, i=-5, z=0), dict(x1=2, y=2, x=4, z=3)),
+    ('checkin6_input1', dict(i=0, n=4, sum=0, a=[1, 2, 3, 4], j=0, m=3, k=0), dict(sum=10, i=4, j=3, k=1)),
+    ('checkin6_input2', dict(i=0, n=3, sum=0, a=[7, 8, 9], k=0), dict(sum=24, i=3, k=1)),
+    ('checkin6_input3', dict(i=0, n=5, sum=1, a=[5, 4, 3, 2, 1], j=0, sum2=0, k=0),
+     dict(i=5, sum=16, j=4, sum2=10, k=1)),
+]
+
+
+class TestKnownResults(unittest.TestCase):
+    def test_inputs(self):
+        for name, env, expected in KNOWN:
+            functionalAST, simplifiedAST = translateFile(os.path.join(INPUTS, name))
+            self.assertEqual(compileFunction(functionalAST)(env), expected, name)
+            self.assertEqual(compileFunction(simplifiedAST)(env), expected, name)
+
+    def test_reuse(self):
+        # a compiled block keeps no state between calls (the do while runs
+        # once at least)
+        block = compileFunction(translateFile(os.path.join(INPUTS, 'checkin6_input2'))[0])
+        for n in (3, 1, 2, 3):
+            a = [7, 8, 9]
+            self.assertEqual(block(i=0, n=n, sum=0, a=a, k=0), dict(sum=sum(a[:n]), i=n, k=1))
+
+
+def element(name, index):
+    return my.ArrayRef(my.ID(name), my.Constant(str(index)))
+
+
+# FuncDef of the lets (ident, assigned expression), innermost last, that
+# returns the variables of returns
+def block(parameters, lets, returns):
+    body = list(map(my.ID, returns))
+    for ident, assigned in reversed(lets):
+        body = my.Let(ident, assigned, body)
+    return my.FuncDef(parameters, body, returns)
+
+
+# Arrays are values: an update gives a new array, the arrays a slot owns are
+# updated in place. C has no array assignment, so these blocks are built by
+# hand.
+class TestArrayOwnership(unittest.TestCase):
+    def test_alias(self):
+        funcDef = block(['a'], [
+            (element('a', 0), my.Constant('5')),    # a owns its copy
+            ('b', my.ID('a')),                      # b holds it too
+            (element('a', 1), my.Constant('9')),
+            (element('b', 2), my.Constant('7')),
+        ], ['a', 'b'])
+        result = compileFunction(funcDef)(a=[0, 0, 0])
+        self.assertEqual(result, {'a': [5, 9, 0], 'b': [5, 0, 7]})
+
+    def test_function_argument(self):
+        kept = []
+        funcDef = block(['a'], [
+            (element('a', 0), my.Constant('1')),
+            ('r', my.FuncCall('keep', [my.ID('a')])),
+            (element('a', 1), my.Constant('2')),
+        ], ['a', 'r'])
+        result = compileFunction(funcDef, {'keep': lambda array: kept.append(array) or 0})(a=[0, 0])
+        self.assertEqual(result, {'a': [1, 2], 'r': 0})
+        self.assertEqual(kept, [[1, 0]])
+
+    def test_stored_in_array(self):
+        funcDef = block(['a', 'm'], [
+            (element('a', 0), my.Constant('1')),
+            (element('m', 0), my.ID('a')),
+            (element('a', 0), my.Constant('3')),
+            (my.ArrayRef(element('m', 1), my.Constant('0')), my.Constant('4')),
+        ], ['a', 'm'])
+        m = [[0, 0], [0, 0]]
+        result = compileFunction(funcDef)(a=[0, 0], m=m)
+        self.assertEqual(result, {'a': [3, 0], 'm': [[1, 0], [4, 0]]})
+        self.assertEqual(m, [[0, 0], [0, 0]])
+
+    def test_parameters_not_modified(self):
+        functionalAST, simplifiedAST = translateBlock('''
+            for (i = 0; i < n; i++) {
+                a[i] = a[i] + i;
+                b[i][0] = a[i];
+            }
+        ''')
+        for funcDef in (functionalAST, simplifiedAST):
+            compiled = compileFunction(funcDef)
+            a, b = [1, 1, 1], [[0], [0], [0]]
+            for run in range(2):
+                result = compiled(n=3, i=0, a=a, b=b)
+                self.assertEqual(result['a'], [1, 2, 3])
+                self.assertEqual(result['b'], [[1], [2], [3]])
+                self.assertEqual(a, [1, 1, 1])
+                self.assertEqual(b, [[0], [0], [0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import copy
+import os
+import pickle
+import sys
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+from block_translator import translateBlock
+from checkin6simp import simplify
+from myfunctional_intern import NodeTable, Interned, sameStructure, sharedTable
+from myfunctional_printer import functionalToString
+import myfunctional_ast6 as my
+
+BLOCK = '''
+s = 0;
+for (i = 0; i < n; i++) {
+    s = s + (i + 1);
+    t = (i + 1) * 2;
+}
+'''
+
+
+def increment():
+    return my.BinaryOp('+', my.ID('i'), my.Constant('1'))
+
+
+class TestNodeTable(unittest.TestCase):
+    def setUp(self):
+        self.table = NodeTable()
+
+    def test_shared_subtrees(self):
+        a = self.table.intern(my.Let('x', increment(), [my.ID('x')]))
+        b = self.table.intern(my.Let('y', increment(), [my.ID('y')]))
+        self.assertTrue(a.assignedExpr is b.assignedExpr)
+        self.assertTrue(a.assignedExpr.left is self.table.intern(my.ID('i')))
+        self.assertTrue(self.table.intern(increment()) is a.assignedExpr)
+        self.assertTrue(isinstance(a, my.Let) and isinstance(a, Interned))
+
+    def test_translated_block(self):
+        functionalAST = translateBlock(BLOCK, simplifyOutput=False)[0]
+        interned = self.table.intern(functionalAST)
+        self.assertEqual(functionalToString(interned), functionalToString(functionalAST))
+        self.assertTrue(self.table.intern(translateBlock(BLOCK, simplifyOutput=False)[0]) is interned)
+        # simplify builds mutable nodes where it changes the interned tree
+        self.assertEqual(functionalToString(simplify(interned), storedLevels=True),
+                         functionalToString(simplify(functionalAST), storedLevels=True))
+
+    def test_immutable(self):
+        node = self.table.intern(increment())
+        self.assertRaises(AttributeError, setattr, node, 'op', '-')
+        self.assertRaises(AttributeError, delattr, node, 'op')
+        self.assertEqual(node.op, '+')
+        mutable = node.mutable()
+        mutable.op = '-'
+        self.assertFalse(isinstance(mutable, Interned))
+        self.assertEqual(node.op, '+')
+
+    def test_equality(self):
+        other = NodeTable()
+        a = self.table.intern(increment())
+        b = other.intern(increment())
+        c = other.intern(my.BinaryOp('+', my.ID('i'), my.Constant('2')))
+        self.assertFalse(a is b)
+        self.assertTrue(sameStructure(a, b))
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertFalse(sameStructure(a, c))
+        self.assertNotEqual(a, c)
+        self.assertEqual(len(set([a, b, c])), 2)
+        self.assertNotEqual(a, increment())
+
+    def test_copy_and_pickle(self):
+        node = sharedTable.intern(translateBlock(BLOCK, simplifyOutput=False)[0])
+        self.assertTrue(copy.copy(node) is node)
+        self.assertTrue(copy.deepcopy(node) is node)
+        self.assertTrue(pickle.loads(pickle.dumps(node)) is node)
+
+        # nodes of another table unpickle to the shared nodes
+        node = self.table.intern(my.Let('x', increment(), [increment()]))
+        loaded = pickle.loads(pickle.dumps(node))
+        self.assertEqual(loaded, node)
+        self.assertTrue(loaded is sharedTable.intern(node))
+        self.assertTrue(loaded.assignedExpr is loaded.bodyExpr.exprs[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import random
+import sys
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+from block_translator import translateBlock
+from myfunctional_eval import compileFunction
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if numpy is not None:
+    from myfunctional_vector import compileVector
+
+LANES = 16
+
+# ifs taken by some lanes only, nested in both branches
+MASKED_IF = '''
+if (x > 3) {
+    y = x * 2;
+    if (y > 12) {
+        z = y - 12;
+    }
+} else {
+    y = 0 - x;
+    z = x > 0 ? x : 7;
+}
+w = y + z;
+'''
+
+# lanes leaving the loops at different iterations
+LOOPS = '''
+s = 0;
+t = 0;
+for (i = 0; i < n; i++) {
+    s = s + a[i];
+    if (s > 10) {
+        t = i;
+    }
+    j = 0;
+    while (j < i && j < x) {
+        j++;
+    }
+}
+'''
+
+# the right side of && and || divides by zero in the lanes that skip it
+SHORT_CIRCUIT = '''
+p = d != 0 && x / d > 1;
+q = d == 0 || x % d == 0;
+if (d != 0 && x / d < 0) {
+    r = 1;
+} else {
+    r = 2;
+}
+'''
+
+# variables declared in a branch are only set in the lanes that take it
+MASKED_DECL = '''
+if (x > 3) {
+    int t0 = x * 2;
+    y = t0;
+}
+for (i = 0; i < n; i++) {
+    if (a[i] > 2) {
+        int t1 = a[i];
+        s = s + t1;
+    }
+}
+'''
+
+
+@unittest.skipIf(numpy is None, "vectorized evaluation needs numpy")
+class TestVectorAgainstScalar(unittest.TestCase):
+    # environments of the lanes, parameter name -> value
+    def lanes(self, seed):
+        rnd = random.Random(seed)
+        return [dict(x=rnd.randint(-6, 9), n=rnd.randint(0, 6), d=rnd.randint(-2, 2),
+                     y=0, z=0, w=0, s=0, t=0, i=0, j=0, p=0, q=0, r=0,
+                     a=[rnd.randint(-3, 8) for k in range(6)])
+                for lane in range(LANES)]
+
+    def assertLanes(self, text, seed=0):
+        for ast in translateBlock(text):
+            envs = [dict((name, env[name]) for name in map(str, ast.parameters)) for env in self.lanes(seed)]
+            columns = dict((name, numpy.array([env[name] for env in envs])) for name in envs[0])
+            vector = compileVector(ast)(columns)
+            scalar = compileFunction(ast)
+            for lane, env in enumerate(envs):
+                for name, value in scalar(env).items():
+                    if value is None:
+                        # unset in this lane
+                        self.assertTrue(vector[name] is None or vector[name][lane] is numpy.ma.masked,
+                                        (name, lane, env))
+                    else:
+                        self.assertEqual(vector[name][lane], value, (name, lane, env))
+
+    def test_masked_if(self):
+        for seed in range(3):
+            self.assertLanes(MASKED_IF, seed)
+
+    def test_loops(self):
+        for seed in range(3):
+            self.assertLanes(LOOPS, seed)
+
+    def test_short_circuit(self):
+        for seed in range(3):
+            self.assertLanes(SHORT_CIRCUIT, seed)
+
+    def test_masked_declaration(self):
+        for seed in range(3):
+            self.assertLanes(MASKED_DECL, seed)
+        block = compileVector(translateBlock(MASKED_DECL)[1])
+        columns = block(x=numpy.array([1, 5, 2, 9]), y=0, n=0, s=0, i=0, a=numpy.zeros((4, 6), dtype=int))
+        self.assertEqual(columns['t0'].tolist(), [None, 10, None, 18])
+        self.assertEqual(columns['y'].tolist(), [0, 10, 0, 18])
+        self.assertTrue(columns['t1'] is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
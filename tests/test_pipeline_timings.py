@@ -0,0 +1,107 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(TEST_DIR, '..')
+sys.path.insert(0, ROOT)
+
+from batch_translate import translateAll
+from block_translator import translateBlock, translateRecord
+from pipeline_timings import PhaseTimer, NULL_TIMER, aggregate, countNodes
+import myfunctional_ast6 as my
+
+INPUTS = os.path.join(ROOT, 'project3inputs')
+
+BLOCK = '''
+s = 0;
+for (i = 0; i < n; i++) {
+    s = s + i;
+}
+'''
+
+
+class TestPhaseTimer(unittest.TestCase):
+    def assertPhases(self, record, names):
+        self.assertEqual([phase['phase'] for phase in record['phases']], names)
+        for phase in record['phases']:
+            self.assertTrue(phase['wall'] >= 0 and phase['cpu'] >= 0)
+        self.assertAlmostEqual(record['wall'], sum(phase['wall'] for phase in record['phases']))
+        self.assertEqual(json.loads(json.dumps(record)), record)
+
+    def test_translate_block(self):
+        timer = PhaseTimer()
+        functionalAST, simplifiedAST = translateBlock(BLOCK, timer=timer)
+        record = timer.record()
+        self.assertPhases(record, ['wrap', 'parse', 'transform', 'translate', 'simplify'])
+        wrap, parse, transform, translate, simplify = record['phases']
+        self.assertEqual(wrap['charsIn'], len(BLOCK))
+        self.assertEqual(parse['charsIn'], wrap['charsOut'])
+        self.assertEqual(transform['nodesIn'], parse['nodesOut'])
+        self.assertEqual(translate['nodesIn'], transform['nodesOut'])
+        self.assertEqual(translate['nodesOut'], countNodes(functionalAST))
+        self.assertEqual(simplify['nodesIn'], translate['nodesOut'])
+        self.assertEqual(simplify['nodesOut'], countNodes(simplifiedAST))
+
+    def test_preprocessor(self):
+        timer = PhaseTimer()
+        translateBlock(BLOCK, usePreprocessor=True, simplifyOutput=False, timer=timer)
+        self.assertPhases(timer.record(), ['wrap', 'preprocess', 'parse', 'transform', 'translate'])
+
+    def test_failed_phase(self):
+        record = translateRecord('<goto>', timings=True, text='goto l;')
+        self.assertFalse(record['ok'])
+        self.assertPhases(record['timings'], ['wrap', 'parse', 'transform'])
+        transform = record['timings']['phases'][-1]
+        self.assertEqual(transform['error'], 'ErrorUnsupportedConstruct')
+        self.assertFalse('nodesOut' in transform)
+
+    def test_null_timer(self):
+        translateBlock(BLOCK, timer=NULL_TIMER)
+        self.assertEqual(NULL_TIMER.record(), {'phases': [], 'wall': 0.0, 'cpu': 0.0})
+
+    def test_count_nodes(self):
+        i = my.ID('i')
+        self.assertEqual(countNodes(my.BinaryOp('+', i, i)), 2)
+        self.assertEqual(countNodes([my.ID('i'), my.Constant('1')]), 2)
+
+
+class TestTimingRecords(unittest.TestCase):
+    def test_batch(self):
+        files = [os.path.join(INPUTS, name) for name in ('p3_input1', 'checkin6_input1')]
+        out = io.StringIO()
+        timings = []
+        self.assertEqual(translateAll(files, out, timings=timings), 0)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([record['timings'] for record in records], timings)
+        for record in records:
+            self.assertEqual([phase['phase'] for phase in record['timings']['phases']],
+                             ['read', 'wrap', 'parse', 'transform', 'translate', 'simplify', 'render',
+                              'render simplified'])
+        totals = aggregate(timings)
+        self.assertEqual(totals['parse']['count'], 2)
+        self.assertAlmostEqual(totals['parse']['wall'],
+                               sum(record['phases'][2]['wall'] for record in timings))
+
+    def test_checkin6simp(self):
+        inputFile = os.path.join(INPUTS, 'checkin6_input1')
+        process = subprocess.Popen([sys.executable, 'checkin6simp.py', inputFile, '--timings', '--no-cache'],
+                                   cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = process.communicate()
+        self.assertEqual(process.returncode, 0)
+        record = json.loads(err.decode().splitlines()[-1])
+        self.assertEqual(record['input'], inputFile)
+        self.assertFalse(record['cached'])
+        self.assertEqual([phase['phase'] for phase in record['phases']],
+                         ['read', 'wrap', 'parse', 'transform', 'translate', 'simplify', 'render',
+                          'render simplified'])
+        f = open(inputFile, 'r')
+        self.assertEqual(record['phases'][0]['charsOut'], len(f.read()))
+        f.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
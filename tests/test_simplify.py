@@ -0,0 +1,254 @@
+import os
+import random
+import sys
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+from block_translator import translateBlock, translateFile
+from checkin6simp import eliminateDeadBindings
+from myfunctional_eval import compileFunction
+from myfunctional_printer import functionalToString
+
+INPUTS = os.path.join(TEST_DIR, '..', 'project3inputs')
+
+# inputs that run on integer parameters, with the array a of the checkin6
+# inputs
+RUNNABLE_INPUTS = [
+    'checkin3_input1', 'checkin3_input2', 'checkin3_input3', 'checkin4_input3', 'checkin5_input1',
+    'checkin5_input2', 'checkin6_input1', 'checkin6_input2', 'checkin6_input3', 'p3_input1', 'p3_input3',
+    'p3_input5', 'p3_input6', 'p3_input7', 'testing0', 'testing3', 'testing4',
+]
+
+# blocks with loops and ifs whose lets are partly dead
+BLOCKS = [
+    '''
+    x = a + 1;
+    x = b * 2;
+    y = x;
+    ''',
+    '''
+    s = 0;
+    for (i = 0; i < n; i++) {
+        u = i * 3;
+        u = u + s;
+        s = s + i;
+    }
+    u = 0;
+    ''',
+    '''
+    if (a > 0) {
+        b = 1;
+        b = 2;
+        c = b;
+    }
+    b = 5;
+    ''',
+    '''
+    while (i < n) {
+        i = i + 1;
+        w = i;
+        if (w > a) {
+            v = w;
+            a = a + 2;
+        } else {
+            v = 0;
+        }
+    }
+    w = 3;
+    ''',
+    '''
+    for (i = 0; i < n; i++) {
+        t = i * 2;
+        for (j = 0; j < i; j++) {
+            t = t + j;
+            s = t;
+        }
+        t = 0;
+    }
+    ''',
+]
+
+
+# printed simplified AST of text, without the spaces at the end of the lines
+def simplifiedText(text):
+    output = functionalToString(translateBlock(text)[1])
+    return '\n'.join(line.rstrip() for line in output.split('\n'))
+
+
+def deadBindingsText(text):
+    return functionalToString(eliminateDeadBindings(translateBlock(text, simplifyOutput=False)[0]))
+
+
+class TestDeadBindings(unittest.TestCase):
+    def test_overwritten(self):
+        output = deadBindingsText(BLOCKS[0])
+        self.assertNotIn('Let x = (a + 1)', output)
+        self.assertIn('Let x = (b * 2)', output)
+        self.assertIn('Let y = x', output)
+
+    def test_if(self):
+        output = deadBindingsText(BLOCKS[2])
+        # b of the if is written again after it, the if binds c only
+        self.assertNotIn('Let b = 1', output)
+        self.assertNotIn('Let (b, c)', output)
+        self.assertIn('Let c = \n', output)
+        self.assertIn('Let b = 2', output)
+        self.assertIn('Let b = 5', output)
+
+    def test_loop_arguments(self):
+        output = deadBindingsText(BLOCKS[1])
+        # u is written after the loop, s and i are read by the loop
+        self.assertIn('let rec loop s i =', output)
+        self.assertIn('Let s = (s + i)', output)
+        self.assertIn('Let i = (i + 1)', output)
+        self.assertNotIn('Let u = (i * 3)', output)
+        self.assertIn('Let u = 0', output)
+
+    def test_condition_arguments(self):
+        output = deadBindingsText(BLOCKS[3])
+        # w is set before the if inside the loop reads it, it does not go
+        # from one iteration to the next
+        self.assertIn('let rec loop i v a =', output)
+        self.assertIn('Let w = i', output)
+        output = deadBindingsText('while (i < n) { i = i + 1; w = i; }\nw = 3;')
+        self.assertIn('let rec loop i =', output)
+        self.assertIn('Let w = 3', output)
+
+    def test_same_results(self):
+        rnd = random.Random(0)
+        for text in BLOCKS:
+            functionalAST = translateBlock(text, simplifyOutput=False)[0]
+            full = compileFunction(functionalAST)
+            dead = compileFunction(eliminateDeadBindings(functionalAST))
+            for run in range(20):
+                env = dict((str(parameter), rnd.randint(-3, 6)) for parameter in functionalAST.parameters)
+                self.assertEqual(dead(env), full(env), (text, env))
+
+    def test_inputs(self):
+        rnd = random.Random(0)
+        for name in RUNNABLE_INPUTS:
+            functionalAST, simplifiedAST = translateFile(os.path.join(INPUTS, name))
+            full = compileFunction(functionalAST)
+            dead = compileFunction(eliminateDeadBindings(functionalAST))
+            simplified = compileFunction(simplifiedAST)
+            for run in range(20):
+                env = dict((str(parameter), rnd.randint(-3, 6)) for parameter in functionalAST.parameters)
+                if name.startswith('checkin6'):
+                    env['a'] = [rnd.randint(-3, 6) for i in range(10)]
+                self.assertEqual(dead(env), full(env), (name, env))
+                self.assertEqual(simplified(env), full(env), (name, env))
+
+
+
+class TestBranchPruning(unittest.TestCase):
+    def assertSimplified(self, text, expected):
+        self.assertEqual(simplifiedText(text), expected.strip('\n'))
+        functionalAST, simplifiedAST = translateBlock(text)
+        full, simplified = compileFunction(functionalAST), compileFunction(simplifiedAST)
+        for a in range(-2, 3):
+            env = dict((str(name), a) for name in functionalAST.parameters)
+            self.assertEqual(simplified(env), full(env))
+
+    def test_if_false(self):
+        self.assertSimplified("""
+x = a;
+if (0) {
+    x = 1;
+    y = 2;
+}
+z = x;
+""", """
+func block_function(x, a, y, z) return (x, y, z) =
+    Let x = a
+    in
+        Let z = x
+        in (x, y, z)
+""")
+
+    def test_if_true_else(self):
+        # the lets of the branch take the place of the if
+        self.assertSimplified("""
+if (1) {
+    x = a + 1;
+    y = x;
+} else {
+    x = 2;
+}
+z = x + y;
+""", """
+func block_function(x, a, y, z) return (x, y, z) =
+    Let x = (a + 1)
+    in
+        Let y = x
+        in
+            Let z = (x + y)
+            in (x, y, z)
+""")
+
+    def test_while_false(self):
+        self.assertSimplified("""
+s = a;
+while (0) {
+    s = s + 1;
+}
+t = s;
+""", """
+func block_function(s, a, t) return (s, t) =
+    Let s = a
+    in
+        Let t = s
+        in (s, t)
+""")
+
+    def test_propagated_condition(self):
+        # i < n and k - 2 are only constant once i, n and k are replaced
+        self.assertSimplified("""
+n = 3;
+i = 5;
+s = a;
+while (i < n) {
+    s = s + i;
+    i++;
+}
+t = s + i;
+""", """
+func block_function(n, i, s, a, t) return (n, i, s, t) =
+    Let s = a
+    in
+        Let t = (s + 5)
+        in (3, 5, s, t)
+""")
+        self.assertSimplified("""
+k = 0;
+if (k) {
+    k = 1;
+} else {
+    k = 2;
+}
+for (i = 0; i < k - 2; i++) {
+    s = s + a;
+}
+r = s;
+""", """
+func block_function(k, i, s, a, r) return (k, i, s, r) =
+    Let r = s
+    in (2, 0, s, r)
+""")
+
+    def test_loop_kept(self):
+        # the condition of a loop that runs is only constant on entry
+        output = simplifiedText("""
+i = 0;
+while (i < 3) {
+    s = s + i;
+    i++;
+}
+""")
+        self.assertIn('let rec loop s i =', output)
+        self.assertIn('if (i < 3)', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
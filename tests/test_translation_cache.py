@@ -0,0 +1,83 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TEST_DIR, '..'))
+
+import translation_cache
+from translation_cache import TranslationCache
+
+
+class CountingCache(TranslationCache):
+    def __init__(self, *args, **kwargs):
+        TranslationCache.__init__(self, *args, **kwargs)
+        self.listings = 0
+
+    def entries(self):
+        self.listings += 1
+        return TranslationCache.entries(self)
+
+
+class TestTranslationCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = CountingCache('version', self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_put(self):
+        key = self.cache.key('x = 1;', True)
+        self.assertEqual(self.cache.get(key), None)
+        self.assertTrue(self.cache.put(key, {'output': 'Let x = 1'}))
+        self.assertEqual(self.cache.get(key)['output'], 'Let x = 1')
+        self.assertEqual(self.cache.get(self.cache.key('x = 1;', False)), None)
+        self.assertEqual(TranslationCache('other', self.directory).get(key), None)
+
+    def test_running_size(self):
+        for i in range(20):
+            self.cache.put(self.cache.key(str(i)), {'output': 'a' * i})
+        # the entries are listed by the first write only, it finds no size
+        self.assertEqual(self.cache.listings, 1)
+        self.assertEqual(self.cache.readSize()[0], self.cache.size())
+        # writing an entry again counts it once
+        self.cache.put(self.cache.key('3'), {'output': 'b' * 100})
+        self.assertEqual(self.cache.readSize()[0], self.cache.size())
+
+    def test_rescan(self):
+        oldRescan = translation_cache.RESCAN_WRITES
+        translation_cache.RESCAN_WRITES = 5
+        try:
+            for i in range(10):
+                self.cache.put(self.cache.key(str(i)), {'output': i})
+        finally:
+            translation_cache.RESCAN_WRITES = oldRescan
+        # by the first write and once 5 writes later
+        self.assertEqual(self.cache.listings, 2)
+
+    def test_evict(self):
+        keys = [self.cache.key(str(i)) for i in range(10)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, {'output': 'a' * 100})
+            os.utime(self.cache.path(key), (i, i))
+        self.cache.maxBytes = self.cache.size() // 2
+        self.cache.put(self.cache.key('new'), {'output': 'a' * 100})
+        self.assertTrue(self.cache.size() <= self.cache.maxBytes)
+        self.assertEqual(self.cache.readSize(), (self.cache.size(), 0))
+        # the least recently used entries went first
+        self.assertEqual(self.cache.get(keys[0]), None)
+        self.assertNotEqual(self.cache.get(keys[-1]), None)
+        self.assertNotEqual(self.cache.get(self.cache.key('new')), None)
+
+    def test_clear(self):
+        self.cache.put(self.cache.key('x'), {'output': 'x'})
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
+        self.assertEqual(self.cache.readSize(), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
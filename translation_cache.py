@@ -0,0 +1,243 @@
+'''
+On-disk cache of block translations, shared by every process on the machine.
+
+An entry is found by the hash of the normalized block text, the options it
+was translated with and a version stamp of the translator. The stamp is a
+hash of the source of the translator modules (and of the pycparser and
+Python versions), so an entry is never used by a translator that would
+produce something else.
+
+An entry is a pickled dict holding the printed outputs and the ASTs as
+CompactASTs (see myfunctional_compact). Entries are files under
+<directory>/<first two characters of the key>/<key>:
+  - they are written to a temporary file in the same directory and moved in
+    place with os.replace, so a reader sees a whole entry or none, and two
+    processes writing the same entry leave one of them
+  - a hit sets the modification time of the entry
+  - the total size of the entries is kept in <directory>/.size and updated
+    by every write, the entries are only listed when that total goes over
+    maxBytes (the least recently used entries are then removed until the
+    cache is under it) or once every RESCAN_WRITES writes. Writers racing
+    on .size can lose an update, the listing sets the right total again
+  - an entry that can not be read (removed by another process, truncated by
+    a full disk) is a miss
+
+The entries are unpickled, the cache directory must only be writable by
+users whose translations are trusted.
+'''
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import pycparser
+
+
+# changed when the layout of the entries changes
+CACHE_FORMAT = 1
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# modules (relative to ROOT) every translation depends on
+TRANSLATOR_FILES = (
+    'block_parser.py',
+    'constant_folding.py',
+    'myfunctional_ast6.py',
+    'myfunctional_printer.py',
+    'myfunctional_compact.py',
+    'pyminicMaster/c_ast_to_minic.py',
+    'pyminicMaster/minic/minic_ast.py',
+)
+
+DEFAULT_DIRECTORY = os.environ.get('TRANSLATION_CACHE_DIR',
+                                   os.path.join(os.path.expanduser('~'), '.cache', 'block_translations'))
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+
+# temporary files older than this (in seconds) were left by a crashed writer
+STALE_TEMPORARY = 3600
+
+# the entries are listed again after this many writes, which corrects the
+# total of .size and removes stale temporary files
+RESCAN_WRITES = 1000
+
+SIZE_FILE = '.size'
+
+
+# hash of the translator made of TRANSLATOR_FILES and the given modules
+def versionStamp(*files):
+    digest = hashlib.sha256()
+    digest.update(('%d %s %s\n' % (CACHE_FORMAT, sys.version_info[:2], pycparser.__version__)).encode())
+    for name in TRANSLATOR_FILES + files:
+        with open(os.path.join(ROOT, name), 'rb') as f:
+            digest.update(name.encode() + b'\n' + f.read())
+    return digest.hexdigest()
+
+
+# the text of a block without what does not change its translation: line
+# endings, spaces at the end of lines and empty lines around the block
+def normalizeBlock(text):
+    lines = [line.rstrip() for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n')]
+    return '\n'.join(lines).strip('\n')
+
+
+class TranslationCache(object):
+    # version:  stamp of the translator, see versionStamp
+    # maxBytes: size the entries are evicted down to
+    def __init__(self, version, directory=None, maxBytes=DEFAULT_MAX_BYTES):
+        self.version = version
+        self.directory = directory if directory is not None else DEFAULT_DIRECTORY
+        self.maxBytes = maxBytes
+
+    # key of the block text translated with the given options
+    def key(self, text, *options):
+        digest = hashlib.sha256()
+        digest.update(self.version.encode() + b'\n' + repr(options).encode() + b'\n')
+        digest.update(normalizeBlock(text).encode('utf-8', 'surrogateescape'))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    # the entry stored under key, None when there is none
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get('version') != self.version:
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    # store entry (a dict) under key, then evict when the cache holds more
+    # than maxBytes
+    def put(self, key, entry):
+        entry = dict(entry, version=self.version)
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, pickle.HIGHEST_PROTOCOL)
+                written = f.tell()
+            replaced = self.fileSize(path)
+            os.replace(temporary, path)
+        except BaseException:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+
+        total, writes = self.readSize()
+        if total is None or writes + 1 >= RESCAN_WRITES or total + written - replaced > self.maxBytes:
+            self.evict()
+        else:
+            self.writeSize(total + written - replaced, writes + 1)
+        return True
+
+    # size of the file at path, 0 when there is none
+    def fileSize(self, path):
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+
+    # (total size of the entries, writes since they were listed) kept in
+    # SIZE_FILE, (None, None) when it can not be read
+    def readSize(self):
+        try:
+            with open(os.path.join(self.directory, SIZE_FILE)) as f:
+                total, writes = f.read().split()
+            return int(total), int(writes)
+        except (OSError, ValueError):
+            return None, None
+
+    def writeSize(self, total, writes):
+        try:
+            with open(os.path.join(self.directory, SIZE_FILE), 'w') as f:
+                f.write('%d %d\n' % (total, writes))
+        except OSError:
+            pass
+
+    # (modification time, size, path) of every entry
+    def entries(self):
+        found = []
+        now = time.time()
+        try:
+            subdirectories = os.listdir(self.directory)
+        except OSError:
+            return found
+        for subdirectory in subdirectories:
+            if subdirectory == SIZE_FILE:
+                continue
+            try:
+                names = os.listdir(os.path.join(self.directory, subdirectory))
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(self.directory, subdirectory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.startswith('.tmp-'):
+                    if now - stat.st_mtime > STALE_TEMPORARY:
+                        self.remove(path)
+                    continue
+                found.append((stat.st_mtime, stat.st_size, path))
+        return found
+
+    # total size of the entries in bytes
+    def size(self):
+        return sum(size for mtime, size, path in self.entries())
+
+    # remove the least recently used entries until the cache holds at most
+    # maxBytes, returns the number of entries removed
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for mtime, size, path in entries)
+        removed = 0
+        for mtime, size, path in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            if self.remove(path):
+                removed += 1
+            total -= size
+        self.writeSize(total, 0)
+        return removed
+
+    # remove every entry
+    def clear(self):
+        for mtime, size, path in self.entries():
+            self.remove(path)
+        self.writeSize(0, 0)
+
+    # remove a file another process may have removed already
+    def remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+# cache of the command line translator script (e.g. 'checkin6simp.py'),
+# None when the cache is turned off with --no-cache in argv
+#   modules: the other modules (relative to ROOT) the script translates with
+def scriptCache(script, argv=(), modules=()):
+    if '--no-cache' in argv:
+        return None
+    return TranslationCache(versionStamp(script, *modules))